@@ -0,0 +1,33 @@
+"""fix overtake natural key
+
+Revision ID: 3b8f2c6d9e41
+Revises: 12d089e7dd79
+Create Date: 2026-10-18 12:40:51.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8f2c6d9e41'
+down_revision = '12d089e7dd79'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # databases that ran the first version of 0a29cff80684 index the passing
+    # status and NULL passed drivers, so an overtake may have been written twice
+    op.drop_index('ix_overtake_natural_key', table_name='overtake')
+    op.execute(
+        "DELETE FROM overtake WHERE id NOT IN ("
+        "SELECT min(id) FROM overtake "
+        "GROUP BY driver_race_summary_id, time, lap_number, position, coalesce(passed_driver_id, ''))"
+    )
+    op.create_index('ix_overtake_natural_key', 'overtake', ['driver_race_summary_id', 'time', 'lap_number', 'position', sa.text("coalesce(passed_driver_id, '')")], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_overtake_natural_key', table_name='overtake')
+    op.create_index('ix_overtake_natural_key', 'overtake', ['driver_race_summary_id', 'time', 'lap_number', 'position', 'passed_driver_id', 'passing_status'], unique=True)
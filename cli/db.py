@@ -1,8 +1,13 @@
 import click
+import os
+import sqlalchemy
+from sqlalchemy.orm import Session
 from datetime import date
 
+from scrape.benchmark import benchmark_db, create_benchmark_db
 from scrape.db import create_connection
-from scrape.model import Base
+from scrape.model import Base, Race
+from scrape.rankings import refresh_rankings
 
 
 @click.group()
@@ -20,3 +25,33 @@ def create_tables():
 def drop_all_tables():
     conn = create_connection()
     Base.metadata.drop_all(conn)
+
+
+@db.command("refresh-rankings")
+@click.option("--year", type=int, help="only refresh the races of this season")
+def refresh_rankings_command(year):
+    """
+    Recompute the race_driver_rankings, e.g. after editing passing_status_override.
+    """
+    conn = create_connection()
+    with Session(conn) as tx:
+        race_ids = None
+        if year is not None:
+            race_ids = [race_id for race_id, in tx.query(Race.id).filter_by(year=year)]
+        refresh_rankings(tx, race_ids)
+        tx.commit()
+
+
+@db.command()
+@click.option("--path", default="data/benchmark.sqlite", help="database created for the benchmark")
+@click.option("--seasons", default=5, help="number of seasons of random races in the database")
+@click.option("--repeat", default=20, help="number of runs of each write and query")
+def benchmark(path, seasons, repeat):
+    """
+    Time a race write and the frontend queries without and with the indexes.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    engine = sqlalchemy.create_engine(f"sqlite:///{path}")
+    create_benchmark_db(engine, seasons=seasons)
+    click.echo(benchmark_db(engine, repeat=repeat).to_string())
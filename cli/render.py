@@ -1,6 +1,22 @@
 import click
 
+from scrape.db import create_connection
+from scrape.snapshot import SNAPSHOT_DIR, render_snapshots
+
 
 @click.group()
 def render():
     pass
+
+
+@render.command()
+@click.option("--out", default=SNAPSHOT_DIR, help="directory of the snapshots")
+@click.option("--year", type=int, help="only render the races of this season")
+@click.option("--force", is_flag=True, help="render races whose data didn't change")
+def snapshots(out, year, force):
+    """
+    Write the data of each driver's race page as JSON, for the races that changed.
+    """
+    conn = create_connection()
+    races = render_snapshots(conn, out, year=year, force=force)
+    click.echo(f"rendered {len(races)} races")
@@ -10,6 +10,7 @@ from scrape.scrape import (
     scrape_race_data,
 )
 from scrape.db import create_connection
+from scrape.race import default_overtake_rules
 from scrape.core.schedule import get_schedule
 
 
@@ -42,18 +43,44 @@ def circuits(year):
 @scrape.command()
 @click.option("--event", required=True, help="circuit name or country name")
 @click.option("--year", default="current", help="scrape race data for this year")
-def race(event, year):
+@click.option("--workers", default=1, help="number of processes used to parse timing data")
+@click.option(
+    "--overtake-workers",
+    default=1,
+    help="number of processes used to classify overtakes",
+)
+@click.option(
+    "--profile-overtakes", is_flag=True, help="print the cost of each overtake classification rule"
+)
+def race(event, year, workers, overtake_workers, profile_overtakes):
     if not year or year == "current":
         year = date.today().year
 
+    overtake_rules = default_overtake_rules() if profile_overtakes else None
     conn = create_connection()
     with Session(conn) as tx:
-        scrape_race_data(tx, event, year)
+        scrape_race_data(
+            tx,
+            event,
+            year,
+            workers=workers,
+            overtake_rules=overtake_rules,
+            overtake_workers=overtake_workers,
+        )
+
+    if profile_overtakes:
+        click.echo(overtake_rules.stats().to_string(index=False))
 
 
 @scrape.command()
 @click.option("--year", default="current", help="scrape race data for this year")
-def all_races(year):
+@click.option("--workers", default=1, help="number of processes used to parse timing data")
+@click.option(
+    "--overtake-workers",
+    default=1,
+    help="number of processes used to classify overtakes",
+)
+def all_races(year, workers, overtake_workers):
     if not year or year == "current":
         year = date.today().year
 
@@ -64,4 +91,10 @@ def all_races(year):
         for _, event in events.iterrows():
             if event["Date"] <= date.today():
                 logging.info(f"scrape {event['Locality']}")
-                scrape_race_data(tx, event["Locality"], year)
+                scrape_race_data(
+                    tx,
+                    event["Locality"],
+                    year,
+                    workers=workers,
+                    overtake_workers=overtake_workers,
+                )
@@ -4,13 +4,21 @@ import click
 from cli.scrape import scrape
 from cli.render import render
 from cli.db import db
+from scrape.db import configure_connection, parse_pragmas
 
 coloredlogs.install(level="INFO", fmt="%(levelname)s %(asctime)s [%(module)s] - %(message)s")
 
 
 @click.group()
-def cli():
-    pass
+@click.option("--db-url", help="SQLAlchemy URL of the database, data/db.sqlite by default")
+@click.option(
+    "--db-pragmas",
+    default="",
+    help='SQLite pragmas of each connection, e.g. "synchronous=full,cache_size=-2000"',
+)
+def cli(db_url, db_pragmas):
+    if db_url or db_pragmas:
+        configure_connection(db_url, parse_pragmas(db_pragmas))
 
 
 cli.add_command(scrape)
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import datetime
+import time
+
+import numpy as np
+import pandas as pd
+import sqlalchemy
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from scrape import model
+from scrape.rankings import refresh_rankings
+
+__all__ = ["create_benchmark_db", "benchmark_db", "FRONTEND_QUERIES"]
+
+# the queries of src/libs/db/*.ts for a driver's race page
+FRONTEND_QUERIES = {
+    "race summary": """
+        select driver_race_summary.*
+        from driver_race_summary
+        join race on race.id = driver_race_summary.race_id
+        where driver_race_summary.driver_id = :driver_id
+            and race.circuit_id = :circuit_id and race.year = :year
+        limit 1
+    """,
+    "lap summary": """
+        select * from lap_summary
+        join race_driver_rankings
+            on race_driver_rankings.driver_race_summary_id = lap_summary.driver_race_summary_id
+        where lap_summary.driver_race_summary_id = :driver_race_summary_id
+        limit 1
+    """,
+    "stint summary": """
+        select * from stint_summary where driver_race_summary_id = :driver_race_summary_id
+    """,
+    "pit summary": """
+        select * from pit_summary
+        join race_driver_rankings
+            on race_driver_rankings.driver_race_summary_id = pit_summary.driver_race_summary_id
+        where pit_summary.driver_race_summary_id = :driver_race_summary_id
+            and pit_average_rank is not null
+        limit 1
+    """,
+    "overtake summary": """
+        select * from race_driver_rankings
+        where driver_race_summary_id = :driver_race_summary_id
+        limit 1
+    """,
+}
+
+# tables written by a race scrape, and the columns it doesn't write
+_RACE_TABLES = [
+    model.DriverRaceSummary,
+    model.LapSummary,
+    model.StintSummary,
+    model.PitSummary,
+    model.PitStop,
+    model.Overtake,
+]
+_NOT_SCRAPED = {"id", "passing_status_override", "passing_status_override_reason"}
+
+_STATUSES = ["OK", "PIT", "TRACK_STATUS", "BAD_READING", "DUPLICATE"]
+_COMPOUNDS = ["SOFT", "MEDIUM", "HARD"]
+
+
+def create_benchmark_db(
+    engine: sqlalchemy.engine.Engine, seasons=5, rounds=22, drivers=20, overtakes=11, seed=0
+):
+    """
+    Creates the tables and fills them with random races, as many as a scrape of
+    `seasons` seasons writes. Each driver has 3 stints, 2 pit stops and
+    `overtakes` overtakes per race.
+    """
+    rng = np.random.default_rng(seed)
+    model.Base.metadata.create_all(engine)
+
+    driver_ids = [f"driver_{i}" for i in range(drivers)]
+    circuit_ids = [f"circuit_{i}" for i in range(rounds)]
+    rows = {
+        model.Driver: [{"driver_id": driver_id} for driver_id in driver_ids],
+        model.Circuit: [{"circuit_id": circuit_id} for circuit_id in circuit_ids],
+        model.Race: [],
+        model.DriverRaceSummary: [],
+        model.LapSummary: [],
+        model.StintSummary: [],
+        model.PitSummary: [],
+        model.PitStop: [],
+        model.Overtake: [],
+    }
+
+    def seconds(low, high):
+        return datetime.timedelta(seconds=float(rng.uniform(low, high)))
+
+    for season in range(seasons):
+        for race_round in range(rounds):
+            race_id = len(rows[model.Race]) + 1
+            rows[model.Race].append(
+                {
+                    "id": race_id,
+                    "year": 2022 - season,
+                    "date": datetime.date(2022 - season, 3, 1)
+                    + datetime.timedelta(weeks=race_round),
+                    "round_number": race_round + 1,
+                    "drivers": drivers,
+                    "circuit_id": circuit_ids[race_round],
+                }
+            )
+            for position, driver_id in enumerate(rng.permutation(driver_ids)):
+                summary_id = len(rows[model.DriverRaceSummary]) + 1
+                rows[model.DriverRaceSummary].append(
+                    {
+                        "id": summary_id,
+                        "race_id": race_id,
+                        "driver_id": driver_id,
+                        "position": str(float(position + 1)),
+                        "grid_position": str(float(rng.integers(1, drivers + 1))),
+                        "status": "Finished",
+                        "laps_completed": 70,
+                    }
+                )
+                rows[model.LapSummary].append(
+                    {
+                        "driver_race_summary_id": summary_id,
+                        "fastest_lap": int(rng.integers(1, 71)),
+                        "fastest_lap_time": seconds(65, 70),
+                        "fastest_lap_average_speed": float(rng.uniform(200, 230)),
+                        "fastest_lap_speed_trap": float(rng.uniform(280, 330)),
+                        "average_time": seconds(70, 75),
+                        "average_speed": float(rng.uniform(190, 220)),
+                        "fastest_speed_trap": float(rng.uniform(300, 340)),
+                    }
+                )
+                for stint in range(3):
+                    rows[model.StintSummary].append(
+                        {
+                            "driver_race_summary_id": summary_id,
+                            "stint": stint + 1,
+                            "average_time": seconds(70, 75),
+                            "fastest_lap": int(rng.integers(1, 71)),
+                            "fastest_lap_time": seconds(65, 70),
+                            "lap_count": 23,
+                            "compound": _COMPOUNDS[stint],
+                        }
+                    )
+                pit_summary_id = len(rows[model.PitSummary]) + 1
+                durations = [seconds(20, 30), seconds(20, 30)]
+                rows[model.PitSummary].append(
+                    {
+                        "id": pit_summary_id,
+                        "driver_race_summary_id": summary_id,
+                        "average": sum(durations, datetime.timedelta()) / 2,
+                        "total_time": sum(durations, datetime.timedelta()),
+                    }
+                )
+                for stop, duration in enumerate(durations):
+                    rows[model.PitStop].append(
+                        {
+                            "pit_summary_id": pit_summary_id,
+                            "lap_number": 23 * (stop + 1),
+                            "stop": stop + 1,
+                            "duration": duration,
+                        }
+                    )
+                for i in range(overtakes):
+                    rows[model.Overtake].append(
+                        {
+                            "driver_race_summary_id": summary_id,
+                            "time": seconds(300 * i, 300 * (i + 1)),
+                            "lap_number": 6 * i + 1,
+                            "position": int(rng.integers(1, drivers + 1)),
+                            "passed_driver_id": driver_ids[int(rng.integers(0, drivers))],
+                            "passing_status": _STATUSES[int(rng.integers(0, len(_STATUSES)))],
+                            "passing_status_override": None,
+                        }
+                    )
+
+    with Session(engine) as tx:
+        for table, table_rows in rows.items():
+            tx.execute(table.__table__.insert(), table_rows)
+        refresh_rankings(tx)
+        tx.commit()
+
+
+def benchmark_db(engine: sqlalchemy.engine.Engine, repeat=20) -> pd.DataFrame:
+    """
+    Returns the mean time in milliseconds of re-writing the last race and of each
+    of the `FRONTEND_QUERIES`, without the secondary indexes of the models
+    (Before) and with them (After).
+
+    The race is written with a lookup per row, as the `get_or_create` methods
+    do, and as the scrape writes it, with `model.bulk_upsert`, which needs the
+    natural key indexes, and `refresh_rankings`.
+    """
+    indexes = [index for table in model.Base.metadata.sorted_tables for index in table.indexes]
+    race = _last_race_rows(engine)
+    params = race["params"]
+
+    report = {}
+    for label in ("Before", "After"):
+        # SQLite's reflection skips expression indexes, so they aren't checked first
+        with engine.begin() as conn:
+            for index in indexes:
+                if label == "Before":
+                    conn.execute(sqlalchemy.text(f"DROP INDEX IF EXISTS {index.name}"))
+                else:
+                    index.create(conn)
+
+        times = {"write: row lookups": _time(lambda: _write_race_per_row(engine, race), repeat)}
+        if label == "After":
+            times["write: bulk upsert"] = _time(lambda: _write_race_bulk(engine, race), repeat)
+        with engine.connect() as conn:
+            for name, query in FRONTEND_QUERIES.items():
+                query = sqlalchemy.text(query)
+                times[name] = _time(lambda: conn.execute(query, params).all(), repeat)
+        report[label] = times
+
+    df = pd.DataFrame(report)
+    df["Speedup"] = (df["Before"] / df["After"]).round(1)
+    return df.round(3)
+
+
+def _time(fn, repeat) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def _last_race_rows(engine: sqlalchemy.engine.Engine) -> dict:
+    """
+    Returns the rows of the last race in each table, as the scrape writes them,
+    and the parameters of the `FRONTEND_QUERIES` for its first driver.
+    """
+    race = model.Race.__table__
+    summaries = model.DriverRaceSummary.__table__
+    pit_summaries = model.PitSummary.__table__
+    with engine.connect() as conn:
+        race = conn.execute(select(race).order_by(race.c.id.desc()).limit(1)).one()
+        summary_ids = select(summaries.c.id).where(summaries.c.race_id == race.id)
+        pit_summary_ids = select(pit_summaries.c.id).where(
+            pit_summaries.c.driver_race_summary_id.in_(summary_ids)
+        )
+
+        rows = {}
+        for table in _RACE_TABLES:
+            columns = table.__table__.c
+            if table is model.DriverRaceSummary:
+                where = columns.race_id == race.id
+            elif table is model.PitStop:
+                where = columns.pit_summary_id.in_(pit_summary_ids)
+            else:
+                where = columns.driver_race_summary_id.in_(summary_ids)
+            rows[table] = [
+                {key: value for key, value in row._mapping.items() if key not in _NOT_SCRAPED}
+                for row in conn.execute(select(table.__table__).where(where))
+            ]
+
+        summary = conn.execute(summary_ids.order_by(summaries.c.id).limit(1)).one()
+        driver_id = conn.execute(
+            select(summaries.c.driver_id).where(summaries.c.id == summary.id)
+        ).scalar_one()
+
+    rows["params"] = {
+        "race_id": race.id,
+        "year": race.year,
+        "circuit_id": race.circuit_id,
+        "driver_id": driver_id,
+        "driver_race_summary_id": summary.id,
+    }
+    return rows
+
+
+def _write_race_per_row(engine: sqlalchemy.engine.Engine, race: dict):
+    with Session(engine) as tx:
+        for row in race[model.DriverRaceSummary]:
+            model.DriverRaceSummary.upsert(tx, **row)
+        for row in race[model.LapSummary]:
+            model.LapSummary.get_or_create(tx, **row)
+        for row in race[model.StintSummary]:
+            model.StintSummary.upsert(tx, **row)
+        for row in race[model.PitSummary]:
+            model.PitSummary.get_or_create(tx, **row)
+        for row in race[model.PitStop]:
+            model.PitStop.get_or_create(tx, **row)
+        for row in race[model.Overtake]:
+            model.Overtake.get_or_create(tx, **row)
+        tx.commit()
+
+
+def _write_race_bulk(engine: sqlalchemy.engine.Engine, race: dict):
+    with Session(engine) as tx:
+        for table in _RACE_TABLES:
+            model.bulk_upsert(tx, table, race[table])
+        refresh_rankings(tx, [race["params"]["race_id"]])
+        tx.commit()
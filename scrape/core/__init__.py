@@ -1,4 +1,11 @@
+from scrape.core.cache import *
 from scrape.core.circuit import *
 from scrape.core.driver import *
+from scrape.core.fetch import *
+from scrape.core.laps import *
+from scrape.core.pit import *
 from scrape.core.session import *
+from scrape.core.shared import *
+from scrape.core.telemetry import *
+from scrape.core.timeline import *
 from scrape.core.timing import *
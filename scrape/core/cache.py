@@ -0,0 +1,76 @@
+import logging
+import os
+
+import fastf1 as ff1
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+__all__ = ["read_frame_cache", "write_frame_cache"]
+
+
+def _frame_cache_path(api_path: str, name: str) -> str | None:
+    """
+    Processed frames are stored next to fastf1's cache files of the same
+    session, or season for an api path like "/static/2022/". Returns None if
+    the fastf1 cache isn't enabled.
+    """
+    cache = ff1.api.Cache
+    if not cache._CACHE_DIR or cache._tmp_disabled:
+        return None
+    # leading '/static/' is dropped from the api path, same as fastf1
+    return os.path.join(cache._CACHE_DIR, api_path[8:], f"{name}.arrow")
+
+
+def read_frame_cache(api_path: str, name: str, version: int) -> pd.DataFrame | None:
+    """
+    Returns a processed frame of a session stored as Arrow IPC, or None if it
+    isn't cached or was written by another version of the code processing it.
+
+    The file is memory-mapped, so numeric columns are read without copying and
+    are read-only.
+    """
+    path = _frame_cache_path(api_path, name)
+    if path is None or not os.path.isfile(path) or ff1.api.Cache._FORCE_RENEW:
+        return None
+
+    try:
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    except (OSError, pa.ArrowInvalid) as exc:
+        logging.warning(f"Failed to read cached {name}: {exc}")
+        return None
+
+    metadata = table.schema.metadata or {}
+    if metadata.get(b"version") != str(version).encode():
+        logging.info(f"Cached {name} is outdated")
+        return None
+
+    logging.info(f"Using cached {name}")
+    df = table.to_pandas(split_blocks=True)
+
+    # Arrow doesn't distinguish None and NaN; missing strings have always been NaN.
+    for field in table.schema:
+        if pa.types.is_string(field.type):
+            df[field.name] = df[field.name].fillna(np.nan)
+    return df
+
+
+def write_frame_cache(api_path: str, name: str, version: int, df: pd.DataFrame):
+    """
+    Stores a processed frame of a session as Arrow IPC.
+    """
+    path = _frame_cache_path(api_path, name)
+    if path is None:
+        return
+
+    table = pa.Table.from_pandas(df)
+    table = table.replace_schema_metadata(
+        {**(table.schema.metadata or {}), b"version": str(version).encode()}
+    )
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
@@ -1,11 +1,18 @@
-import fastf1 as ff1
+from functools import partial
+
 import pandas as pd
+
+from scrape.core.fetch import Fetcher, fetch
 from scrape.data import DataMapping, flatten
 
-__all__ = ["get_circuits"]
+__all__ = ["get_circuits", "fetch_circuits"]
 
 
 def get_circuits(year: int) -> pd.DataFrame:
+    return fetch(partial(fetch_circuits, year=year))[0]
+
+
+async def fetch_circuits(fetcher: Fetcher, year: int) -> pd.DataFrame:
     mapping: dict[str, DataMapping] = {
         "circuitId": DataMapping("CircuitID", str),
         "circuitName": DataMapping("Name", str),
@@ -15,11 +22,7 @@ def get_circuits(year: int) -> pd.DataFrame:
 
     url = "https://ergast.com/api/f1/{year}/circuits.json".format(year=year)
 
-    res = ff1.api.Cache.requests_get(url)
-    if res.status_code != 200:
-        raise Exception(f"expected 200 status, got: {res.status_code}")
-
-    content = res.json()["MRData"]["CircuitTable"]["Circuits"]
+    content = (await fetcher.get_json(url))["MRData"]["CircuitTable"]["Circuits"]
     circuits = []
     for item in content:
         data = {}
@@ -1,13 +1,42 @@
 import datetime
-import fastf1 as ff1
+from functools import partial
+
 import pandas as pd
 
+from scrape.core.cache import read_frame_cache, write_frame_cache
+from scrape.core.fetch import Fetcher, fetch
 from scrape.data import DataMapping
 
-__all__ = ["get_drivers", "add_driver_id_or_number"]
+__all__ = ["get_drivers", "fetch_drivers", "add_driver_id_or_number"]
+
+# version of the driver tables stored on disk, to increase when `fetch_drivers` changes
+DRIVERS_VERSION = 1
+
+_drivers: dict[int, pd.DataFrame] = {}
 
 
 def get_drivers(year: int) -> pd.DataFrame:
+    """
+    Returns the drivers of a season, fetched once per process. The drivers of
+    past seasons don't change, so they are also stored next to fastf1's cache.
+    """
+    if year not in _drivers:
+        _drivers[year] = _load_drivers(year)
+    return _drivers[year].copy()
+
+
+def _load_drivers(year: int) -> pd.DataFrame:
+    api_path = f"/static/{year}/"
+    past_season = year < datetime.date.today().year
+    df = read_frame_cache(api_path, "drivers", DRIVERS_VERSION) if past_season else None
+    if df is None:
+        df = fetch(partial(fetch_drivers, year=year))[0]
+        if past_season:
+            write_frame_cache(api_path, "drivers", DRIVERS_VERSION, df)
+    return df
+
+
+async def fetch_drivers(fetcher: Fetcher, year: int) -> pd.DataFrame:
     URL = "https://ergast.com/api/f1/{year}/drivers.json"
     mapping: dict[str, DataMapping] = {
         "driverId": DataMapping("DriverID", str),
@@ -21,11 +50,7 @@ def get_drivers(year: int) -> pd.DataFrame:
 
     url = URL.format(year=year)
 
-    res = ff1.api.Cache.requests_get(url)
-    if res.status_code != 200:
-        raise Exception(f"expected 200 status, got: {res.status_code}")
-
-    content = res.json()["MRData"]["DriverTable"]["Drivers"]
+    content = (await fetcher.get_json(url))["MRData"]["DriverTable"]["Drivers"]
     drivers = []
     for item in content:
         data = {}
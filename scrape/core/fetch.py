@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable
+
+import fastf1 as ff1
+import httpx
+import requests
+from requests_cache.policy.actions import get_expiration_datetime
+
+__all__ = ["fetch", "Fetcher", "ERGAST_PAGE_LIMIT"]
+
+# Ergast returns this many results per page by default
+ERGAST_PAGE_LIMIT = 30
+
+
+def fetch(*calls: Callable[[Fetcher], Awaitable], concurrency=8) -> list:
+    """
+    Runs the calls concurrently over one `Fetcher` and returns their results, e.g.
+    `fetch(partial(fetch_drivers, year=2022), partial(fetch_circuits, year=2022))`.
+
+    When called from a running event loop, e.g. in a notebook, the calls run in
+    their own loop on a worker thread.
+    """
+
+    async def run():
+        async with Fetcher(concurrency) as fetcher:
+            return await asyncio.gather(*(call(fetcher) for call in calls))
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(run())
+    with ThreadPoolExecutor(1) as executor:
+        return executor.submit(asyncio.run, run()).result()
+
+
+class Fetcher:
+    """
+    Sends GET requests concurrently over a pool of at most `concurrency`
+    connections.
+
+    Responses are read from and written to fastf1's HTTP cache when it is
+    enabled, so they are shared with `ff1.api.Cache.requests_get`. Expired
+    responses are still used if the request fails.
+    """
+
+    def __init__(self, concurrency=8, timeout=30.0):
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=concurrency), timeout=timeout
+        )
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def __aenter__(self) -> Fetcher:
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._client.aclose()
+
+    async def get(self, url: str) -> requests.Response:
+        """
+        Returns the response of a GET request, as `ff1.api.Cache.requests_get` does.
+        """
+        request = requests.Request("GET", url).prepare()
+        session = ff1.api.Cache._requests_session
+        cache = None if session is None or ff1.api.Cache._tmp_disabled else session.cache
+
+        key = cached = None
+        if cache is not None:
+            # same key as the session's, which includes e.g. a CA bundle from the environment
+            settings = session.merge_environment_settings(url, {}, None, None, None)
+            key = cache.create_key(request, verify=settings["verify"])
+            cached = cache.get_response(key)
+            if cached is not None and not cached.is_expired:
+                return cached
+
+        try:
+            async with self._semaphore:
+                res = await self._client.get(url)
+        except httpx.HTTPError as exc:
+            if cached is None:
+                raise
+            logging.warning(f"Using expired response of {url}: {exc}")
+            return cached
+
+        response = _to_requests_response(request, res)
+        if response.status_code != 200 and cached is not None:
+            return cached
+        if response.status_code == 200 and cache is not None:
+            cache.save_response(response, key, get_expiration_datetime(session.expire_after))
+        return response
+
+    async def get_json(self, url: str):
+        """
+        Returns the decoded body of a GET request, which must succeed.
+        """
+        res = await self.get(url)
+        if res.status_code != 200:
+            raise Exception(f"expected 200 status, got: {res.status_code}")
+        return res.json()
+
+    async def get_ergast_pages(self, url: str, limit=ERGAST_PAGE_LIMIT) -> list[dict]:
+        """
+        Returns the `MRData` of every page of an Ergast query. The first page
+        gives the total number of results, then the other pages are requested at
+        once.
+        """
+        page_url = url + "?limit={limit}&offset={offset}"
+        first = (await self.get_json(page_url.format(limit=limit, offset=0)))["MRData"]
+        rest = await asyncio.gather(
+            *(
+                self.get_json(page_url.format(limit=limit, offset=offset))
+                for offset in range(limit, int(first["total"]), limit)
+            )
+        )
+        return [first] + [body["MRData"] for body in rest]
+
+
+def _to_requests_response(
+    request: requests.PreparedRequest, res: httpx.Response
+) -> requests.Response:
+    response = requests.Response()
+    response.status_code = res.status_code
+    response.reason = res.reason_phrase
+    response.url = str(res.url)
+    # the content is already decoded
+    response.headers = requests.structures.CaseInsensitiveDict(
+        (name, value) for name, value in res.headers.items() if name != "content-encoding"
+    )
+    response.encoding = res.encoding
+    response._content = res.content
+    response.request = request
+    return response
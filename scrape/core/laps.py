@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import fastf1 as ff1
+import numpy as np
+import pandas as pd
+
+__all__ = ["LapIndex", "LapTable"]
+
+_NAT = np.iinfo(np.int64).min
+
+
+class LapIndex:
+    """
+    Finds a driver's lap at a given time with a binary search instead of
+    filtering the laps.
+
+    A lap covers `LapStartTime` up to, but not including, `LapStartTime + LapTime`.
+    Laps without a start time or lap time are never found.
+    """
+
+    def __init__(self, laps: ff1.core.Laps):
+        self.laps = laps
+
+        drivers = laps["DriverNumber"].to_numpy(dtype=object)
+        starts = _to_ns(laps["LapStartTime"])
+        ends = _to_ns(laps["LapStartTime"] + laps["LapTime"])
+        valid = (starts != _NAT) & (ends != _NAT)
+
+        self._index: dict[str, tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = {}
+        for drv in pd.unique(drivers[valid]):
+            rows = np.flatnonzero(valid & (drivers == drv))
+            rows = rows[np.argsort(starts[rows], kind="stable")]
+            # the latest end of the laps starting before each lap, to find overlapping laps
+            earlier_end = np.r_[_NAT, np.maximum.accumulate(ends[rows])[:-1]]
+            self._index[drv] = (starts[rows], ends[rows], earlier_end, rows)
+
+    def rows_at(self, drivers, times):
+        """
+        Returns the row position in the laps of the driver's lap at the given
+        time, or -1 if there is no lap at the time. Returns an array if an array
+        of times is given, with either one driver or one driver per time.
+        """
+        scalar = np.ndim(times) == 0
+        times = _to_ns(np.atleast_1d(times))
+        drivers = np.broadcast_to(np.asarray(drivers, dtype=object), times.shape)
+
+        result = np.full(len(times), -1, dtype=np.int64)
+        for drv in pd.unique(drivers):
+            if drv not in self._index:
+                continue
+            starts, ends, earlier_end, rows = self._index[drv]
+
+            mask = drivers == drv
+            t = times[mask]
+            i = np.searchsorted(starts, t, side="right") - 1
+            j = np.maximum(i, 0)
+            found = (i >= 0) & (t < ends[j])
+            earlier = (i >= 0) & (t < earlier_end[j])
+            if (found & earlier).any():
+                raise Exception("Expected at most 1 lap")
+
+            selected = np.where(found, rows[j], -1)
+            # only a lap starting earlier covers the time
+            for k in np.flatnonzero(earlier):
+                covering = np.flatnonzero((starts <= t[k]) & (t[k] < ends))
+                if len(covering) > 1:
+                    raise Exception("Expected at most 1 lap")
+                selected[k] = rows[covering[0]]
+            result[mask] = selected
+        return int(result[0]) if scalar else result
+
+    def lap_numbers_at(self, drivers, times):
+        """
+        Same as `rows_at`, but returns lap numbers, NaN if there is no lap at the
+        time.
+        """
+        rows = np.atleast_1d(self.rows_at(drivers, times))
+        lap_numbers = np.where(
+            rows >= 0, self.laps["LapNumber"].to_numpy(dtype=float)[np.maximum(rows, 0)], np.nan
+        )
+        return lap_numbers[0] if np.ndim(times) == 0 else lap_numbers
+
+    def lap_at(self, driver: str, time: pd.Timedelta) -> ff1.core.Lap | None:
+        """
+        Returns the driver's lap at the given time, or None if there is no lap at
+        the time.
+        """
+        row = self.rows_at(driver, time)
+        return None if row < 0 else self.laps.iloc[row]
+
+
+class LapTable:
+    """
+    The laps of a session filtered and grouped once, so the race summaries share
+    them instead of each querying and grouping the laps again.
+
+    Attributes:
+        laps: all laps
+        no_pit: laps without a pit in or pit out time
+        clean: laps without a pit in or pit out time, with a lap time
+        accurate: laps fastf1 marks as accurate, with a lap time
+        laps_completed: last lap number of each driver
+        stint_laps: number of laps of each (driver, stint)
+    """
+
+    def __init__(self, laps: ff1.core.Laps):
+        self.laps = laps
+
+        timed = laps["LapTime"].notna()
+        no_pit = laps["PitOutTime"].isnull() & laps["PitInTime"].isnull()
+        self.no_pit = laps[no_pit]
+        self.clean = laps[no_pit & timed]
+        self.accurate = laps[(laps["IsAccurate"] == True) & timed]  # noqa: E712
+
+        self.laps_completed = laps.groupby("DriverNumber")["LapNumber"].max()
+        self.stint_laps = laps.groupby(["DriverNumber", "Stint"])["LapNumber"].count()
+
+    @staticmethod
+    def lap_times(laps: ff1.core.Laps, by) -> pd.DataFrame:
+        """
+        Returns the AverageTime, FastestLap and FastestLapTime of the laps
+        grouped by the given columns.
+        """
+        return (
+            laps.groupby(by)
+            .agg(minidx=("LapTime", "idxmin"), AverageTime=("LapTime", "mean"))
+            .join(laps[["LapNumber", "LapTime"]], on="minidx")
+            .rename(columns={"LapNumber": "FastestLap", "LapTime": "FastestLapTime"})
+            .drop(columns=["minidx"])
+        )
+
+
+def _to_ns(times) -> np.ndarray:
+    return pd.TimedeltaIndex(times).asi8
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+__all__ = ["PitIntervals"]
+
+_MIN_NS = np.iinfo(np.int64).min
+_MAX_NS = np.iinfo(np.int64).max
+_PIT_STATUSES = ("PIT_IN", "PIT_OUT", "PIT_LANE")
+
+
+class PitIntervals:
+    """
+    Sorted, non-overlapping pit intervals per driver, queried with a binary
+    search instead of scanning the timing data or laps.
+
+    Build it with `from_timings` or `from_laps`.
+    """
+
+    def __init__(self, intervals: dict[str, tuple[np.ndarray, np.ndarray]]):
+        self._intervals = {
+            driver: _merge(starts, ends) for driver, (starts, ends) in intervals.items()
+        }
+
+    @classmethod
+    def from_timings(cls, timings: pd.DataFrame) -> PitIntervals:
+        """
+        Intervals from the timing `Status` column. A run of timing rows with a pit
+        status spans from the timing row before the run to the timing row after
+        it, so a time between those rows is in the pit.
+        """
+        time = _to_ns(timings["Time"])
+        in_pit = timings["Status"].isin(_PIT_STATUSES).to_numpy()
+        drivers = timings["DriverNumber"].to_numpy(dtype=object)
+
+        intervals = {}
+        bounds = np.flatnonzero(drivers[1:] != drivers[:-1]) + 1
+        for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(drivers)]):
+            driver_time = np.r_[_MIN_NS, time[start:stop], _MAX_NS]
+            edges = np.diff(np.r_[0, in_pit[start:stop].astype(np.int8), 0])
+            # with the padding, run [first, last] spans from time[first - 1] to time[last + 1]
+            first, last = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+            intervals[drivers[start]] = (driver_time[first], driver_time[last + 2])
+        return cls(intervals)
+
+    @classmethod
+    def from_laps(cls, laps: pd.DataFrame) -> PitIntervals:
+        """
+        Intervals from each `PitInTime` to the driver's next `PitOutTime`. A pit in
+        or pit out time without its counterpart is a single point in time.
+        """
+        intervals = {}
+        for driver, driver_laps in laps.groupby("DriverNumber", sort=False):
+            pit_in = _to_ns(driver_laps["PitInTime"])
+            pit_out = _to_ns(driver_laps["PitOutTime"])
+            pit_in, pit_out = pit_in[pit_in != _MIN_NS], pit_out[pit_out != _MIN_NS]
+            events = np.r_[pit_in, pit_out]
+            is_out = np.r_[np.zeros(len(pit_in), bool), np.ones(len(pit_out), bool)]
+            order = np.argsort(events, kind="stable")
+
+            starts, ends = [], []
+            last_pit_in = None
+            for event, out in zip(events[order], is_out[order]):
+                if not out:
+                    if last_pit_in is not None:
+                        starts.append(last_pit_in)
+                        ends.append(last_pit_in)
+                    last_pit_in = event
+                else:
+                    starts.append(event if last_pit_in is None else last_pit_in)
+                    ends.append(event)
+                    last_pit_in = None
+            if last_pit_in is not None:
+                starts.append(last_pit_in)
+                ends.append(last_pit_in)
+            intervals[driver] = (np.array(starts, np.int64), np.array(ends, np.int64))
+        return cls(intervals)
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        """
+        Returns the intervals as named arrays, see `from_arrays`.
+        """
+        arrays = {}
+        for driver, (starts, ends) in self._intervals.items():
+            arrays[f"{driver}/starts"] = starts
+            arrays[f"{driver}/ends"] = ends
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, np.ndarray]) -> PitIntervals:
+        """
+        Returns the intervals of `to_arrays`, using the arrays without copying them.
+        """
+        pit_intervals = cls({})
+        for key in arrays:
+            driver, name = key.split("/")
+            if name == "starts":
+                pit_intervals._intervals[driver] = (arrays[key], arrays[f"{driver}/ends"])
+        return pit_intervals
+
+    def contains(self, driver: str, times, before=pd.Timedelta(0), after=pd.Timedelta(0)):
+        """
+        Returns True if the driver was in the pit at the given time, or a boolean
+        array if an array of times is given.
+
+        Args:
+            before: tolerance added before the start of each interval
+            after: tolerance added after the end of each interval
+        """
+        scalar = np.ndim(times) == 0
+        times = _to_ns(np.atleast_1d(times))
+
+        result = np.zeros(len(times), dtype=bool)
+        starts, ends = self._intervals.get(driver, (np.empty(0, np.int64),) * 2)
+        valid = times != _MIN_NS
+        if len(starts) and valid.any():
+            times = times[valid]
+            i = np.searchsorted(starts, times + pd.Timedelta(before).value, side="right") - 1
+            # ends are sorted too, so only the last interval starting before the time can contain it
+            result[valid] = (i >= 0) & (ends[np.maximum(i, 0)] >= times - pd.Timedelta(after).value)
+        return bool(result[0]) if scalar else result
+
+
+def _merge(starts: np.ndarray, ends: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    if len(starts) == 0:
+        return starts, ends
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], np.maximum.accumulate(ends[order])
+    # a new interval begins where it starts after every previous interval ended
+    new = np.r_[True, starts[1:] > ends[:-1]]
+    last = np.r_[np.flatnonzero(new)[1:] - 1, len(starts) - 1]
+    return starts[new], ends[last]
+
+
+def _to_ns(times) -> np.ndarray:
+    return pd.TimedeltaIndex(times).asi8
@@ -1,13 +1,19 @@
 import datetime
-import fastf1 as ff1
+from functools import partial
+
 import pandas as pd
 
+from scrape.core.fetch import Fetcher, fetch
 from scrape.data import DataMapping, flatten
 
-__all__ = ["get_drivers", "add_driver_id_or_number"]
+__all__ = ["get_schedule", "fetch_schedule"]
 
 
 def get_schedule(year: int) -> pd.DataFrame:
+    return fetch(partial(fetch_schedule, year=year))[0]
+
+
+async def fetch_schedule(fetcher: Fetcher, year: int) -> pd.DataFrame:
     URL = "https://ergast.com/api/f1/{year}.json"
     mapping: dict[str, DataMapping] = {
         "Circuit.circuitId": DataMapping("CircuitID", str),
@@ -17,11 +23,7 @@ def get_schedule(year: int) -> pd.DataFrame:
 
     url = URL.format(year=year)
 
-    res = ff1.api.Cache.requests_get(url)
-    if res.status_code != 200:
-        raise Exception(f"expected 200 status, got: {res.status_code}")
-
-    content = res.json()["MRData"]["RaceTable"]["Races"]
+    content = (await fetcher.get_json(url))["MRData"]["RaceTable"]["Races"]
     events = []
     for item in content:
         flattened = flatten(item)
@@ -6,9 +6,19 @@ import numpy as np
 
 import fastf1 as ff1
 
-from scrape.core.timing import Timing, get_timing_data
+from scrape.core.cache import read_frame_cache, write_frame_cache
+from scrape.core.laps import LapIndex, LapTable
+from scrape.core.pit import PitIntervals
+from scrape.core.telemetry import TelemetryStore
+from scrape.core.timeline import PositionTimeline
+from scrape.core.timing import PARSER_VERSION, Timing, TimingStatus, parse_timing_data
 
-__all__ = ["get_session", "Session"]
+__all__ = ["get_session", "Session", "TRACK_STATUS_RAISED_TOLERANCE"]
+
+# track status counts from this long before it was raised
+TRACK_STATUS_RAISED_TOLERANCE = pd.Timedelta(3, "s")
+
+_NAT = np.iinfo(np.int64).min
 
 
 def get_session(year, gp, identifier=None, *, force_ergast=False, event=None) -> Session:
@@ -24,6 +34,13 @@ class Session(ff1.core.Session):
             setattr(self, key, val)
         self._timing_data: Timing
         self._track_status_data: pd.DataFrame
+        self._track_status_intervals: tuple[np.ndarray, np.ndarray]
+        self._position_timeline = None
+        self._pit_intervals = None
+        self._pit_stop_intervals = None
+        self._lap_index = None
+        self._lap_table = None
+        self._telemetry_store = None
 
     @property
     def timings(self):
@@ -33,56 +50,270 @@ class Session(ff1.core.Session):
     def track_status(self):
         return self._get_property_warn_not_loaded("_track_status_data")
 
+    @property
+    def position_timeline(self) -> PositionTimeline:
+        """
+        Who was in which position when; built from the timing data on first use.
+        """
+        if self._position_timeline is None:
+            self._position_timeline = PositionTimeline(self.timings)
+        return self._position_timeline
+
+    @property
+    def lap_index(self) -> LapIndex:
+        """
+        Which lap each driver was on when; built from the laps on first use.
+        """
+        if self._lap_index is None:
+            self._lap_index = LapIndex(self.laps)
+        return self._lap_index
+
+    @property
+    def lap_table(self) -> LapTable:
+        """
+        The laps filtered and grouped for the race summaries; built from the
+        laps on first use.
+        """
+        if self._lap_table is None:
+            self._lap_table = LapTable(self.laps)
+        return self._lap_table
+
+    @property
+    def telemetry_store(self) -> TelemetryStore:
+        """
+        Position and car data of each driver for queries over time windows;
+        built from the telemetry on first use.
+        """
+        if self._telemetry_store is None:
+            self._telemetry_store = TelemetryStore(self.pos_data, self.car_data)
+        return self._telemetry_store
+
+    @property
+    def pit_intervals(self) -> PitIntervals:
+        """
+        When each driver was in the pit according to the timing `Status`; built
+        from the timing data on first use.
+        """
+        if self._pit_intervals is None:
+            self._pit_intervals = PitIntervals.from_timings(self.timings)
+        return self._pit_intervals
+
+    @property
+    def pit_stop_intervals(self) -> PitIntervals:
+        """
+        When each driver was in the pit according to the laps' `PitInTime` and
+        `PitOutTime`; built from the laps on first use.
+        """
+        if self._pit_stop_intervals is None:
+            self._pit_stop_intervals = PitIntervals.from_laps(self.laps)
+        return self._pit_stop_intervals
+
     def load(
-        self, *, laps=True, telemetry=True, weather=True, messages=True, timing=True, livedata=None
+        self,
+        *,
+        laps=True,
+        telemetry=True,
+        weather=True,
+        messages=True,
+        timing=True,
+        livedata=None,
+        timing_workers=1,
+        compact_timing=False,
     ):
         super().load(
             laps=laps, telemetry=telemetry, weather=weather, messages=messages, livedata=livedata
         )
+        self._lap_index = None
+        self._lap_table = None
+        self._pit_stop_intervals = None
+        self._telemetry_store = None
 
         if timing:
             try:
-                self._load_timing_data()
+                self._load_timing_data(workers=timing_workers, compact=compact_timing)
             except Exception as exc:
                 logging.warning("Failed to load timing data!")
                 logging.warning("Timing data failure traceback:", exc_info=exc)
 
-        self._track_status_data = pd.DataFrame(ff1.api.track_status_data(self.api_path))
+        self._load_track_status_data()
 
-    def _load_timing_data(self):
-        df = get_timing_data(self.api_path)
-        logging.info("Processing timing data...")
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        """
+        Returns the laps and the data derived from the session that has no
+        Python objects as named arrays, e.g. for sharing with worker processes.
+        See `from_arrays`.
+        """
+        laps = self.laps
+        arrays = {
+            "laps/DriverNumber": laps["DriverNumber"].to_numpy(dtype=str),
+            "laps/LapNumber": laps["LapNumber"].to_numpy(dtype=float),
+            "laps/LapStartTime": pd.TimedeltaIndex(laps["LapStartTime"]).asi8,
+            "laps/LapTime": pd.TimedeltaIndex(laps["LapTime"]).asi8,
+            "laps/Time": pd.TimedeltaIndex(laps["Time"]).asi8,
+        }
+        starts, ends = self._get_property_warn_not_loaded("_track_status_intervals")
+        arrays["track_status/starts"] = starts
+        arrays["track_status/ends"] = ends
+        for key, values in self.pit_intervals.to_arrays().items():
+            arrays[f"pit/{key}"] = values
+        for key, values in self.telemetry_store.to_arrays().items():
+            arrays[f"telemetry/{key}"] = values
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, np.ndarray]) -> Session:
+        """
+        Returns a Session with only the data of `to_arrays`: `laps` with the
+        DriverNumber, LapNumber, LapStartTime, LapTime and Time columns, the lap
+        index, the pit intervals, the track status and the telemetry store.
+        """
+
+        def prefixed(prefix):
+            return {
+                key[len(prefix) :]: values
+                for key, values in arrays.items()
+                if key.startswith(prefix)
+            }
+
+        session = cls.__new__(cls)
+        laps = prefixed("laps/")
+        session._laps = ff1.core.Laps(
+            {
+                "DriverNumber": laps["DriverNumber"].astype(object),
+                "LapNumber": laps["LapNumber"],
+                "LapStartTime": pd.to_timedelta(laps["LapStartTime"]),
+                "LapTime": pd.to_timedelta(laps["LapTime"]),
+                "Time": pd.to_timedelta(laps["Time"]),
+            },
+            session=session,
+        )
+        session._track_status_intervals = (
+            arrays["track_status/starts"],
+            arrays["track_status/ends"],
+        )
+        session._position_timeline = None
+        session._lap_index = None
+        session._lap_table = None
+        session._pit_intervals = PitIntervals.from_arrays(prefixed("pit/"))
+        session._pit_stop_intervals = None
+        session._telemetry_store = TelemetryStore.from_arrays(prefixed("telemetry/"))
+        return session
+
+    def _load_track_status_data(self):
+        df = read_frame_cache(self.api_path, "track_status", PARSER_VERSION)
+        if df is None:
+            df = pd.DataFrame(ff1.api.track_status_data(self.api_path))
+            write_frame_cache(self.api_path, "track_status", PARSER_VERSION, df)
+        self._track_status_data = df
+        self._track_status_intervals = _non_green_intervals(df)
+
+    def is_under_track_status(self, times):
+        """
+        Returns True if the time is during a non-green track status (yellow,
+        safety car, red flag, etc.), or a boolean array if an array of times is
+        given. The status counts from `TRACK_STATUS_RAISED_TOLERANCE` before it
+        was raised.
+        """
+        scalar = np.ndim(times) == 0
+        times = pd.TimedeltaIndex(np.atleast_1d(times)).asi8
+
+        result = np.zeros(len(times), dtype=bool)
+        starts, ends = self._get_property_warn_not_loaded("_track_status_intervals")
+        if len(starts):
+            # the periods follow each other, so ends are sorted too and only the
+            # last period starting before the time can contain it
+            i = np.searchsorted(starts, times, side="right") - 1
+            result = (i >= 0) & (ends[np.maximum(i, 0)] >= times)
+        return bool(result[0]) if scalar else result
 
-        def set_status(idx, df, value):
-            df.at[idx, "Status"] = value
-
-        df = df.rename(columns={"Status": "RawStatus"})
-
-        last_pit_status = None
-        cp = df.copy()
-        pit_ins = 0
-        pit_outs = 0
-        drv = None
-        for idx, row in cp.iterrows():
-            if row["DriverNumber"] != drv:
-                drv = row["DriverNumber"]
-                pit_ins = 0
-                pit_outs = 0
-            if row["LastSectorSegmentStatus"] == 2064:
-                set_status(idx, df, "PIT_LANE")
-                if last_pit_status == "PIT_OUT":
-                    last_pit_status = None
-            elif row["PitIn"]:
-                set_status(idx, df, "PIT_IN")
-                last_pit_status = "PIT_IN"
-                pit_ins += 1
-            elif row["PitOut"]:
-                set_status(idx, df, "PIT_OUT")
-                last_pit_status = "PIT_OUT"
-                pit_outs += 1
-            elif pit_ins > 1 and last_pit_status in ("PIT_IN", "PIT_OUT"):
-                set_status(idx, df, "PIT_LANE")
-
-        df = df[Timing._COLUMNS]
+    def laps_under_track_status(self, laps: ff1.core.Laps) -> np.ndarray:
+        """
+        Returns True for each lap with a non-green track status at any point
+        during the lap, e.g. to exclude safety car laps.
+        """
+        lap_start = pd.TimedeltaIndex(laps["LapStartTime"]).asi8
+        lap_end = pd.TimedeltaIndex(laps["Time"]).asi8
+
+        result = np.zeros(len(laps), dtype=bool)
+        starts, ends = self._get_property_warn_not_loaded("_track_status_intervals")
+        if len(starts):
+            # the first period not ended before the lap started
+            i = np.searchsorted(ends, lap_start, side="left")
+            result = (i < len(starts)) & (starts[np.minimum(i, len(starts) - 1)] <= lap_end)
+            result &= (lap_start != _NAT) & (lap_end != _NAT)
+        return result
+
+    def _load_timing_data(self, workers=1, compact=False):
+        # the processed frame is cached, so the stream isn't parsed and processed again.
+        # The stream is parsed again when the version changes, instead of reading
+        # fastf1's cache of get_timing_data, which doesn't know the version.
+        df = read_frame_cache(self.api_path, "timing", PARSER_VERSION)
+        if df is None:
+            df = self._process_timing_data(parse_timing_data(self.api_path, workers=workers))
+            write_frame_cache(self.api_path, "timing", PARSER_VERSION, df)
 
         self._timing_data = Timing(df, session=self)
+        self._position_timeline = None
+        self._pit_intervals = None
+        self._pit_stop_intervals = None
+        if compact:
+            self._timing_data = self._timing_data.compact()
+
+    @staticmethod
+    def _process_timing_data(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Derives the pit `Status` of each row. The raw status is kept as `RawStatus`.
+
+        Per driver, in row order:
+        - a pit lane segment (2064) is PIT_LANE, and clears a preceding PIT_OUT
+        - otherwise PitIn is PIT_IN and PitOut is PIT_OUT
+        - otherwise, after the driver's second PIT_IN, rows following a PIT_IN,
+          or a PIT_OUT that wasn't cleared, are PIT_LANE
+        """
+        logging.info("Processing timing data...")
+
+        df = df.rename(columns={"Status": "RawStatus"}, copy=False)
+
+        pit_lane = (df["LastSectorSegmentStatus"] == 2064).to_numpy()
+        pit_in = ~pit_lane & df["PitIn"].to_numpy()
+        pit_out = ~pit_lane & ~pit_in & df["PitOut"].to_numpy()
+
+        # PIT_IN count per consecutive block of driver rows
+        drivers = df["DriverNumber"]
+        blocks = (drivers != drivers.shift()).cumsum()
+        pit_ins = pd.Series(pit_in).groupby(blocks.to_numpy()).cumsum().to_numpy()
+
+        # last PIT_IN / PIT_OUT and whether a pit lane segment came after it
+        rows = np.arange(len(df), dtype=float)
+        last_pit = pd.Series(np.where(pit_in, 1, np.where(pit_out, 2, np.nan))).ffill()
+        last_pit_row = pd.Series(np.where(pit_in | pit_out, rows, np.nan)).ffill()
+        last_pit_lane_row = pd.Series(np.where(pit_lane, rows, np.nan)).ffill()
+        cleared = (last_pit_lane_row > last_pit_row).to_numpy()
+        after_pit = ((last_pit == 1) | ((last_pit == 2) & ~cleared)).to_numpy()
+
+        status = np.full(len(df), np.nan, dtype=object)
+        status[(pit_ins > 1) & after_pit] = TimingStatus.PIT_LANE.name
+        status[pit_out] = TimingStatus.PIT_OUT.name
+        status[pit_in] = TimingStatus.PIT_IN.name
+        status[pit_lane] = TimingStatus.PIT_LANE.name
+        df["Status"] = status
+
+        return df[Timing._COLUMNS]
+
+
+def _non_green_intervals(track_status: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the start and end times of each period with a non-green track
+    status, from `TRACK_STATUS_RAISED_TOLERANCE` before it was raised until the
+    track is green again.
+    """
+    starts, ends = [], []
+    last_non_green = None
+    for time, status in zip(track_status["Time"], track_status["Status"]):
+        if last_non_green is None and status != "1":
+            last_non_green = time
+        if last_non_green is not None and status == "1":
+            starts.append(last_non_green - TRACK_STATUS_RAISED_TOLERANCE)
+            ends.append(time)
+            last_non_green = None
+    return pd.TimedeltaIndex(starts).asi8, pd.TimedeltaIndex(ends).asi8
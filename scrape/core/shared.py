@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+__all__ = ["SharedArrays"]
+
+
+class SharedArrays:
+    """
+    Named NumPy arrays copied once into one shared memory block, so worker
+    processes read them without pickling or copying them.
+
+    Pickling a SharedArrays only pickles the name of the block and where each
+    array is in it. The process creating it owns the block: use it as a
+    context manager, or call `close` and `unlink` when the workers are done.
+    """
+
+    def __init__(self, arrays: dict[str, np.ndarray]):
+        self._layout: dict[str, tuple[int, str, tuple[int, ...]]] = {}
+        offset = 0
+        for name, array in arrays.items():
+            # keep each array aligned for its dtype
+            offset += -offset % max(array.dtype.alignment, 8)
+            self._layout[name] = (offset, array.dtype.str, array.shape)
+            offset += array.nbytes
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        self._owner = True
+        for name, array in arrays.items():
+            self._view(name)[...] = array
+
+    def __getstate__(self):
+        return {"name": self._shm.name, "layout": self._layout}
+
+    def __setstate__(self, state):
+        self._layout = state["layout"]
+        self._shm = shared_memory.SharedMemory(name=state["name"])
+        self._owner = False
+
+    def __enter__(self) -> SharedArrays:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        self.unlink()
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        """
+        Returns read-only views of the arrays.
+        """
+        arrays = {}
+        for name in self._layout:
+            arrays[name] = self._view(name)
+            arrays[name].flags.writeable = False
+        return arrays
+
+    def close(self):
+        self._shm.close()
+
+    def unlink(self):
+        if self._owner:
+            self._shm.unlink()
+
+    def _view(self, name: str) -> np.ndarray:
+        offset, dtype, shape = self._layout[name]
+        return np.ndarray(shape, dtype=np.dtype(dtype), buffer=self._shm.buf, offset=offset)
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+__all__ = ["TelemetryStore"]
+
+
+class TelemetryStore:
+    """
+    Each driver's position and car data as arrays sorted by `SessionTime`, for
+    queries over time windows without slicing the telemetry.
+
+    Channels are kept as prefix sums, so a query over any number of windows is
+    a binary search for each window's bounds. Windows include both their start
+    and end time.
+    """
+
+    def __init__(self, pos_data: dict[str, pd.DataFrame], car_data: dict[str, pd.DataFrame]):
+        self._pos = {
+            drv: _prefix_sums(data, off_track=data["Status"] == "OffTrack")
+            for drv, data in pos_data.items()
+        }
+        self._car = {
+            drv: _prefix_sums(
+                data, speed=data["Speed"].fillna(0), speed_samples=data["Speed"].notna()
+            )
+            for drv, data in car_data.items()
+        }
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        """
+        Returns the store as named arrays, see `from_arrays`.
+        """
+        arrays = {}
+        for kind, store in (("pos", self._pos), ("car", self._car)):
+            for drv, (time, sums) in store.items():
+                arrays[f"{kind}/{drv}/time"] = time
+                arrays.update({f"{kind}/{drv}/{name}": values for name, values in sums.items()})
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, np.ndarray]) -> TelemetryStore:
+        """
+        Returns the store of `to_arrays`, using the arrays without copying them.
+        """
+        store = cls({}, {})
+        stores = {"pos": store._pos, "car": store._car}
+        for key, values in arrays.items():
+            kind, drv, name = key.split("/")
+            if name != "time":
+                _, sums = stores[kind].setdefault(drv, (arrays[f"{kind}/{drv}/time"], {}))
+                sums[name] = values
+        return store
+
+    def position_samples(self, drivers, starts, ends) -> np.ndarray:
+        """
+        Returns the number of position samples of each driver within each window.
+        """
+        return _window_sums(self._pos, None, drivers, starts, ends)
+
+    def off_track_samples(self, drivers, starts, ends) -> np.ndarray:
+        """
+        Returns the number of position samples with an `OffTrack` status of each
+        driver within each window.
+        """
+        return _window_sums(self._pos, "off_track", drivers, starts, ends)
+
+    def mean_speed(self, drivers, starts, ends) -> np.ndarray:
+        """
+        Returns the mean speed of each driver within each window, NaN if there is
+        no speed sample in the window or a bound of the window is missing.
+        """
+        speed = _window_sums(self._car, "speed", drivers, starts, ends)
+        samples = _window_sums(self._car, "speed_samples", drivers, starts, ends)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = speed / samples
+        mean[pd.isnull(np.asarray(starts)) | pd.isnull(np.asarray(ends))] = np.nan
+        return mean
+
+
+def _prefix_sums(data: pd.DataFrame, **channels) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    time = pd.TimedeltaIndex(data["SessionTime"]).asi8
+    order = np.argsort(time, kind="stable")
+    sums = {
+        name: np.r_[0, np.cumsum(np.asarray(values, dtype=float)[order])]
+        for name, values in channels.items()
+    }
+    return np.ascontiguousarray(time[order]), sums
+
+
+def _window_sums(store: dict, channel: str | None, drivers, starts, ends) -> np.ndarray:
+    """
+    Returns the sum of the channel of each driver within each window, or the
+    number of samples if channel is None.
+    """
+    drivers = np.asarray(drivers, dtype=object)
+    starts = pd.TimedeltaIndex(starts).asi8
+    ends = pd.TimedeltaIndex(ends).asi8
+
+    result = np.zeros(len(drivers))
+    for drv in pd.unique(drivers):
+        if drv not in store:
+            continue
+        time, sums = store[drv]
+
+        mask = drivers == drv
+        lo = np.searchsorted(time, starts[mask], side="left")
+        hi = np.maximum(np.searchsorted(time, ends[mask], side="right"), lo)
+        result[mask] = hi - lo if channel is None else sums[channel][hi] - sums[channel][lo]
+    return result
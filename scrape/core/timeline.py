@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+__all__ = ["PositionTimeline"]
+
+
+class PositionTimeline:
+    """
+    Answers "who was in P at time T" with a binary search instead of filtering
+    the whole timing data.
+
+    For each position, keeps the sorted times at which the driver reported at
+    that position changes. The driver at a position is the driver of the most
+    recent timing row at that position.
+    """
+
+    def __init__(self, timings: pd.DataFrame):
+        position = pd.to_numeric(timings["Position"]).to_numpy(dtype=float, na_value=np.nan)
+        time = _to_ns(timings["Time"])
+        valid = ~np.isnan(position) & (time != np.iinfo(np.int64).min)
+
+        position = position[valid].astype(np.int64)
+        time = time[valid]
+        drivers = timings["DriverNumber"].to_numpy(dtype=object)[valid]
+        row = np.flatnonzero(valid)
+
+        # sort by position, then time. On equal times the first row wins, so
+        # later rows are sorted first.
+        order = np.lexsort((-row, time, position))
+        position, time, drivers = position[order], time[order], drivers[order]
+
+        self._timeline: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+        bounds = np.flatnonzero(np.diff(position)) + 1
+        for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(position)]):
+            times, drvs = time[start:stop], drivers[start:stop]
+            # only keep the rows where the driver changes
+            changes = np.r_[True, drvs[1:] != drvs[:-1]]
+            self._timeline[int(position[start])] = (times[changes], drvs[changes])
+
+    def driver_at(self, position: int, time: pd.Timedelta, exclude=None) -> str:
+        """
+        Returns the driver number at the position at the given time, or an
+        empty string if nobody was at the position yet.
+
+        Args:
+            exclude: driver numbers to ignore
+        """
+        if (entry := self._timeline.get(int(position))) is None:
+            return ""
+        times, drivers = entry
+
+        i = np.searchsorted(times, pd.Timedelta(time).value, side="right") - 1
+        if exclude is not None:
+            while i >= 0 and drivers[i] in exclude:
+                i -= 1
+        return drivers[i] if i >= 0 else ""
+
+    def drivers_at(self, positions, times, exclude=None) -> np.ndarray:
+        """
+        Bulk version of `driver_at` for arrays of positions and times.
+
+        Args:
+            exclude: one driver number to ignore per position and time
+
+        Returns:
+            array of driver numbers, empty string if nobody was at the position yet
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        times = _to_ns(times)
+        if exclude is not None:
+            exclude = np.asarray(exclude, dtype=object)
+
+        result = np.full(len(positions), "", dtype=object)
+        for position in np.unique(positions):
+            if (entry := self._timeline.get(int(position))) is None:
+                continue
+            position_times, drivers = entry
+
+            mask = positions == position
+            i = np.searchsorted(position_times, times[mask], side="right") - 1
+            if exclude is not None:
+                # consecutive change points never have the same driver, so one step back is enough
+                i -= (i >= 0) & (drivers[np.maximum(i, 0)] == exclude[mask])
+
+            found = i >= 0
+            selected = np.full(len(i), "", dtype=object)
+            selected[found] = drivers[i[found]]
+            result[mask] = selected
+        return result
+
+
+def _to_ns(times) -> np.ndarray:
+    return pd.TimedeltaIndex(times).asi8
@@ -1,42 +1,72 @@
+from __future__ import annotations
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from datetime import timedelta
+from enum import Enum, auto
 
 import fastf1 as ff1
-from fastf1.utils import recursive_dict_get
 import numpy as np
 import pandas as pd
 
-from scrape.data import DataMapping
+from scrape.core.laps import LapIndex
+from scrape.core.pit import PitIntervals
 
-__all__ = ["get_lap_at_time", "is_in_pit"]
+__all__ = ["get_lap_at_time", "is_in_pit", "gap_to_seconds", "TimingStatus"]
 
+# Version of the parsed and processed timing data. Frames cached by an older
+# version are parsed and processed again, so bump this whenever their content changes.
+PARSER_VERSION = 1
 
-EMPTY_STREAM = {
-    "Time": pd.NaT,
+
+# column order of the parsed timing stream
+STREAM_COLUMNS = [
+    "Time",
     # Driver info
-    "DriverNumber": str(),
-    "Position": np.NaN,
-    "GapToLeader": np.NaN,
-    "IntervalToPositionAhead": np.NaN,
-    "Retired": np.NaN,
+    "DriverNumber",
+    "Position",
+    "GapToLeader",
+    "IntervalToPositionAhead",
+    "Retired",
     # Lap
-    "LapNumber": np.NaN,
-    "Status": np.NaN,
+    "LapNumber",
+    "Status",
     # Sector
-    "LastSectorSegmentNumber": np.NaN,
-    "LastSectorSegmentStatus": np.NaN,
+    "LastSectorSegmentNumber",
+    "LastSectorSegmentStatus",
     # Flags
-    "PitIn": False,
-    "PitOut": False,
-}
+    "PitIn",
+    "PitOut",
+]
 
 
-@ff1.api.Cache.api_request_wrapper
-def get_timing_data(path, response=None, livedata=None) -> pd.DataFrame:
-    logging.info("Fetching timing stream data...")
+def get_timing_data(path, response=None, livedata=None, workers=1) -> pd.DataFrame:
+    """
+    Returns the timing stream of a session. The result is cached by fastf1,
+    regardless of `PARSER_VERSION`; see `parse_timing_data`.
+
+    Args:
+        workers: number of processes used to parse drivers in parallel. By
+            default, drivers are parsed one after another in this process.
+    """
 
-    if response is not None or livedata is not None:
-        raise Exception("response and livedata params aren't supported at this time")
+    # fastf1's cache only passes on path, response and livedata. The cache file
+    # is named after the wrapped function, so it has to stay "get_timing_data".
+    @ff1.api.Cache.api_request_wrapper
+    def get_timing_data(path, response=None, livedata=None):
+        if response is not None or livedata is not None:
+            raise Exception("response and livedata params aren't supported at this time")
+        return parse_timing_data(path, workers=workers)
+
+    return get_timing_data(path, response=response, livedata=livedata)
+
+
+def parse_timing_data(path, workers=1) -> pd.DataFrame:
+    """
+    Fetches the raw timing stream of a session and parses it, without fastf1's
+    cache of the parsed result, see `get_timing_data`. Only the HTTP response is
+    cached.
+    """
+    logging.info("Fetching timing stream data...")
 
     response = ff1.api.fetch_page(path, "timing_data")
     if response is None:
@@ -52,156 +82,386 @@ def get_timing_data(path, response=None, livedata=None) -> pd.DataFrame:
     for entry in response:
         if (len(entry) < 2) or "Lines" not in entry[1]:
             continue
-        for drv in entry[1]["Lines"]:
-            if drv not in resp_per_driver.keys():
-                resp_per_driver[drv] = [(entry[0], entry[1]["Lines"][drv])]
-            else:
-                resp_per_driver[drv].append((entry[0], entry[1]["Lines"][drv]))
+        for drv, line in entry[1]["Lines"].items():
+            resp_per_driver.setdefault(drv, []).append((entry[0], line))
+
+    # rows of all drivers are written into the same column buffers, grouped by driver
+    parser = TimingStreamParser()
+    if workers > 1 and len(resp_per_driver) > 1:
+        logging.info(f"Parsing {len(resp_per_driver)} drivers with {workers} workers...")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map keeps the driver order, so the result is the same as parsing serially
+            for driver_parser in executor.map(
+                _parse_driver, resp_per_driver.values(), resp_per_driver.keys()
+            ):
+                parser.extend(driver_parser)
+    else:
+        for drv in resp_per_driver.keys():
+            parser.parse_driver(resp_per_driver[drv], drv)
+
+    return parser.to_frame()
+
+
+def _parse_driver(driver_raw: list, drv: str) -> TimingStreamParser:
+    parser = TimingStreamParser(capacity=len(driver_raw))
+    parser.parse_driver(driver_raw, drv)
+    return parser
+
+
+class TimingStreamParser:
+    """
+    Columnar parser for the timing stream.
+
+    Rows are written straight into typed NumPy buffers that grow geometrically,
+    instead of a list of Python objects per column:
+
+    - `Time`: int64 nanoseconds
+    - `Position`, `LapNumber`: int16
+    - `Status`, `LastSectorSegmentStatus`: small ints
+    - `LastSectorSegmentNumber`: int8 codes of interned segment numbers ("1.1", "1.2", ...)
+    - `PitIn`, `PitOut`: bool
 
-    # create empty data dicts and populate them with data from all drivers after that
-    timing_data = {key: list() for key, val in EMPTY_STREAM.items()}
-    for drv in resp_per_driver.keys():
-        drv_timing_data = timing_data_driver(resp_per_driver[drv], EMPTY_STREAM, drv)
+    Missing integer values are stored as -1. `to_frame` converts the buffers to
+    the same columns and dtypes `get_timing_data` always returned.
+    """
+
+    INITIAL_CAPACITY = 4096
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self._size = 0
+        self._capacity = 0
+        self._drivers: list[tuple[str, int]] = []  # (driver number, row count)
+        self._segments: dict[tuple[str, str], int] = {}  # interned (sector, segment) -> code
+
+        self._time = np.empty(0, dtype=np.int64)
+        self._position = np.empty(0, dtype=np.int16)
+        self._lap_number = np.empty(0, dtype=np.int16)
+        self._status = np.empty(0, dtype=np.int32)
+        self._segment_number = np.empty(0, dtype=np.int8)
+        self._segment_status = np.empty(0, dtype=np.int16)
+        self._pit_in = np.empty(0, dtype=bool)
+        self._pit_out = np.empty(0, dtype=bool)
+        self._gap_to_leader = np.empty(0, dtype=object)
+        self._interval = np.empty(0, dtype=object)
+        self._retired = np.empty(0, dtype=object)
+        self._reserve(capacity)
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, capacity: int):
+        if capacity <= self._capacity:
+            return
+
+        def grow(buf, fill):
+            new = np.full(capacity, fill, dtype=buf.dtype)
+            new[: self._size] = buf[: self._size]
+            return new
+
+        self._time = grow(self._time, 0)
+        self._position = grow(self._position, -1)
+        self._lap_number = grow(self._lap_number, -1)
+        self._status = grow(self._status, -1)
+        self._segment_number = grow(self._segment_number, -1)
+        self._segment_status = grow(self._segment_status, -1)
+        self._pit_in = grow(self._pit_in, False)
+        self._pit_out = grow(self._pit_out, False)
+        self._gap_to_leader = grow(self._gap_to_leader, np.nan)
+        self._interval = grow(self._interval, np.nan)
+        self._retired = grow(self._retired, np.nan)
+        self._capacity = capacity
+
+    def parse_driver(self, driver_raw: list, drv: str):
+        """
+        Data is on a timestamp basis.
+
+        TODO: determine lap #1
+
+        Params:
+            driver_raw (list): raw api response for this driver only [(Timestamp, data), (...), ...]
+            drv (str): driver identifier
+        """
+        # the first two rows contain metadata and the initial position, so we can skip those.
+        first_time, first = driver_raw[2]
+        if "Position" not in first:
+            first = {**first, "Position": driver_raw[0][1]["Position"]}
+        rows = [(first_time, first)]
+        rows.extend(driver_raw[3:])
+
+        # every message creates at most one row
+        if (required := self._size + len(rows)) > self._capacity:
+            self._reserve(max(self._capacity * 2, required))
+
+        position_buf = self._position
+        lap_buf = self._lap_number
+        status_buf = self._status
+        segment_number_buf = self._segment_number
+        segment_status_buf = self._segment_status
+        pit_in_buf = self._pit_in
+        pit_out_buf = self._pit_out
+        gap_buf = self._gap_to_leader
+        interval_buf = self._interval
+        retired_buf = self._retired
+        segments = self._segments
+
+        # Position and LapNumber are filled up with the last known value because
+        # not every value is in every response. Everything else is left empty.
+        position = -1
+        lap_number = -1
+
+        times = []
+        start = i = self._size
+        for time, resp in rows:
+            new_entry = False
+
+            # messages only carry a handful of keys, so dispatch on the keys that are present
+            for key, val in resp.items():
+                if key == "Sectors":
+                    if val and (segment := _parse_sector_segment(val)):
+                        keys, segment_status = segment
+                        if (code := segments.get(keys)) is None:
+                            code = segments[keys] = len(segments)
+                        segment_number_buf[i] = code
+                        segment_status_buf[i] = segment_status
+                        new_entry = True
+                elif key == "Position":
+                    if val:
+                        position = _check_int16(int(val), "Position", drv)
+                        new_entry = True
+                elif key == "NumberOfLaps":
+                    if val:
+                        lap_number = _check_int16(int(val) + 1, "LapNumber", drv)
+                        new_entry = True
+                elif key == "IntervalToPositionAhead":
+                    if val and (val := val.get("Value")):
+                        interval_buf[i] = str(val)
+                        new_entry = True
+                elif key == "GapToLeader":
+                    if val:
+                        gap_buf[i] = str(val)
+                        new_entry = True
+                elif key == "InPit":
+                    if val:
+                        pit_in_buf[i] = True
+                    else:  # sometimes we don't get PitOut
+                        pit_out_buf[i] = True
+                    new_entry = True
+                elif key == "PitOut":
+                    if val:
+                        pit_out_buf[i] = True
+                        new_entry = True
+                elif key == "Status":
+                    if val:
+                        status_buf[i] = int(val)
+                        new_entry = True
+                elif key == "Retired":
+                    if val:
+                        retired_buf[i] = str(val)
+                        new_entry = True
+
+            # at least one value was present, create next row
+            if new_entry:
+                times.append(time)
+                position_buf[i] = position
+                lap_buf[i] = lap_number
+                i += 1
+
+        self._time[start:i] = _timestamps_to_ns(times)
+        self._size = i
+        self._drivers.append((drv, i - start))
+
+    def extend(self, other: TimingStreamParser):
+        """
+        Appends all rows of another parser, e.g. one that parsed a driver in a worker process.
+        """
+        n = other._size
+        if (required := self._size + n) > self._capacity:
+            self._reserve(max(self._capacity * 2, required))
+
+        # segment numbers are interned per parser
+        codes = np.full(len(other._segments) + 1, -1, dtype=np.int8)
+        for keys, code in other._segments.items():
+            if (own := self._segments.get(keys)) is None:
+                own = self._segments[keys] = len(self._segments)
+            codes[code + 1] = own
+
+        rows = slice(self._size, required)
+        self._time[rows] = other._time[:n]
+        self._position[rows] = other._position[:n]
+        self._lap_number[rows] = other._lap_number[:n]
+        self._status[rows] = other._status[:n]
+        self._segment_number[rows] = codes[other._segment_number[:n].astype(np.int16) + 1]
+        self._segment_status[rows] = other._segment_status[:n]
+        self._pit_in[rows] = other._pit_in[:n]
+        self._pit_out[rows] = other._pit_out[:n]
+        self._gap_to_leader[rows] = other._gap_to_leader[:n]
+        self._interval[rows] = other._interval[:n]
+        self._retired[rows] = other._retired[:n]
+        self._size = required
+        self._drivers.extend(other._drivers)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Returns the parsed rows of all drivers, grouped by driver in parse order.
+        """
+        n = self._size
+        segment_labels = np.full(len(self._segments) + 1, np.nan, dtype=object)
+        for (sn, ssn), code in self._segments.items():
+            segment_labels[code + 1] = f"{int(sn) + 1}.{int(ssn) + 1}"
+        laps = int(self._lap_number[:n].max(initial=-1)) + 1
+        lap_labels = np.array([np.nan] + [str(i) for i in range(laps)], dtype=object)
+
+        drivers = np.empty(len(self._drivers), dtype=object)
+        drivers[:] = [drv for drv, _ in self._drivers]
+        counts = [count for _, count in self._drivers]
+
+        data = {
+            "Time": self._time[:n].view("timedelta64[ns]"),
+            "DriverNumber": np.repeat(drivers, counts),
+            "Position": _int_column(self._position[:n]),
+            "GapToLeader": _str_column(self._gap_to_leader[:n]),
+            "IntervalToPositionAhead": _str_column(self._interval[:n]),
+            "Retired": _str_column(self._retired[:n]),
+            "LapNumber": _str_column(lap_labels[self._lap_number[:n] + 1]),
+            "Status": _int_column(self._status[:n]),
+            "LastSectorSegmentNumber": _str_column(
+                segment_labels[self._segment_number[:n].astype(np.int16) + 1]
+            ),
+            "LastSectorSegmentStatus": _int_column(self._segment_status[:n]),
+            "PitIn": self._pit_in[:n],
+            "PitOut": self._pit_out[:n],
+        }
+        return pd.DataFrame(data, columns=STREAM_COLUMNS, copy=False)
+
+
+def _timestamps_to_ns(values: list[str]) -> np.ndarray:
+    """
+    Converts timing stream timestamps to int64 nanoseconds.
+
+    Timestamps are almost always formatted as HH:MM:SS.fff, which is parsed
+    in one go. Anything else falls back to parsing one timestamp at a time.
+    """
+    raw = np.array(values, dtype="S")
+    if raw.dtype.itemsize == 12 and len(raw):
+        digits = raw.view(np.uint8).reshape(-1, 12).astype(np.int64) - ord("0")
+        separators = digits[:, [2, 5, 8]]
+        numbers = np.delete(digits, [2, 5, 8], axis=1)
+        if (
+            separators == [ord(":") - ord("0"), ord(":") - ord("0"), ord(".") - ord("0")]
+        ).all() and ((numbers >= 0) & (numbers <= 9)).all():
+            hours = digits[:, 0] * 10 + digits[:, 1]
+            minutes = digits[:, 3] * 10 + digits[:, 4]
+            seconds = digits[:, 6] * 10 + digits[:, 7]
+            ms = digits[:, 9] * 100 + digits[:, 10] * 10 + digits[:, 11]
+            return ((hours * 60 + minutes) * 60 + seconds) * 1_000_000_000 + ms * 1_000_000
+    return np.array([_timestamp_to_ns(x) for x in values], dtype=np.int64)
+
+
+def _timestamp_to_ns(x: str) -> int:
+    """
+    Same as `ff1.utils.to_timedelta` (microsecond precision), in nanoseconds.
+    """
+    hours, minutes = 0, 0
+    if len(hms := x.split(":")) == 3:
+        hours, minutes, seconds = hms
+    elif len(hms) == 2:
+        minutes, seconds = hms
+    else:
+        seconds = hms[0]
 
-        for key in EMPTY_STREAM.keys():
-            timing_data[key].extend(drv_timing_data[key])
+    us = 0
+    if "." in seconds:
+        seconds, us = seconds.split(".")
+        us = int(us[:6].ljust(6, "0"))
 
-    df = pd.DataFrame(timing_data)
-    return df
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1_000_000_000 + us * 1_000
 
 
-def timing_data_driver(driver_raw, empty_vals, drv):
+def _check_int16(value: int, column: str, drv: str) -> int:
     """
-    Data is on a timestamp basis.
+    Returns the value if it fits the int16 buffers, which store -1 for missing values.
+    """
+    if not 0 <= value <= np.iinfo(np.int16).max:
+        raise Exception(f"unexpected {column} {value} of driver {drv}")
+    return value
 
-    TODO: determine lap #1
 
-    Params:
-        driver_raw (list): raw api response for this driver only [(Timestamp, data), (...), ...]
-        empty_vals (dict): dictionary of column names and empty column values
-        drv (str): driver identifier
+def _int_column(values: np.ndarray) -> np.ndarray:
+    """
+    int64 column, or float64 with NaN when values are missing (-1).
+    """
+    missing = values < 0
+    if not missing.any():
+        return values.astype(np.int64)
+    column = values.astype(np.float64)
+    column[missing] = np.nan
+    return column
 
-    Returns:
-         dictionary of timing stream data for this driver
+
+def _str_column(values: np.ndarray) -> np.ndarray:
+    """
+    Object column of strings, or float64 NaN when all values are missing.
     """
-    mapping: dict[str, DataMapping] = {
-        "Position": DataMapping("Position", int),
-        "GapToLeader": DataMapping("GapToLeader", str),
-        "Retired": DataMapping("Retired", str),
-        "Status": DataMapping("Status", int),
-        "InPit": DataMapping("PitIn", bool),
-        "PitOut": DataMapping("PitOut", bool),
-    }
-
-    # entries are pre-filled with empty or previous values and only overwritten if they exist in the response line
-    # basically interpolation by filling up with last known value because not every value is in every response
-    drv_data = {
-        key: [
-            val,
-        ]
-        for key, val in empty_vals.items()
-    }
-
-    i = 0
-    keep_last = ["Position", "LapNumber"]
-
-    if "Position" not in driver_raw[2][1]:
-        driver_raw[2][1]["Position"] = driver_raw[0][1]["Position"]
-
-    # iterate through the data; timestamp + any of the values triggers new row in data
-    # first two rows contain metadata and the initial position, so we can skip those.
-    pit_out = False
-    for time, resp in driver_raw[2:]:
-        new_entry = False
-        for key, dm in mapping.items():
-            if val := recursive_dict_get(resp, key):
-                drv_data[dm.column][i] = dm.transform(val)
-                new_entry = True
-
-        if val := recursive_dict_get(resp, "NumberOfLaps"):
-            drv_data["LapNumber"][i] = DataMapping.to_str(int(val) + 1)
-            new_entry = True
-
-        if "InPit" in resp:  # sometimes we don't get PitOut
-            if not resp["InPit"]:
-                drv_data["PitOut"][i] = DataMapping.to_bool(True)
-                new_entry = True
-
-        if val := recursive_dict_get(resp, "IntervalToPositionAhead", "Value"):
-            drv_data["IntervalToPositionAhead"][i] = DataMapping.to_str(val)
-            new_entry = True
-
-        if val := recursive_dict_get(resp, "Sectors"):
-            sector_data = _parse_sector_data(val)
-            for k, v in sector_data.items():
-                drv_data[k][i] = v
-                new_entry = True
-
-        # at least one value was present, create next row
-        if new_entry:
-            drv_data["Time"][i] = DataMapping.to_timedelta(time)
-            drv_data["DriverNumber"][i] = DataMapping.to_str(drv)
-            i += 1
-
-            # create next row of data with empty values
-            for key, val in empty_vals.items():
-                if key in keep_last:
-                    drv_data[key].append(drv_data[key][-1])
-                else:
-                    drv_data[key].append(val)
-
-    for key in drv_data.keys():
-        drv_data[key] = drv_data[key][:-1]  # remove very last row again
-
-    return drv_data
-
-
-def _parse_sector_data(sectors: dict) -> dict:
-    sector_data = {}
+    if pd.isnull(values).all():
+        return values.astype(np.float64)
+    return values
 
+
+def _parse_sector_segment(sectors: dict) -> tuple[tuple[str, str], int] | None:
+    """
+    Returns the last segment of a sector update as ((sector key, segment key), status), if any.
+    """
     # Note: all status marked as 0 at all sectors seems to come in after the
     # start of a new lap. I think this is meant to reset the segment values in
     # the F1 Live Timing App.
-    # if len(sectors.keys()) != 1:
-    #     if val := recursive_dict_get("0", "Segments", "0", "Status"):
-    #         sector_data["LastSectorSegmentNumber"] = DataMapping.to_str("1.1")
-    #         sector_data["LastSectorSegmentStatus"] = DataMapping.to_int(val)
-    #     return sector_data
-
-    sn = int(list(sectors.keys())[0]) + 1
-    sector = list(sectors.values())[0]
+    sn, sector = next(iter(sectors.items()))
 
     # This is a sector time of the LAST sector... it's the same thing as the
     # "Value" field below, but comes in sometime after.  Maybe it comes in when
     # lap/sector time is validated?
     if "PreviousValue" in sector:
-        return sector_data
+        return None
 
     # This is a sector time of the LAST sector recorded (almost) immediately at
     # the start of a sector.  Sometimes, it comes in a little late - so will
     # need to be sanitized and validated against sector times.
     if "Value" in sector:
-        return sector_data
+        return None
+
+    segments = sector.get("Segments")
+    if not segments or not isinstance(segments, dict):  # Same story as Sectors
+        return None
+
+    if len(segments) == 1:
+        ssn, segment = next(iter(segments.items()))
+        if segment_status := segment["Status"]:
+            return (sn, ssn), segment_status
+        return None
 
+    last_segment = None
     sector_segments_found = 0
     last_non_zero_status = None
-    if segments := recursive_dict_get(sector, "Segments"):
-        if isinstance(segments, dict):  # Same story as Sectors
-            for ssn, segment in segments.items():
-                ssn = int(ssn) + 1
-                if status := segment["Status"]:
-                    segment_status = segment["Status"]
-                    sector_data["LastSectorSegmentNumber"] = DataMapping.to_str(f"{sn}.{ssn}")
-                    sector_data["LastSectorSegmentStatus"] = DataMapping.to_int(segment_status)
-                    if segment_status != 0:
-                        if segment_status != last_non_zero_status:
-                            sector_segments_found += 1
-                        last_non_zero_status = segment_status
+    for ssn, segment in segments.items():
+        if segment_status := segment["Status"]:
+            last_segment = (sn, ssn), segment_status
+            if segment_status != last_non_zero_status:
+                sector_segments_found += 1
+            last_non_zero_status = segment_status
 
     if sector_segments_found > 1:
         logging.warn(f"found {sector_segments_found} sector segments!")
 
-    return sector_data
+    return last_segment
+
+
+class TimingStatus(Enum):
+    """
+    `Status` of a timing row, derived from the pit flags and segment indicators.
+    """
+
+    PIT_IN = auto()
+    PIT_OUT = auto()
+    PIT_LANE = auto()
 
 
 class Timing(pd.DataFrame):
@@ -220,7 +480,8 @@ class Timing(pd.DataFrame):
     - PitLane: 2064
     """
 
-    _metadata = ["session"]
+    # the driver offsets are only valid for the index they were built for
+    _metadata = ["session", "_driver_offsets", "_driver_offsets_index"]
 
     _COLUMNS = [
         "Time",
@@ -239,6 +500,8 @@ class Timing(pd.DataFrame):
     def __init__(self, *args, session=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.session = session
+        self._driver_offsets = None
+        self._driver_offsets_index = None
 
     @property
     def _constructor(self):
@@ -268,62 +531,111 @@ class Timing(pd.DataFrame):
         """
         identifier = str(identifier)
         if identifier.isdigit():
-            return self[self["DriverNumber"] == identifier]
+            offsets = self.driver_offsets()
+            if offsets is None:
+                return self[self["DriverNumber"] == identifier]
+            start, stop = offsets.get(identifier, (0, 0))
+            return self.iloc[start:stop]
         else:
             return self[self["Driver"] == identifier]
 
+    def driver_offsets(self) -> dict[str, tuple[int, int]] | None:
+        """
+        Returns the (start, stop) row positions of each driver's timing, or
+        None if the rows aren't grouped by driver.
+
+        Timing is stored grouped by driver, so picking a driver is a slice of
+        these positions. The offsets are built once and kept as long as the
+        rows don't change.
+        """
+        if self._driver_offsets_index is not self.index:
+            self._driver_offsets = self._build_driver_offsets()
+            self._driver_offsets_index = self.index
+        return self._driver_offsets
+
+    def _build_driver_offsets(self) -> dict[str, tuple[int, int]] | None:
+        drivers = self["DriverNumber"].to_numpy()
+        if len(drivers) == 0:
+            return {}
+
+        changes = np.flatnonzero(drivers[1:] != drivers[:-1]) + 1
+        starts = np.concatenate([[0], changes])
+        stops = np.concatenate([changes, [len(drivers)]])
+        offsets = {drv: (start, stop) for drv, start, stop in zip(drivers[starts], starts, stops)}
+        if len(offsets) != len(starts):  # a driver appears in more than one block
+            return None
+        return offsets
+
+    def compact(self) -> Timing:
+        """
+        Returns a copy with compact column types, for holding many sessions in memory:
+
+        - `DriverNumber`, `LastSectorSegmentNumber`: categorical
+        - `Position`, `LapNumber`, `RawStatus`, `LastSectorSegmentStatus`: Int16
+        - `Status`: categorical of `TimingStatus` names
+        - `GapToLeader`, `IntervalToPositionAhead`: seconds, see `gap_to_seconds`
+        - `Retired`: bool
+
+        Lap numbers are compared as numbers, e.g. `LapNumber == 2` instead of `LapNumber == "2"`.
+        """
+        return self.assign(
+            DriverNumber=self["DriverNumber"].astype("category"),
+            Position=self["Position"].astype("Int16"),
+            LapNumber=pd.to_numeric(self["LapNumber"]).astype("Int16"),
+            RawStatus=self["RawStatus"].astype("Int16"),
+            Status=pd.Categorical(self["Status"], categories=[s.name for s in TimingStatus]),
+            LastSectorSegmentNumber=self["LastSectorSegmentNumber"].astype("category"),
+            LastSectorSegmentStatus=self["LastSectorSegmentStatus"].astype("Int16"),
+            GapToLeader=gap_to_seconds(self["GapToLeader"]),
+            IntervalToPositionAhead=gap_to_seconds(self["IntervalToPositionAhead"]),
+            Retired=self["Retired"].notna(),
+        )
+
+
+def gap_to_seconds(gaps: pd.Series) -> pd.Series:
+    """
+    Converts GapToLeader or IntervalToPositionAhead values to float seconds.
+
+    - "+1.234" or "+1:02.345": gap in seconds
+    - "LAP 12": the leader, 0 seconds
+    - "1L", "1 L", "+1 LAP", "+2 LAPS": lapped, NaN
+    """
+    gaps = gaps.astype("string").str.strip()
+    parts = gaps.str.extract(r"^\+?(?:(\d+):)?(\d+(?:\.\d+)?)$")
+    seconds = parts[0].astype(float).fillna(0) * 60 + parts[1].astype(float)
+    seconds[gaps.str.startswith("LAP").fillna(False)] = 0.0
+    return seconds
+
 
 def get_lap_at_time(time: pd.Timedelta, laps: ff1.core.Laps) -> ff1.core.Lap | None:
     """
     Returns ff1.core.Lap at the given time
+
+    For many lookups, use `Session.lap_index` instead.
     """
     driver_numbers = laps["DriverNumber"].unique()
     if len(driver_numbers) != 1:
         raise Exception("Expected only 1 driver in the given laps")
 
-    # filter laps by time. There should only be one lap for the given time.
-    laps = laps[(time >= laps["LapStartTime"]) & (time < (laps["LapStartTime"] + laps["LapTime"]))]
-    if len(laps) > 1:
-        raise Exception(f"Expected at most 1 lap")
-
-    if laps.empty:
-        return None
-
-    # Get Lap (Series) from Laps (DataFrame)
-    lap = laps.loc[laps["Time"].idxmin()]
-    if isinstance(lap, pd.DataFrame):
-        lap = lap.iloc[0]
-    return lap
+    return LapIndex(laps).lap_at(driver_numbers[0], time)
 
 
 def get_driver_at_position(session, time: pd.Timedelta, position: int, not_include=None) -> str:
-    timing_data = session.timings
-    candidates = timing_data[(timing_data["Position"] == position) & (timing_data["Time"] <= time)]
-    if len(candidates) == 0:
-        return ""
-    if not_include is not None:
-        candidates = candidates[~candidates["DriverNumber"].isin(not_include)]
-    idxmax = candidates["Time"].idxmax()
-    return timing_data.iloc[idxmax]["DriverNumber"]
+    return session.position_timeline.driver_at(position, time, exclude=not_include)
 
 
-def is_in_pit(time: pd.Timedelta, timings: Timing, tolerance=timedelta(seconds=0)) -> bool:
+def is_in_pit(time, timings: Timing, tolerance=timedelta(seconds=0)):
+    """
+    Returns True if the driver of the timings was in the pit within the tolerance
+    of the given time, or a boolean array if an array of times is given.
+    """
     driver_numbers = timings["DriverNumber"].unique()
     if len(driver_numbers) != 1:
         raise Exception("Expected only 1 driver in the given timing")
 
-    # find the window to check
-    window = timings[
-        (timings["Time"] >= (time - tolerance)) & (timings["Time"] <= (time + tolerance))
-    ]
-
-    idxmin = window["Time"].idxmin()
-    idxmax = window["Time"].idxmax()
-
-    # check window + timing before and after
-    check = timings.loc[idxmin - 1 : idxmax + 1]
-
-    for _, row in check.iterrows():
-        if row["Status"] in ("PIT_IN", "PIT_OUT", "PIT_LANE"):
-            return True
-    return False
+    session = getattr(timings, "session", None)
+    if session is not None:
+        pit_intervals = session.pit_intervals
+    else:
+        pit_intervals = PitIntervals.from_timings(timings)
+    return pit_intervals.contains(driver_numbers[0], time, before=tolerance, after=tolerance)
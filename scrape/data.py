@@ -113,6 +113,13 @@ def to_db_fields(data: pd.Series) -> dict:
     return ret
 
 
+def to_db_rows(df: pd.DataFrame) -> list[dict]:
+    """
+    Returns the fields of each row, see `to_db_fields`.
+    """
+    return [to_db_fields(row) for _, row in df.iterrows()]
+
+
 def get_one_from_df(df: pd.DataFrame, query: str) -> pd.Series:
     selected = df.query(query)
     if len(selected) > 1:
@@ -122,6 +129,19 @@ def get_one_from_df(df: pd.DataFrame, query: str) -> pd.Series:
     return selected.iloc[0]
 
 
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns the memory usage in bytes per column of two versions of a frame,
+    e.g. `timings` and `timings.compact()`.
+    """
+    report = pd.DataFrame(
+        {"Before": before.memory_usage(deep=True), "After": after.memory_usage(deep=True)}
+    )
+    report.loc["Total"] = report.sum()
+    report["Ratio"] = (report["After"] / report["Before"]).round(3)
+    return report
+
+
 def df_timedelta_to_string(row: pd.Series):
     for index, value in row.iteritems():
         if isinstance(value, datetime.timedelta):
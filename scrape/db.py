@@ -1,13 +1,78 @@
+import logging
 import os
 
 import sqlalchemy
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
 
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 
+DEFAULT_URL = f"sqlite:///{os.path.join(ROOT_DIR, '..', 'data', 'db.sqlite')}"
 
-def create_connection():
-    filename = os.path.join(ROOT_DIR, "..", "data", "db.sqlite")
-    print(f"sqlite:///{filename}")
-    conn = sqlalchemy.create_engine(f"sqlite:///{filename}", echo=False)
-    return conn
+# WAL lets the site read while a scrape writes, and with it NORMAL sync only
+# syncs at checkpoints instead of on every commit
+DEFAULT_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "cache_size": -64000,  # KiB
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "memory",
+}
+
+_engine: Engine = None
+_url: str = None
+_pragmas: dict = {}
+
+
+def configure_connection(url: str = None, pragmas: dict = None):
+    """
+    Sets the database of `create_connection`, and pragmas overriding the
+    `DEFAULT_PRAGMAS`. Both can also be set with the `DB_URL` and `DB_PRAGMAS`
+    environment variables, e.g. `DB_PRAGMAS="synchronous=full,cache_size=-2000"`.
+    """
+    global _engine, _url, _pragmas
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
+    _url = url
+    _pragmas = pragmas or {}
+
+
+def create_connection() -> Engine:
+    """
+    Returns the engine of the process, created on first use. Its connections
+    are pooled, and the pragmas are set once on each new connection.
+    """
+    global _engine
+    if _engine is None:
+        url = _url or os.environ.get("DB_URL") or DEFAULT_URL
+        pragmas = {**DEFAULT_PRAGMAS, **parse_pragmas(os.environ.get("DB_PRAGMAS", "")), **_pragmas}
+        logging.info(f"connecting to {url}")
+        _engine = _create_engine(url, pragmas)
+    return _engine
+
+
+def parse_pragmas(pragmas: str) -> dict:
+    """
+    Returns the pragmas of a "name=value,name=value" string.
+    """
+    pairs = (pragma.split("=", 1) for pragma in pragmas.split(",") if pragma.strip())
+    return {name.strip(): value.strip() for name, value in pairs}
+
+
+def _create_engine(url: str, pragmas: dict) -> Engine:
+    kwargs = {}
+    if make_url(url).database not in (None, "", ":memory:"):
+        # file databases aren't pooled by default; connections can move between threads
+        kwargs = {"poolclass": QueuePool, "connect_args": {"check_same_thread": False}}
+    engine = sqlalchemy.create_engine(url, echo=False, **kwargs)
+
+    @sqlalchemy.event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
@@ -2,12 +2,72 @@ from __future__ import annotations
 from datetime import timedelta
 from typing import List
 
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Float, Interval, DateTime, Boolean
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Date,
+    ForeignKey,
+    Float,
+    Index,
+    Interval,
+    DateTime,
+    Boolean,
+    select,
+    text,
+)
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import Session, declarative_base, relationship
 
 Base = declarative_base()
 
 
+def bulk_upsert(session: Session, model, rows: list[dict]):
+    """
+    Inserts the rows in one statement. A row with the same `natural_key` as an
+    existing row updates its other fields, or is skipped if it has none.
+
+    All rows must have the same fields.
+    """
+    if not rows:
+        return
+    stmt = sqlite.insert(model.__table__)
+    fields = [field for field in rows[0] if field not in model.natural_key]
+    # the conflict target is the unique index, which may index expressions of the key
+    index_elements = getattr(model, "natural_key_index", model.natural_key)
+    if fields:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={field: stmt.excluded[field] for field in fields},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+    session.execute(stmt, rows)
+
+
+def insert_missing(session: Session, model, rows: list[dict]) -> int:
+    """
+    Inserts the rows whose primary key isn't in the table yet, with one query
+    for the existing keys and one insert, and returns how many were inserted.
+    Existing rows are left as they are.
+    """
+    (key,) = model.__table__.primary_key.columns
+    rows = list({row[key.name]: row for row in rows}.values())
+    if not rows:
+        return 0
+    existing = set(
+        session.execute(select(key).where(key.in_([row[key.name] for row in rows]))).scalars()
+    )
+    missing = [row for row in rows if row[key.name] not in existing]
+    if missing:
+        session.execute(model.__table__.insert(), missing)
+    return len(missing)
+
+
+def _natural_key_index(table: str, *columns) -> Index:
+    return Index(f"ix_{table}_natural_key", *columns, unique=True)
+
+
 class Driver(Base):
     __tablename__ = "driver"
 
@@ -37,6 +97,12 @@ class Circuit(Base):
 
 class Race(Base):
     __tablename__ = "race"
+    natural_key = ("date", "round_number")
+    __table_args__ = (
+        _natural_key_index(__tablename__, *natural_key),
+        # race page lookups by year and circuit
+        Index("ix_race_year_circuit_id", "year", "circuit_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     year = Column(Integer)
@@ -65,6 +131,8 @@ class Race(Base):
 
 class DriverRaceSummary(Base):
     __tablename__ = "driver_race_summary"
+    natural_key = ("race_id", "driver_id")
+    __table_args__ = (_natural_key_index(__tablename__, *natural_key),)
 
     id = Column(Integer, primary_key=True)
 
@@ -127,6 +195,8 @@ class DriverRaceSummary(Base):
 
 class LapSummary(Base):
     __tablename__ = "lap_summary"
+    natural_key = ("driver_race_summary_id",)
+    __table_args__ = (_natural_key_index(__tablename__, *natural_key),)
 
     id = Column(Integer, primary_key=True)
     driver_race_summary_id = Column(Integer, ForeignKey("driver_race_summary.id"))
@@ -155,6 +225,8 @@ class LapSummary(Base):
 
 class StintSummary(Base):
     __tablename__ = "stint_summary"
+    natural_key = ("driver_race_summary_id", "stint")
+    __table_args__ = (_natural_key_index(__tablename__, *natural_key),)
 
     id = Column(Integer, primary_key=True)
     driver_race_summary_id = Column(Integer, ForeignKey("driver_race_summary.id"))
@@ -187,6 +259,8 @@ class StintSummary(Base):
 
 class PitSummary(Base):
     __tablename__ = "pit_summary"
+    natural_key = ("driver_race_summary_id",)
+    __table_args__ = (_natural_key_index(__tablename__, *natural_key),)
 
     id = Column(Integer, primary_key=True)
     driver_race_summary_id = Column(Integer, ForeignKey("driver_race_summary.id"))
@@ -211,6 +285,8 @@ class PitSummary(Base):
 
 class PitStop(Base):
     __tablename__ = "pit_stop"
+    natural_key = ("pit_summary_id", "lap_number")
+    __table_args__ = (_natural_key_index(__tablename__, *natural_key),)
 
     id = Column(Integer, primary_key=True)
     pit_summary_id = Column(Integer, ForeignKey("pit_summary.id"))
@@ -235,6 +311,21 @@ class PitStop(Base):
 
 class Overtake(Base):
     __tablename__ = "overtake"
+    # a driver can pass several drivers at once, so the passed driver is part of
+    # the key, but not the passing status, which a new classification updates
+    natural_key = ("driver_race_summary_id", "time", "lap_number", "position", "passed_driver_id")
+    # NULLs are distinct in a unique index, so an unknown passed driver is indexed as ""
+    natural_key_index = (*natural_key[:-1], text("coalesce(passed_driver_id, '')"))
+    __table_args__ = (
+        _natural_key_index(__tablename__, *natural_key_index),
+        # overtake counts per driver without reading the table
+        Index(
+            "ix_overtake_passing_status",
+            "driver_race_summary_id",
+            "passing_status",
+            "passing_status_override",
+        ),
+    )
 
     id = Column(Integer, primary_key=True)
     driver_race_summary_id = Column(Integer, ForeignKey("driver_race_summary.id"))
@@ -257,7 +348,6 @@ class Overtake(Base):
                 lap_number=kwargs["lap_number"],
                 position=kwargs["position"],
                 passed_driver_id=kwargs["passed_driver_id"],
-                passing_status=kwargs["passing_status"],
             )
             .one_or_none()
         )
@@ -266,3 +356,28 @@ class Overtake(Base):
         ps = cls(**kwargs)
         session.add(ps)
         return ps
+
+
+class RaceDriverRanking(Base):
+    # where each driver ranks in a race, kept up to date by `scrape.rankings.refresh_rankings`
+    __tablename__ = "race_driver_rankings"
+
+    driver_race_summary_id = Column(Integer, ForeignKey("driver_race_summary.id"), primary_key=True)
+    race_id = Column(Integer, ForeignKey("race.id"), index=True)
+
+    fastest_lap_rank = Column(Integer)
+    average_time_rank = Column(Integer)
+    fastest_lap_average_speed_rank = Column(Integer)
+    fastest_lap_speed_trap_rank = Column(Integer)
+    average_speed_rank = Column(Integer)
+    fastest_speed_trap_rank = Column(Integer)
+
+    pit_average_rank = Column(Integer)
+    pit_total_time_rank = Column(Integer)
+    pit_stops = Column(Integer)
+    fastest_pit_stop_lap = Column(Integer)
+    fastest_pit_stop_duration = Column(Interval)
+    fastest_pit_stop_rank = Column(Integer)
+
+    overtakes = Column(Integer)
+    overtakes_rank = Column(Integer)
@@ -1,3 +1,5 @@
+from scrape.race.battle import *
+from scrape.race.crunch import *
 from scrape.race.lap import *
 from scrape.race.overtake import *
 from scrape.race.pit import *
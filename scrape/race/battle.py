@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from scrape.core import Session, gap_to_seconds
+
+__all__ = ["get_battles", "find_battles"]
+
+
+def get_battles(
+    session: Session, threshold: float = 1.0, duration=pd.Timedelta(3, "s")
+) -> pd.DataFrame:
+    """
+    Returns the battles of a session: periods in which a driver stayed within
+    `threshold` seconds of the same driver ahead for at least `duration`.
+
+    Columns are DriverNumber, DriverNumberAhead, StartTime, EndTime and
+    MinInterval, the smallest interval in seconds during the battle.
+    """
+    timings = session.timings
+    codes, drivers = pd.factorize(timings["DriverNumber"].to_numpy(dtype=object))
+    order = np.argsort(codes, kind="stable")
+
+    driver = drivers[codes[order]]
+    time = pd.TimedeltaIndex(timings["Time"]).asi8[order]
+    position = timings["Position"].to_numpy(dtype=np.int64)[order]
+    interval = gap_to_seconds(timings["IntervalToPositionAhead"]).to_numpy()[order]
+    ahead = session.position_timeline.drivers_at(position - 1, time, exclude=driver)
+    return find_battles(driver, time, interval, ahead, threshold, duration)
+
+
+def find_battles(
+    driver: np.ndarray,
+    time: np.ndarray,
+    interval: np.ndarray,
+    ahead: np.ndarray,
+    threshold: float = 1.0,
+    duration=pd.Timedelta(3, "s"),
+) -> pd.DataFrame:
+    """
+    Same as `get_battles`, from timing rows ordered by driver, then time.
+
+    Args:
+        driver: driver number of each row
+        time: time of each row in nanoseconds
+        interval: IntervalToPositionAhead of each row in seconds, NaN if not updated
+        ahead: driver number of the driver ahead at each row, empty string for the leader
+    """
+    n = len(driver)
+    # an interval holds until the next update, as long as the driver ahead is the same
+    segment_start = np.r_[True, (driver[1:] != driver[:-1]) | (ahead[1:] != ahead[:-1])]
+    segment = np.maximum.accumulate(np.where(segment_start, np.arange(n), 0))
+    updated = np.maximum.accumulate(np.where(~np.isnan(interval), np.arange(n), -1))
+    interval = np.where(updated >= segment, interval[np.maximum(updated, 0)], np.nan)
+
+    close = (interval <= threshold) & (ahead != "")
+    starts = np.flatnonzero(close & (segment_start | ~np.r_[False, close[:-1]]))
+    stops = np.flatnonzero(close & (np.r_[segment_start[1:], True] | ~np.r_[close[1:], False]))
+    # a battle lasts until the driver's next row, when the gap opened or the driver ahead changed
+    last = np.r_[driver[1:] != driver[:-1], True]
+    end = time[np.where(last[stops], stops, stops + 1)]
+
+    keep = end - time[starts] >= pd.Timedelta(duration).value
+    bounds = np.column_stack([starts, stops + 1]).ravel()
+    min_interval = np.minimum.reduceat(np.r_[interval, np.nan], bounds)[::2]
+    return pd.DataFrame(
+        {
+            "DriverNumber": driver[starts[keep]],
+            "DriverNumberAhead": ahead[starts[keep]],
+            "StartTime": pd.to_timedelta(time[starts[keep]]),
+            "EndTime": pd.to_timedelta(end[keep]),
+            "MinInterval": min_interval[keep],
+        }
+    )
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from functools import partial
+
+import pandas as pd
+
+from scrape.core import Session, fetch
+from scrape.race.driver_summary import fetch_driver_summary
+from scrape.race.lap import get_lap_summary
+from scrape.race.overtake import OvertakeRules, get_overtakes
+from scrape.race.pit import fetch_pit_summary
+from scrape.race.stint import get_stint_summary
+
+__all__ = ["crunch_race", "RaceSummaries"]
+
+
+class RaceSummaries:
+    """
+    Every summary of a race, see `crunch_race`.
+
+    Attributes:
+        lap_summary: see `get_lap_summary`
+        stint_summary: see `get_stint_summary`
+        pit_summary: see `get_pit_summary`
+        pit_stops: see `get_pit_summary`
+        driver_summary: see `get_driver_summary`
+        overtakes: see `get_overtakes`
+    """
+
+    def __init__(
+        self,
+        lap_summary: pd.DataFrame,
+        stint_summary: pd.DataFrame,
+        pit_summary: pd.DataFrame,
+        pit_stops: pd.DataFrame,
+        driver_summary: pd.DataFrame,
+        overtakes: pd.DataFrame,
+    ):
+        self.lap_summary = lap_summary
+        self.stint_summary = stint_summary
+        self.pit_summary = pit_summary
+        self.pit_stops = pit_stops
+        self.driver_summary = driver_summary
+        self.overtakes = overtakes
+
+
+def crunch_race(
+    session: Session, overtake_workers: int = 1, overtake_rules: OvertakeRules | None = None
+) -> RaceSummaries:
+    """
+    Computes every summary of a loaded race session. The summaries share the
+    laps filtered and grouped once in `Session.lap_table`, and their requests
+    are sent at once.
+
+    Args:
+        overtake_workers: number of processes classifying the overtakes, see `get_overtakes`
+        overtake_rules: see `get_overtakes`
+    """
+    (pit_summary, pit_stops), driver_summary = fetch(
+        partial(fetch_pit_summary, session=session),
+        partial(fetch_driver_summary, session=session),
+    )
+    return RaceSummaries(
+        lap_summary=get_lap_summary(session),
+        stint_summary=get_stint_summary(session),
+        pit_summary=pit_summary,
+        pit_stops=pit_stops,
+        driver_summary=driver_summary,
+        overtakes=get_overtakes(session, overtake_rules, overtake_workers),
+    )
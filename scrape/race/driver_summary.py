@@ -2,13 +2,18 @@ import numpy as np
 import pandas as pd
 import fastf1 as ff1
 import json
+from functools import partial
 
-from scrape.core import Session
+from scrape.core import Fetcher, Session, fetch
 
-__all__ = ["get_driver_summary"]
+__all__ = ["get_driver_summary", "fetch_driver_summary"]
 
 
 def get_driver_summary(session: Session) -> pd.DataFrame:
+    return fetch(partial(fetch_driver_summary, session=session))[0]
+
+
+async def fetch_driver_summary(fetcher: Fetcher, session: Session) -> pd.DataFrame:
     df = session.results[
         [
             "DriverNumber",
@@ -21,23 +26,17 @@ def get_driver_summary(session: Session) -> pd.DataFrame:
     ]
 
     # Get points data
-    df = df.reindex(
-        columns=df.columns.tolist() + ["SeasonPoints", "SeasonStanding", "LapsCompleted"]
-    )
-    res = ff1.Cache.requests_get(
-        ff1.api.base_url + session.api_path + "ChampionshipPrediction.json"
-    )
+    res = await fetcher.get(ff1.api.base_url + session.api_path + "ChampionshipPrediction.json")
     if res.status_code != 200:
-        raise Excepption(f"expected 200 status, got: {res.status_code}")
+        raise Exception(f"expected 200 status, got: {res.status_code}")
 
     decoded = res.text.encode().decode("utf-8-sig")
     content = json.loads(decoded)["Drivers"]
-    for idx, row in df.iterrows():
-        item = content[row["DriverNumber"]]
-        df.at[idx, "SeasonPoints"] = item["PredictedPoints"]
-        df.at[idx, "SeasonStanding"] = item["PredictedPosition"]
-        df.at[idx, "LapsCompleted"] = session.laps.pick_driver(row["DriverNumber"])[
-            "LapNumber"
-        ].max()
-
-    return df
+    drivers = df["DriverNumber"]
+    return df.assign(
+        SeasonPoints=np.array([content[drv]["PredictedPoints"] for drv in drivers], dtype=float),
+        SeasonStanding=np.array(
+            [content[drv]["PredictedPosition"] for drv in drivers], dtype=float
+        ),
+        LapsCompleted=drivers.map(session.lap_table.laps_completed).astype(float),
+    )
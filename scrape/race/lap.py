@@ -15,39 +15,38 @@ def get_lap_summary(session: Session) -> pd.DataFrame:
         average speed
         fastest speed trap
     """
-    df = session.laps.query('PitOutTime == "" and PitInTime == ""')
-    df = df[~df["LapTime"].isnull()]
-    gb = df.groupby("DriverNumber")
-
-    time = (
-        gb.agg(
-            minidx=("LapTime", "idxmin"),
-            AverageTime=("LapTime", "mean"),
-        )
-        .join(df[["LapNumber", "LapTime"]], on="minidx")
-        .rename(columns={"LapNumber": "FastestLap", "LapTime": "FastestLapTime"})
-        .drop(columns=["minidx"])
-        .reset_index()
-    )
+    lap_table = session.lap_table
+    time = lap_table.lap_times(lap_table.clean, "DriverNumber").reset_index()
+    speed = _get_speed_summary(session, lap_table.no_pit)
+
+    return time.set_index("DriverNumber").join(speed).reset_index()
+
 
-    speed_data = []
-    for drv in time["DriverNumber"]:
-        laps = session.laps.pick_driver(drv).query('PitOutTime == "" and PitInTime == ""')
-        fastest_lap = laps.pick_fastest()
-
-        fastest_lap_speed_avg = fastest_lap.get_car_data()["Speed"].mean().round(3)
-        fastest_lap_st = fastest_lap["SpeedST"]
-        speed_avg = laps.get_car_data()["Speed"].mean().round(3)
-        all_laps_st_max = laps["SpeedST"].max()
-        speed_data.append(
-            {
-                "DriverNumber": drv,
-                "FastestLapAverageSpeed": fastest_lap_speed_avg,
-                "FastestLapSpeedTrap": fastest_lap_st,
-                "AverageSpeed": speed_avg,
-                "FastestSpeedTrap": all_laps_st_max,
-            }
-        )
-    speed = pd.DataFrame(data=speed_data)
-
-    return time.set_index("DriverNumber").join(speed.set_index("DriverNumber")).reset_index()
+def _get_speed_summary(session: Session, laps: ff1.core.Laps) -> pd.DataFrame:
+    """
+    Returns the speed columns of `get_lap_summary` for the given laps, indexed
+    by DriverNumber.
+
+    The average speeds are the mean of the car data from the start to the end of
+    the fastest lap, and from the start of the first lap to the end of the last
+    one, both ends included, as `Laps.get_car_data` slices them. The windows of
+    all drivers are found with one groupby and averaged with one query of the
+    telemetry store each.
+    """
+    # same as `Laps.pick_fastest`
+    personal_best = laps[laps["IsPersonalBest"] == True]  # noqa: E712
+    fastest = personal_best.loc[personal_best.groupby("DriverNumber")["LapTime"].idxmin()]
+    fastest = fastest.set_index("DriverNumber")
+    spans = laps.groupby("DriverNumber").agg(Start=("LapStartTime", "min"), End=("Time", "max"))
+
+    store = session.telemetry_store
+    fastest_speed = store.mean_speed(fastest.index, fastest["LapStartTime"], fastest["Time"])
+    average_speed = store.mean_speed(spans.index, spans["Start"], spans["End"])
+    return pd.DataFrame(
+        {
+            "FastestLapAverageSpeed": pd.Series(fastest_speed, index=fastest.index).round(3),
+            "FastestLapSpeedTrap": fastest["SpeedST"],
+            "AverageSpeed": pd.Series(average_speed, index=spans.index).round(3),
+            "FastestSpeedTrap": laps.groupby("DriverNumber")["SpeedST"].max(),
+        }
+    )
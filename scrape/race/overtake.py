@@ -1,13 +1,33 @@
+from __future__ import annotations
+import time as _time
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum, auto
 
 import fastf1 as ff1
 import pandas as pd
 import numpy as np
 
+from scrape.race.battle import find_battles
 from scrape.race.pit import is_time_during_pit
-from scrape.core import Session, timing
-
-__all__ = ["get_overtakes", "get_driver_overtakes"]
+from scrape.core import (
+    PitIntervals,
+    PositionTimeline,
+    Session,
+    SharedArrays,
+    gap_to_seconds,
+    timing,
+)
+
+__all__ = [
+    "get_overtakes",
+    "get_driver_overtakes",
+    "default_overtake_rules",
+    "OvertakeCandidates",
+    "OvertakeDetector",
+    "OvertakeRule",
+    "OvertakeRules",
+    "OvertakeStatus",
+]
 
 
 class OvertakeStatus(Enum):
@@ -53,193 +73,821 @@ class OvertakeStatus(Enum):
     POSITION_REGAINED = auto()
 
 
-def get_overtakes(session: Session) -> pd.DataFrame:
+def get_overtakes(
+    session: Session, rules: OvertakeRules | None = None, workers: int = 1
+) -> pd.DataFrame:
     """
     Returns overtakes that occurred during a session.
+
+    Args:
+        rules: rules classifying the overtakes, `default_overtake_rules()` if None
+        workers: number of processes classifying the overtakes. With more than
+            one, the rules must be picklable and only read the session data
+            shared by `Session.to_arrays`.
     """
-    dfs = []
-    for driver in session.drivers:
-        dfs.append(get_driver_overtakes(session, driver))
-    return pd.concat(dfs).reset_index(drop=True)
+    return _get_overtakes(session, session.drivers, rules, workers)
 
 
 def get_driver_overtakes(
     session: Session,
     driver_number: str,
+    rules: OvertakeRules | None = None,
 ) -> pd.DataFrame:
     """
     Returns overtakes performed by the given driver.
+
+    Args:
+        rules: rules classifying the overtakes, `default_overtake_rules()` if None
+    """
+    return _get_overtakes(session, [driver_number], rules)
+
+
+class OvertakeDetector:
+    """
+    Finds overtakes while timing rows are appended, e.g. while replaying or
+    recording a live timing stream, instead of once the whole session is loaded.
+
+    A timing row is classified once the stream is `lookahead` past it, using the
+    timing of the `lookback` before it. Both must cover the windows of the rules.
+    Overtakes are returned once their driver is in the next lap, when duplicates
+    within the lap are known. Only these windows and the overtakes of the
+    current laps are kept, so memory does not grow with the length of the session.
+
+    The rules read the laps, track status and telemetry of the session, and the
+    timing of the appended rows. Fed the whole timing of the session, the
+    overtakes are the same as `get_overtakes`, ordered by time instead of driver.
     """
-    timings = session.timings.pick_driver(driver_number)
-
-    last_position = timings.iloc[0]["Position"]
-    overtakes = []
-    this_lap = None
-    for idx, row in timings.iterrows():
-        position = row["Position"]
-        if position == last_position:  # no change
-            continue
-        if position > last_position:  # no improvement
-            last_position = position
-            continue
-
-        gained = last_position - position
-        time = row["Time"]
-
-        if this_lap != row["LapNumber"]:
-            this_lap = row["LapNumber"]
-
-        for i in range(1, gained + 1):
-            against, status = __is_overtake(session, last_position - i, time, driver_number)
-            overtakes.append(
-                {
-                    "Time": time,
-                    "LapNumber": row["LapNumber"],
-                    "Position": position,
-                    "DriverNumber": driver_number,
-                    "DriverNumberAgainst": against,
-                    "PassingStatus": status.name,
-                }
-            )
 
-        last_position = position
+    COLUMNS = ["Time", "DriverNumber", "Position", "LapNumber", "Status", "IntervalToPositionAhead"]
+
+    def __init__(
+        self,
+        session: Session,
+        rules: OvertakeRules | None = None,
+        lookahead=pd.Timedelta(15, "s"),
+        lookback=pd.Timedelta(60, "s"),
+    ):
+        self.session = session
+        self.rules = default_overtake_rules() if rules is None else rules
+        self.lookahead = pd.Timedelta(lookahead)
+        self.lookback = pd.Timedelta(lookback)
+
+        self._buffer: pd.DataFrame | None = None  # timing rows in time order
+        self._classified = 0  # classified rows at the start of the buffer
+        self._last_position: dict[str, int] = {}  # position of the last row dropped from the buffer
+        self._lap: dict[str, str] = {}  # lap number of the last classified row
+        self._pending: list[pd.DataFrame] = []
+
+    def update(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Appends timing rows with the columns of `Session.timings`, in time order.
+
+        Returns the overtakes completed by the rows, see `get_overtakes`.
+        """
+        rows = rows[self.COLUMNS]
+        if self._buffer is None:
+            self._buffer = rows.reset_index(drop=True)
+        elif len(rows):
+            if len(self._buffer) and rows["Time"].iloc[0] < self._buffer["Time"].iloc[-1]:
+                raise Exception("Expected timing rows in time order")
+            self._buffer = pd.concat([self._buffer, rows], ignore_index=True)
+        if len(self._buffer) == 0:
+            return self._advance(0)
+        now = self._buffer["Time"].iloc[-1]
+        ready = np.searchsorted(_to_ns(self._buffer["Time"]), (now - self.lookahead).value)
+        return self._advance(ready)
+
+    def flush(self) -> pd.DataFrame:
+        """
+        Returns the remaining overtakes, at the end of the stream.
+        """
+        return self._advance(0 if self._buffer is None else len(self._buffer), final=True)
+
+    def _advance(self, ready: int, final=False) -> pd.DataFrame:
+        if ready > self._classified:
+            self._classify(np.arange(self._classified, ready))
+            self._classified = ready
+
+        pending = pd.concat(self._pending) if self._pending else _to_overtakes(_NO_CANDIDATES)
+        done = final | (
+            pending["LapNumber"].to_numpy() != pending["DriverNumber"].map(self._lap).to_numpy()
+        )
+        self._pending = [pending[~done]] if not done.all() else []
+
+        # drop the rows before the lookback of the first row to classify
+        if self._buffer is not None and len(self._buffer):
+            times = _to_ns(self._buffer["Time"])
+            first = times[min(self._classified, len(times) - 1)]
+            cut = np.searchsorted(times, first - self.lookback.value)
+            dropped = self._buffer.iloc[:cut]
+            self._last_position.update(zip(dropped["DriverNumber"], dropped["Position"]))
+            self._buffer = self._buffer.iloc[cut:].reset_index(drop=True)
+            self._classified -= cut
+
+        return _mark_duplicates(pending[done].reset_index(drop=True))
+
+    def _classify(self, rows: np.ndarray):
+        buffer = self._buffer
+        timeline = PositionTimeline(buffer)
+        timings = _DriverTimings(buffer, timeline)
+        session = _StreamSession(self.session, buffer.iloc[timings._order], timeline)
+
+        # the given rows in driver then time order, as rows of `timings`
+        row_of = np.empty(len(buffer), dtype=np.int64)
+        row_of[timings._order] = np.arange(len(buffer))
+        timing_rows = np.sort(row_of[rows])
+
+        last_position = timings.position[np.maximum(timing_rows - 1, 0)]
+        for i in np.flatnonzero(timings.first[timing_rows]):
+            row = timing_rows[i]
+            last_position[i] = self._last_position.get(timings.driver[row], timings.position[row])
+
+        candidates = _position_gains(session, timings, timing_rows, last_position)
+        candidates["PassingStatus"] = _classify(session, timings, candidates, self.rules)
+        self._pending.append(_to_overtakes(candidates))
+        self._lap.update(zip(buffer["DriverNumber"].iloc[rows], buffer["LapNumber"].iloc[rows]))
+
+
+class _StreamSession:
+    """
+    The session seen by the rules of an `OvertakeDetector`: the timing and what
+    is derived from it comes from the buffered timing rows, everything else from
+    the session.
+    """
 
-    df = pd.DataFrame(overtakes)
+    def __init__(self, session: Session, timings: pd.DataFrame, timeline: PositionTimeline):
+        self._session = session
+        self.timings = timings
+        self.position_timeline = timeline
+        self.pit_intervals = PitIntervals.from_timings(timings)
 
-    if df.empty:
-        return df
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+def _get_overtakes(
+    session: Session, drivers: list[str], rules: OvertakeRules | None, workers: int = 1
+) -> pd.DataFrame:
+    """
+    Finds the position gains of all given drivers at once and classifies them
+    with each rule evaluated over all candidates.
+    """
+    if rules is None:
+        rules = default_overtake_rules()
+
+    timings = _DriverTimings(session.timings, session.position_timeline)
+    candidates = _get_candidates(session, timings, drivers)
+    candidates["PassingStatus"] = _classify(session, timings, candidates, rules, workers)
+    return _mark_duplicates(_to_overtakes(candidates)).reset_index(drop=True)
+
+
+def _classify(
+    session: Session,
+    timings: _DriverTimings,
+    candidates: pd.DataFrame,
+    rules: OvertakeRules,
+    workers: int = 1,
+) -> np.ndarray:
+    overtake_candidates = OvertakeCandidates(
+        session,
+        timings,
+        timings.time[candidates["Row"].to_numpy()],
+        candidates["DriverNumber"].to_numpy(dtype=object),
+        candidates["DriverNumberAgainst"].to_numpy(dtype=object),
+        candidates["PositionPassed"].to_numpy(),
+    )
+    if workers > 1 and len(overtake_candidates):
+        return _classify_parallel(session, timings, overtake_candidates, rules, workers)
+    return rules.classify(overtake_candidates)
+
+
+def _to_overtakes(candidates: pd.DataFrame) -> pd.DataFrame:
+    df = candidates[
+        ["Time", "LapNumber", "Position", "DriverNumber", "DriverNumberAgainst", "PassingStatus"]
+    ]
 
     # filter null lap numbers
-    df = df[~df["LapNumber"].isnull()]
+    return df[~df["LapNumber"].isnull()]
 
+
+def _mark_duplicates(df: pd.DataFrame) -> pd.DataFrame:
     # mark data where multiple overtakes occur within the same lap against the same driver
     dup = df.duplicated(
-        ["LapNumber", "Position", "DriverNumberAgainst", "PassingStatus"], keep="last"
+        ["DriverNumber", "LapNumber", "Position", "DriverNumberAgainst", "PassingStatus"],
+        keep="last",
     )
     df.loc[dup, "PassingStatus"] = OvertakeStatus.DUPLICATE.name
+    return df
 
-    return df.reset_index(drop=True)
 
+def _get_candidates(session: Session, timings: _DriverTimings, drivers: list[str]) -> pd.DataFrame:
+    """
+    Returns one row per position gained, in driver then time order. A gain of
+    several positions at once is one row per passed position.
 
-def __is_overtake(session, position, time, overtaker) -> (str, OvertakeStatus):
+    `PositionPassed` is the position the overtaken driver is passed for and
+    `Row` is the timing row of the gain in `timings`.
     """
-    TODO: check car is full car length ahead for both the driver and the driver
-        against for the past x seconds.
+    rows = timings.rows(drivers)
+    position = timings.position[rows]
+    last_position = np.r_[position[:1], position[:-1]]
+    first = timings.first[rows]
+    last_position[first] = position[first]
+    return _position_gains(session, timings, rows, last_position)
+
+
+_NO_CANDIDATES = pd.DataFrame(
+    {
+        "Time": pd.to_timedelta([]),
+        "LapNumber": pd.Series([], dtype=object),
+        "Position": pd.Series([], dtype=np.int64),
+        "DriverNumber": pd.Series([], dtype=object),
+        "DriverNumberAgainst": pd.Series([], dtype=object),
+        "PassingStatus": pd.Series([], dtype=object),
+    }
+)
+
+
+def _position_gains(
+    session: Session, timings: _DriverTimings, rows: np.ndarray, last_position: np.ndarray
+) -> pd.DataFrame:
     """
-    # driver data
-    laps = session.laps.pick_driver(overtaker)
-    lap = timing.get_lap_at_time(time, laps)
-    timings = session.timings.pick_driver(overtaker)
+    Same as `_get_candidates`, for the given timing rows and the position of
+    each driver before each row.
+    """
+    position = timings.position[rows]
+    gained = np.maximum(last_position - position, 0)
+
+    # one row per position gained
+    rows = np.repeat(rows, gained)
+    i = np.arange(gained.sum()) - np.repeat(np.cumsum(gained) - gained, gained) + 1
+    position_passed = np.repeat(last_position, gained) - i
+    time = timings.time[rows]
+    drivers = timings.driver[rows]
+
+    return pd.DataFrame(
+        {
+            "Time": pd.to_timedelta(time),
+            "LapNumber": timings.lap_number[rows],
+            "Position": timings.position[rows],
+            "DriverNumber": drivers,
+            "DriverNumberAgainst": session.position_timeline.drivers_at(
+                position_passed + 1, time, exclude=drivers
+            ),
+            "PositionPassed": position_passed,
+            "Row": rows,
+        }
+    )
+
+
+class OvertakeCandidates:
+    """
+    Position gains to classify, as arrays with one entry per candidate.
+
+    Attributes:
+        session: the session of the candidates
+        timings: the session's timing ordered by driver, see `_DriverTimings`
+        time: session time of the position gain, in nanoseconds
+        driver: driver number of the driver gaining the position
+        against: driver number of the passed driver
+        position: the position the driver is passed for
+        lap: row of the driver's lap in `session.laps`, -1 if there is no lap
+        against_lap: row of the passed driver's lap in `session.laps`, -1 if there is no lap
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        timings: _DriverTimings,
+        time: np.ndarray,
+        driver: np.ndarray,
+        against: np.ndarray,
+        position: np.ndarray,
+        lap: np.ndarray | None = None,
+        against_lap: np.ndarray | None = None,
+    ):
+        self.session = session
+        self.timings = timings
+        self.time = time
+        self.driver = driver
+        self.against = against
+        self.position = position
+        self.lap = session.lap_index.rows_at(driver, time) if lap is None else lap
+        self.against_lap = (
+            session.lap_index.rows_at(against, time) if against_lap is None else against_lap
+        )
+
+    def __len__(self):
+        return len(self.time)
+
+    def take(self, indices: np.ndarray) -> OvertakeCandidates:
+        """
+        Returns the candidates at the given positions.
+        """
+        return OvertakeCandidates(
+            self.session,
+            self.timings,
+            self.time[indices],
+            self.driver[indices],
+            self.against[indices],
+            self.position[indices],
+            self.lap[indices],
+            self.against_lap[indices],
+        )
+
+    def lap_numbers(self, laps: np.ndarray) -> np.ndarray:
+        """
+        Returns the lap numbers of the given rows of `session.laps`, NaN for -1.
+        """
+        lap_numbers = self.session.laps["LapNumber"].to_numpy(dtype=float)
+        return np.where(laps >= 0, lap_numbers[np.maximum(laps, 0)], np.nan)
+
+
+class OvertakeRule:
+    """
+    A check rejecting overtake candidates.
+
+    Args:
+        status: the OvertakeStatus of the candidates rejected by this rule
+        check: `check(candidates, rule)` returns True for each rejected candidate
+            of the given OvertakeCandidates. It only gets the candidates no
+            earlier rule rejected.
+        enabled: whether the rule is checked
+        name: defaults to the status name
+        settings: tolerances and thresholds used by the check, e.g. `tolerance`
+    """
+
+    def __init__(self, status: OvertakeStatus, check, enabled=True, name=None, **settings):
+        self.status = status
+        self.check = check
+        self.enabled = enabled
+        self.name = name or status.name
+        self.settings = settings
+
+
+class OvertakeRules:
+    """
+    Ordered overtake rules. A candidate gets the status of the first enabled
+    rule rejecting it, or OK.
 
-    driver_against = timing.get_driver_at_position(
-        session, time, position + 1, not_include=[overtaker]
+    Keeps the number of candidates each rule evaluated and rejected and the
+    time spent in it, over every classification, see `stats`.
+    """
+
+    def __init__(self, rules: list[OvertakeRule]):
+        self._rules = list(rules)
+        self.reset_stats()
+
+    def __iter__(self):
+        return iter(self._rules)
+
+    def __getitem__(self, name: str) -> OvertakeRule:
+        for rule in self._rules:
+            if rule.name == name:
+                return rule
+        raise KeyError(name)
+
+    def register(self, rule: OvertakeRule, before: str | None = None):
+        """
+        Adds a rule before the rule with the given name, or last.
+        """
+        if any(r.name == rule.name for r in self._rules):
+            raise Exception(f"Rule {rule.name} already registered")
+        index = len(self._rules) if before is None else self._rules.index(self[before])
+        self._rules.insert(index, rule)
+        self._stats[rule.name] = [0, 0, 0.0]
+
+    def remove(self, name: str) -> OvertakeRule:
+        rule = self[name]
+        self._rules.remove(rule)
+        return rule
+
+    def classify(self, candidates: OvertakeCandidates) -> np.ndarray:
+        """
+        Returns the OvertakeStatus name of each candidate.
+        """
+        status = np.full(len(candidates), OvertakeStatus.OK.name, dtype=object)
+        pending = np.arange(len(candidates))
+        for rule in self._rules:
+            if not rule.enabled or len(pending) == 0:
+                continue
+
+            start = _time.perf_counter()
+            rejected = np.asarray(rule.check(candidates.take(pending), rule), dtype=bool)
+            stats = self._stats.setdefault(rule.name, [0, 0, 0.0])
+            stats[0] += len(pending)
+            stats[1] += rejected.sum()
+            stats[2] += _time.perf_counter() - start
+
+            status[pending[rejected]] = rule.status.name
+            pending = pending[~rejected]
+        return status
+
+    def add_stats(self, other: OvertakeRules):
+        """
+        Adds the stats of other rules, e.g. of the same rules in another process.
+        """
+        for name, (evaluated, rejected, seconds) in other._stats.items():
+            stats = self._stats.setdefault(name, [0, 0, 0.0])
+            stats[0] += evaluated
+            stats[1] += rejected
+            stats[2] += seconds
+
+    def stats(self) -> pd.DataFrame:
+        """
+        Returns the rules in order with the number of candidates they evaluated
+        and rejected and the seconds spent in them.
+        """
+        return pd.DataFrame(
+            [
+                (rule.name, rule.enabled, *self._stats.get(rule.name, [0, 0, 0.0]))
+                for rule in self._rules
+            ],
+            columns=["Rule", "Enabled", "Evaluated", "Rejected", "Seconds"],
+        )
+
+    def reset_stats(self):
+        self._stats = {rule.name: [0, 0, 0.0] for rule in self._rules}
+
+
+def default_overtake_rules() -> OvertakeRules:
+    """
+    Returns the overtake rules in their default order. Each call returns new
+    rules, so they can be changed without affecting other callers.
+    """
+    return OvertakeRules(
+        [
+            # 1. is not the first lap
+            OvertakeRule(OvertakeStatus.NO_LAP, _no_lap),
+            OvertakeRule(OvertakeStatus.FIRST_LAP, _first_lap),
+            OvertakeRule(OvertakeStatus.NO_LAP_OTHER, _no_lap_other),
+            OvertakeRule(OvertakeStatus.FIRST_LAP_OTHER, _first_lap_other),
+            # 2. track status is clear, see `Session.is_under_track_status`
+            OvertakeRule(OvertakeStatus.TRACK_STATUS, _track_status),
+            # 3. overtaken driver is not pitted
+            OvertakeRule(OvertakeStatus.PIT, _in_pit, tolerance=pd.Timedelta(2, "s")),
+            # 4. position is maintained for 10 seconds
+            OvertakeRule(
+                OvertakeStatus.LOST_TOO_QUICK, _lost_too_quick, tolerance=pd.Timedelta(10, "s")
+            ),
+            # 5. make sure the other driver was ahead in the last 5 seconds (e.g.
+            # position did not improve due to someone in front pitting, retiring, etc.)
+            OvertakeRule(OvertakeStatus.NO_BATTLE, _no_battle, tolerance=pd.Timedelta(5, "s")),
+            # 6. overtaken driver is off track
+            OvertakeRule(
+                OvertakeStatus.NO_POSITION_DATA, _no_position_data, tolerance=pd.Timedelta(2, "s")
+            ),
+            OvertakeRule(OvertakeStatus.OFF_TRACK, _off_track, tolerance=pd.Timedelta(2, "s")),
+            # 7. overtaken driver driving slower than 30km/h are considered maybe off track
+            OvertakeRule(
+                OvertakeStatus.MAYBE_OFF_TRACK,
+                _maybe_off_track,
+                tolerance=pd.Timedelta(2, "s"),
+                speed=30,
+            ),
+            # 8. overtaken driver had the lead over this driver for at least 5 seconds
+            OvertakeRule(
+                OvertakeStatus.POSITION_REGAINED,
+                _position_regained,
+                enabled=False,
+                window=pd.Timedelta(15, "s"),
+                lead=pd.Timedelta(5, "s"),
+            ),
+            # 9. driver was close behind the overtaken driver before the overtake, to
+            # filter side-by-side actions and positions gained from a distance
+            OvertakeRule(
+                OvertakeStatus.NO_BATTLE,
+                _no_close_battle,
+                enabled=False,
+                name="NO_CLOSE_BATTLE",
+                threshold=1.0,
+                duration=pd.Timedelta(3, "s"),
+                tolerance=pd.Timedelta(5, "s"),
+            ),
+        ]
     )
-    driver_against_laps = session.laps.pick_driver(driver_against)
-    driver_against_lap = timing.get_lap_at_time(time, driver_against_laps)
-    driver_against_timings = session.timings.pick_driver(driver_against)
-
-    # 1. is not the first lap
-    if lap is None:
-        return driver_against, OvertakeStatus.NO_LAP
-    if lap["LapNumber"] == 1:
-        return driver_against, OvertakeStatus.FIRST_LAP
-
-    if driver_against_lap is None:
-        return driver_against, OvertakeStatus.NO_LAP_OTHER
-    if driver_against_lap["LapNumber"] == 1:
-        return driver_against, OvertakeStatus.FIRST_LAP_OTHER
-
-    # 2. track status is clear with 3 second tolerance for when a non-clear status indicator is raised.
-    last_non_green = None
-    track_status_raised_tolerance = pd.Timedelta(3, "s")
-    for _, ts in session.track_status.iterrows():
-        if last_non_green is None and ts["Status"] != "1":
-            last_non_green = ts
-        if last_non_green is not None and ts["Status"] == "1":
-            if (
-                time >= last_non_green["Time"] - track_status_raised_tolerance
-                and time <= ts["Time"]
-            ):
-                return driver_against, OvertakeStatus.TRACK_STATUS
-            last_non_green = None
-
-    # 3. overtaken driver is not pitted
-    pit_tolerance = pd.Timedelta(2, "s")
-    if timing.is_in_pit(time, driver_against_timings, pit_tolerance):
-        return driver_against, OvertakeStatus.PIT
-
-    # 4. position is maintained for 5 seconds
-    pos_maintained_tolerance = pd.Timedelta(10, "s")
-    next_positions = timings[
-        (timings["Time"] > time) & (timings["Time"] <= time + pos_maintained_tolerance)
+
+
+def _no_lap(c: OvertakeCandidates, rule: OvertakeRule) -> np.ndarray:
+    return c.lap < 0
+
+
+def _first_lap(c: OvertakeCandidates, rule: OvertakeRule) -> np.ndarray:
+    return c.lap_numbers(c.lap) == 1
+
+
+def _no_lap_other(c: OvertakeCandidates, rule: OvertakeRule) -> np.ndarray:
+    return c.against_lap < 0
+
+
+def _first_lap_other(c: OvertakeCandidates, rule: OvertakeRule) -> np.ndarray:
+    return c.lap_numbers(c.against_lap) == 1
+
+
+def _track_status(c: OvertakeCandidates, rule: OvertakeRule) -> np.ndarray:
+    return c.session.is_under_track_status(c.time)
+
+
+def _in_pit(c: OvertakeCandidates, rule: OvertakeRule) -> np.ndarray:
+    tolerance = rule.settings["tolerance"]
+    result = np.zeros(len(c), dtype=bool)
+    for drv in pd.unique(c.against):
+        mask = c.against == drv
+        result[mask] = c.session.pit_intervals.contains(
+            drv, c.time[mask], before=tolerance, after=tolerance
+        )
+    return result
+
+
+def _lost_too_quick(c: OvertakeCandidates, rule: OvertakeRule) -> np.ndarray:
+    tolerance = rule.settings["tolerance"].value
+    lo = c.timings.search(c.driver, c.time, side="right")
+    hi = c.timings.search(c.driver, c.time + tolerance, side="right")
+    candidate, next_row = _expand(lo, hi)
+    lost = c.timings.position[next_row] > c.position[candidate]
+    return np.bincount(candidate[lost], minlength=len(c)) > 0
+
+
+def _no_battle(c: OvertakeCandidates, rule: OvertakeRule) -> np.ndarray:
+    tolerance = rule.settings["tolerance"].value
+    lo = c.timings.search(c.against, c.time - tolerance, side="left")
+    hi = c.timings.search(c.against, c.time, side="left")
+    candidate, against_row = _expand(lo, hi)
+    # the driver's position at the first timing at or after the other driver's timing
+    pos_now = c.timings.position[
+        c.timings.search(c.driver[candidate], c.timings.time[against_row], side="left")
     ]
-    for _, row in next_positions.iterrows():
-        if row["Position"] > position:
-            return driver_against, OvertakeStatus.LOST_TOO_QUICK
-
-    # 5. make sure the other driver was ahead in the last 5 seconds (e.g.
-    # position did not improve due to someone in front pitting, retiring, etc.)
-    time_ahead_tolerance = pd.Timedelta(5, "s")
-    driver_against_prev_positions = driver_against_timings[
-        (driver_against_timings["Time"] < time)
-        & (driver_against_timings["Time"] >= time - time_ahead_tolerance)
+    behind = (pos_now != c.position[candidate]) & (c.timings.position[against_row] > pos_now)
+    return np.bincount(candidate[behind], minlength=len(c)) > 0
+
+
+def _position_regained(c: OvertakeCandidates, rule: OvertakeRule) -> np.ndarray:
+    # the first and last time the other driver was at or ahead of the position within the window
+    lo = c.timings.search(c.against, c.time - rule.settings["window"].value, side="left")
+    hi = c.timings.search(c.against, c.time, side="left")
+    candidate, against_row = _expand(lo, hi)
+    ahead = c.timings.position[against_row] <= c.position[candidate]
+    candidate, times = candidate[ahead], c.timings.time[against_row[ahead]]
+
+    first = np.full(len(c), np.iinfo(np.int64).max)
+    last = np.full(len(c), np.iinfo(np.int64).min)
+    np.minimum.at(first, candidate, times)
+    np.maximum.at(last, candidate, times)
+    found = np.bincount(candidate, minlength=len(c)) > 0
+    return found & (last - np.where(found, first, 0) < rule.settings["lead"].value)
+
+
+def _no_close_battle(c: OvertakeCandidates, rule: OvertakeRule) -> np.ndarray:
+    """
+    Rejects candidates without a battle with the overtaken driver, see
+    `get_battles`, that started before the overtake and ended at most
+    `tolerance` before it.
+    """
+    battles = find_battles(
+        c.timings.driver,
+        c.timings.time,
+        c.timings.interval,
+        c.timings.ahead,
+        rule.settings["threshold"],
+        rule.settings["duration"],
+    )
+    candidates = pd.DataFrame(
+        {
+            "Time": c.time,
+            "DriverNumber": c.driver,
+            "DriverNumberAhead": c.against,
+            "Candidate": np.arange(len(c)),
+        }
+    ).sort_values("Time", kind="stable")
+    battles = pd.DataFrame(
+        {
+            "StartTime": _to_ns(battles["StartTime"]),
+            "EndTime": _to_ns(battles["EndTime"]),
+            "DriverNumber": battles["DriverNumber"],
+            "DriverNumberAhead": battles["DriverNumberAhead"],
+        }
+    ).sort_values("StartTime", kind="stable")
+    # the last battle of the pair starting before each candidate
+    latest = pd.merge_asof(
+        candidates,
+        battles,
+        left_on="Time",
+        right_on="StartTime",
+        by=["DriverNumber", "DriverNumberAhead"],
+    )
+    candidate = latest["Candidate"].to_numpy()
+    ended = (
+        latest["EndTime"].to_numpy(dtype=float)
+        >= c.time[candidate] - rule.settings["tolerance"].value
+    )
+
+    result = np.ones(len(c), dtype=bool)
+    result[candidate] = ~ended
+    return result
+
+
+def _no_position_data(c: OvertakeCandidates, rule: OvertakeRule) -> np.ndarray:
+    return c.session.telemetry_store.position_samples(*_telemetry_window(c, rule)) == 0
+
+
+def _off_track(c: OvertakeCandidates, rule: OvertakeRule) -> np.ndarray:
+    return c.session.telemetry_store.off_track_samples(*_telemetry_window(c, rule)) > 0
+
+
+def _maybe_off_track(c: OvertakeCandidates, rule: OvertakeRule) -> np.ndarray:
+    speed = c.session.telemetry_store.mean_speed(*_telemetry_window(c, rule))
+    return speed <= rule.settings["speed"]
+
+
+def _telemetry_window(c: OvertakeCandidates, rule: OvertakeRule):
+    """
+    Returns the passed drivers and the start and end of their telemetry to check:
+    within the tolerance of the time, and within their lap.
+    """
+    tolerance = rule.settings["tolerance"].value
+    laps = c.session.laps
+    lap = np.maximum(c.against_lap, 0)
+    lap_start = _to_ns(laps["LapStartTime"])[lap]
+    lap_end = _to_ns(laps["Time"])[lap]
+
+    starts = np.maximum(lap_start, c.time - tolerance)
+    ends = np.minimum(lap_end, c.time + tolerance)
+    # no telemetry without a lap
+    ends[c.against_lap < 0] = np.iinfo(np.int64).min
+    return c.against, starts, ends
+
+
+def _classify_parallel(
+    session: Session,
+    timings: _DriverTimings,
+    candidates: OvertakeCandidates,
+    rules: OvertakeRules,
+    workers: int,
+) -> np.ndarray:
+    """
+    Classifies the candidates in worker processes, each getting the candidates
+    of some drivers. The session data the rules read is copied once into shared
+    memory instead of pickling the session for each worker.
+    """
+    arrays = {f"session/{key}": values for key, values in session.to_arrays().items()}
+    arrays.update({f"timings/{key}": values for key, values in timings.to_arrays().items()})
+
+    # split the candidates into chunks of whole drivers of about the same size
+    driver_starts = np.flatnonzero(np.r_[True, candidates.driver[1:] != candidates.driver[:-1]])
+    targets = np.arange(1, workers) * len(candidates) / workers
+    cuts = np.unique(
+        driver_starts[np.minimum(np.searchsorted(driver_starts, targets), len(driver_starts) - 1)]
+    )
+    chunks = [
+        candidates.take(np.arange(start, stop))
+        for start, stop in zip(np.r_[0, cuts], np.r_[cuts, len(candidates)])
+        if stop > start
     ]
-    for _, row in driver_against_prev_positions.iterrows():
-        pos_now_idx = timings[timings["Time"] >= row["Time"]]["Time"].idxmin()
-        pos_now = timings.loc[pos_now_idx]["Position"]
-        if pos_now != position and row["Position"] > pos_now:  # make sure they were ahead
-            return driver_against, OvertakeStatus.NO_BATTLE
-
-    # 6. overtaken driver is off track
-    off_track_tolerance = pd.Timedelta(2, "s")
-    pos_data = driver_against_lap.get_pos_data().slice_by_time(
-        time - off_track_tolerance, time + off_track_tolerance
+
+    with SharedArrays(arrays) as shared, ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(shared,)
+    ) as executor:
+        tasks = [
+            (rules, c.time, c.driver, c.against, c.position, c.lap, c.against_lap) for c in chunks
+        ]
+        results = list(executor.map(_classify_chunk, tasks))
+
+    for _, worker_rules in results:
+        rules.add_stats(worker_rules)
+    return np.concatenate([status for status, _ in results])
+
+
+_worker = {}
+
+
+def _init_worker(shared: SharedArrays):
+    arrays = shared.arrays()
+    _worker["shared"] = shared  # keeps the shared memory open
+    _worker["session"] = Session.from_arrays(
+        {key[len("session/") :]: v for key, v in arrays.items() if key.startswith("session/")}
     )
-    if pos_data.empty:
-        return driver_against, OvertakeStatus.NO_POSITION_DATA
-    elif not pos_data[pos_data["Status"] == "OffTrack"].empty:
-        return driver_against, OvertakeStatus.OFF_TRACK
-
-    # 7. overtaken driver driving slower than 30km/h are considered maybe off track
-    car_data = driver_against_lap.get_car_data().slice_by_time(
-        time - off_track_tolerance, time + off_track_tolerance
+    _worker["timings"] = _DriverTimings.from_arrays(
+        {key[len("timings/") :]: v for key, v in arrays.items() if key.startswith("timings/")}
     )
-    if car_data["Speed"].mean() <= 30:
-        return driver_against, OvertakeStatus.MAYBE_OFF_TRACK
-
-    # 8. overtaken driver had the lead over this driver for at least 5 seconds
-    # TODO: this is shit
-    # od_previous_positions = driver_against_timings[
-    #     (driver_against_timings["Time"] < time)
-    #     & (driver_against_timings["Time"] >= time - pd.Timedelta(15, "s"))
-    # ]
-    # first_occurance, last_occurance = None, None
-    # for _, row in od_previous_positions.iterrows():
-    #     # pos_now_idx = timings[timings["Time"] >= row["Time"]]["Time"].idxmin()
-    #     # pos_now = timings.loc[pos_now_idx]["Position"]
-    #     if row["Position"] <= position:  # and pos_now > row["Position"]:
-    #         if first_occurance is None:
-    #             first_occurance = row["Time"]
-    #         last_occurance = row["Time"]
-
-    # if first_occurance and last_occurance - first_occurance < pd.Timedelta(5, "s"):
-    #     return driver_against, OvertakeStatus.POSITION_REGAINED
-    # --
-
-    # 8. overtaken driver had sufficient lead
-    # make sure the driver had a gap larger than 0.025s in the last 10 seconds
-    # to filter side-by-side actions
-    # prev_positions = timings[
-    #     (timings["Time"] < time) & (timings["Time"] >= time - pd.Timedelta(10, "s"))
-    # ]
-    # for _, row in prev_positions.iterrows():
-    #     if row["Position"] > position:
-    #         interval = __interval_to_timedelta(row["IntervalToPositionAhead"])
-    #         if interval and interval > pd.Timedelta(25, "ms"):
-    #             break
-    #     return driver_against, OvertakeStatus.POSITION_REGAINED
-
-    return driver_against, OvertakeStatus.OK
+
+
+def _classify_chunk(task) -> tuple[np.ndarray, OvertakeRules]:
+    rules, *candidate_arrays = task
+    rules.reset_stats()
+    candidates = OvertakeCandidates(_worker["session"], _worker["timings"], *candidate_arrays)
+    return rules.classify(candidates), rules
+
+
+class _DriverTimings:
+    """
+    Timing rows ordered by driver, then time, so a driver's timing around a
+    time is found with a binary search instead of picking the driver.
+    """
+
+    def __init__(self, timings: pd.DataFrame, timeline: PositionTimeline):
+        codes, drivers = pd.factorize(timings["DriverNumber"].to_numpy(dtype=object))
+        order = np.argsort(codes, kind="stable")
+        self._timings, self._timeline, self._order = timings, timeline, order
+        self._interval = None
+        self._ahead = None
+
+        self.driver = drivers[codes[order]]
+        self.time = _to_ns(timings["Time"])[order]
+        self.position = timings["Position"].to_numpy(dtype=np.int64)[order]
+        self.lap_number = timings["LapNumber"].to_numpy(dtype=object)[order]
+
+        bounds = np.searchsorted(codes[order], np.arange(len(drivers) + 1))
+        self.offsets = {drv: (bounds[i], bounds[i + 1]) for i, drv in enumerate(drivers)}
+        self.first = np.zeros(len(order), dtype=bool)
+        self.first[bounds[:-1]] = True
+
+    @property
+    def interval(self) -> np.ndarray:
+        """
+        IntervalToPositionAhead of each row in seconds, NaN if not updated;
+        parsed on first use.
+        """
+        if self._interval is None:
+            intervals = gap_to_seconds(self._timings["IntervalToPositionAhead"])
+            self._interval = intervals.to_numpy()[self._order]
+        return self._interval
+
+    @property
+    def ahead(self) -> np.ndarray:
+        """
+        Driver number of the driver ahead at each row, empty string for the
+        leader; found on first use.
+        """
+        if self._ahead is None:
+            self._ahead = self._timeline.drivers_at(
+                self.position - 1, self.time, exclude=self.driver
+            )
+        return self._ahead
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        """
+        Returns the timing used by the overtake rules as named arrays, see `from_arrays`.
+        """
+        return {
+            "driver": self.driver.astype(str),
+            "time": self.time,
+            "position": self.position,
+            "interval": self.interval,
+            "ahead": self.ahead.astype(str),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, np.ndarray]) -> _DriverTimings:
+        """
+        Returns the timing of `to_arrays`, without lap numbers.
+        """
+        timings = cls.__new__(cls)
+        timings.driver = arrays["driver"].astype(object)
+        timings.time = arrays["time"]
+        timings.position = arrays["position"]
+        timings.lap_number = None
+        timings._interval = arrays["interval"]
+        timings._ahead = arrays["ahead"].astype(object)
+
+        starts = np.flatnonzero(np.r_[True, timings.driver[1:] != timings.driver[:-1]])
+        stops = np.r_[starts[1:], len(timings.driver)]
+        timings.offsets = {timings.driver[a]: (a, b) for a, b in zip(starts, stops)}
+        timings.first = np.zeros(len(timings.driver), dtype=bool)
+        timings.first[starts] = True
+        return timings
+
+    def rows(self, drivers: list[str]) -> np.ndarray:
+        """
+        Returns the rows of the given drivers, in the given order.
+        """
+        ranges = [np.arange(*self.offsets[drv]) for drv in drivers if drv in self.offsets]
+        return np.concatenate(ranges) if ranges else np.empty(0, dtype=np.int64)
+
+    def search(self, drivers: np.ndarray, times: np.ndarray, side="left") -> np.ndarray:
+        """
+        Returns the rows at which the times would be inserted into the timing
+        of each driver, see `np.searchsorted`.
+        """
+        result = np.zeros(len(times), dtype=np.int64)
+        for drv in pd.unique(drivers):
+            mask = drivers == drv
+            start, stop = self.offsets.get(drv, (0, 0))
+            result[mask] = start + np.searchsorted(self.time[start:stop], times[mask], side=side)
+        return result
+
+
+def _expand(lo: np.ndarray, hi: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns a (candidate, row) pair for every row in [lo, hi) of each candidate.
+    """
+    counts = np.maximum(hi - lo, 0)
+    candidate = np.repeat(np.arange(len(lo)), counts)
+    row = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    return candidate, row
+
+
+def _to_ns(times) -> np.ndarray:
+    return pd.TimedeltaIndex(times).asi8
 
 
 def __get_driver_position_changes(laps: ff1.core.Laps, timing_data: pd.DataFrame) -> pd.DataFrame:
@@ -1,15 +1,23 @@
 import datetime
+from functools import partial
+
 import fastf1 as ff1
 import pandas as pd
 
 from scrape.data import DataMapping
-from scrape.core import Session
+from scrape.core import Fetcher, PitIntervals, Session, fetch
 
-__all__ = ["get_pit_summary"]
+__all__ = ["get_pit_summary", "fetch_pit_summary"]
 
 
 def get_pit_summary(
     session: Session, tz_offset=datetime.timedelta(0)
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    return fetch(partial(fetch_pit_summary, session=session, tz_offset=tz_offset))[0]
+
+
+async def fetch_pit_summary(
+    fetcher: Fetcher, session: Session, tz_offset=datetime.timedelta(0)
 ) -> tuple[pd.DataFrame, pd.DataFrame]:
     mapping: dict[str, DataMapping] = {
         "driverId": DataMapping("DriverID", str),
@@ -22,27 +30,10 @@ def get_pit_summary(
     year = session.event["EventDate"].year
     race_round = session.event["RoundNumber"]
 
-    limit = 30
-    offset = 0
+    url = f"https://ergast.com/api/f1/{year}/{race_round}/pitstops.json"
     content = []
-
-    base_url = (
-        "https://ergast.com/api/f1/{year}/{round}/pitstops.json?limit={limit}&offset={offset}"
-    )
-    url = base_url.format(year=year, round=race_round, limit=0, offset=offset)
-    res = ff1.api.Cache.requests_get(url)
-
-    while True:
-        url = base_url.format(year=year, round=race_round, limit=limit, offset=offset)
-        res = ff1.api.Cache.requests_get(url)
-        if res.status_code != 200:
-            raise Exception(f"expected 200 status, got: {res.status_code}")
-        body = res.json()
-        total = int(body["MRData"]["total"])
-        content.extend(body["MRData"]["RaceTable"]["Races"][0]["PitStops"])
-        if offset + limit >= total:
-            break
-        offset += limit
+    for page in await fetcher.get_ergast_pages(url):
+        content.extend(page["RaceTable"]["Races"][0]["PitStops"])
 
     pit_stops = []
     for item in content:
@@ -89,10 +80,11 @@ def is_time_during_pit(
     pit_out_tolerance=pd.Timedelta(0, "s"),
 ):
     """
-    Returns True if the given time occurs during a pit window.
+    Returns True if the given time occurs during a pit window, from a pit in to
+    the next pit out. If an array of times is given, returns a boolean array.
 
     Args:
-        time: time to check
+        time: time or times to check
         lap_number_hint: narrow down the search to a specific lap
         pit_in_tolerance: the dataset currently doesn't account for when the
             driver is entering the pitlane. This value adds tolerance to the given
@@ -103,22 +95,21 @@ def is_time_during_pit(
         laps = laps[
             (laps["LapNumber"] >= lap_number_hint - 1) & (laps["LapNumber"] <= lap_number_hint + 1)
         ]
+        pit_intervals = PitIntervals.from_laps(laps)
+    elif _is_session_laps(laps):
+        pit_intervals = laps.session.pit_stop_intervals
+    else:
+        pit_intervals = PitIntervals.from_laps(laps)
+
+    during_pit = False
+    for driver in laps["DriverNumber"].unique():
+        during_pit |= pit_intervals.contains(
+            driver, time, before=pit_in_tolerance, after=pit_out_tolerance
+        )
+    return during_pit
+
 
-    last_pit_in = None
-    for _, lap in laps.iterrows():
-        pit_in = lap["PitInTime"] - pit_in_tolerance
-        pit_out = lap["PitOutTime"] + pit_out_tolerance
-
-        if not pd.isnull(pit_in):
-            if time <= pit_in and time >= pit_in:
-                return True
-            last_pit_in = pit_in
-
-        if not pd.isnull(pit_out):
-            if time <= pit_out and time >= pit_out:
-                return True
-            if last_pit_in:
-                if time >= last_pit_in and time <= pit_out:
-                    return True
-                last_pit_in = None
-    return False
+def _is_session_laps(laps: pd.DataFrame) -> bool:
+    # a subset of the laps, e.g. of `pick_driver`, keeps the session but not its laps
+    session = getattr(laps, "session", None)
+    return hasattr(session, "pit_stop_intervals") and laps is session.laps
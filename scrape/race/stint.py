@@ -7,35 +7,15 @@ __all__ = ["get_stint_summary"]
 
 
 def get_stint_summary(session: Session) -> pd.DataFrame:
-    df = session.laps.query("IsAccurate == True")
-    df = df[~df["LapTime"].isnull()]
-    gb = df.groupby(["DriverNumber", "Stint"])
-
-    time = (
-        gb.agg(
-            minidx=("LapTime", "idxmin"),
-            AverageTime=("LapTime", "mean"),
-            Compound=("Compound", "unique"),
-        )
-        .join(df[["LapNumber", "LapTime"]], on="minidx")
-        .rename(columns={"LapNumber": "FastestLap", "LapTime": "FastestLapTime"})
-        .drop(columns=["minidx"])
-        .reset_index()
-    )
-
-    df = session.laps
-    gb = df.groupby(["DriverNumber", "Stint"])
-    lap_count = gb.agg(LapCount=("LapNumber", "count")).reset_index()
-
-    time = time.merge(
-        lap_count, left_on=["DriverNumber", "Stint"], right_on=["DriverNumber", "Stint"]
-    )
-
-    for i, t in time.iterrows():
-        compounds = [c for c in t.Compound if c != "UNKNOWN"]
-        compound = "UNKNOWN"
-        if len(compounds) == 1:
-            compound = compounds[0]
-        time.at[i, "Compound"] = compound
-
-    return time
+    lap_table = session.lap_table
+    df = lap_table.accurate
+    time = lap_table.lap_times(df, ["DriverNumber", "Stint"])
+
+    # the only known compound of the stint, or UNKNOWN
+    known = df[df["Compound"] != "UNKNOWN"].groupby(["DriverNumber", "Stint"])["Compound"]
+    only = known.first()[known.nunique(dropna=False) == 1]
+    compound = pd.Series("UNKNOWN", index=time.index, dtype=object)
+    compound[only.index] = only
+    time.insert(1, "Compound", compound)
+
+    return time.join(lap_table.stint_laps.rename("LapCount"), how="inner").reset_index()
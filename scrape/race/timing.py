@@ -2,7 +2,7 @@ import fastf1 as ff1
 import pandas as pd
 import numpy as np
 
-from scrape.core import Session
+from scrape.core import Session, LapIndex, PositionTimeline
 
 
 def __interval_to_timedelta(x):
@@ -61,9 +61,7 @@ def add_lap_number_to_timing_data(laps: ff1.core.Laps, timing_data: pd.DataFrame
     for idx, t in laps.iterlaps():
         lap_number = str(idx + 1)
         lap_start, lap_end = get_lap_start_end_time(t)
-        matching = df[(lap_start <= df["Time"]) & (lap_end > df["Time"])]
-        for ii, m in matching.iterrows():
-            df.at[ii, "LapNumber"] = lap_number
+        df.loc[(lap_start <= df["Time"]) & (lap_end > df["Time"]), "LapNumber"] = lap_number
 
     return df
 
@@ -73,11 +71,10 @@ def merge_leader_lap(
 ) -> pd.DataFrame:
     target = target.copy()
     target["LapLeader"] = np.nan
-    for idx, t in target.iterrows():
-        time = t["Time"]
-        leader = get_driver_at_position(time, 1, timing_data)
-        if leader:
-            leader_lap = get_lap_at_time(time, laps.pick_driver(leader))
-            if leader_lap is not None:
-                target.at[idx, "LapLeader"] = str(leader_lap.LapNumber)
+    leaders = PositionTimeline(timing_data).drivers_at(
+        np.ones(len(target)), target[target_time_column]
+    )
+    lap_numbers = LapIndex(laps).lap_numbers_at(leaders, target[target_time_column])
+    found = ~np.isnan(lap_numbers)
+    target.loc[found, "LapLeader"] = [str(lap_number) for lap_number in lap_numbers[found]]
     return target
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import sqlalchemy
+from sqlalchemy.orm import Session
+
+__all__ = ["refresh_rankings"]
+
+# the ranks the race pages showed, as computed by the queries of src/libs/db
+_RANKINGS = """
+    WITH races AS (
+        SELECT id FROM race {where}
+    ),
+    laps AS (
+        SELECT
+            lap_summary.driver_race_summary_id,
+            rank() OVER (PARTITION BY race_id ORDER BY fastest_lap_time) AS fastest_lap_rank,
+            rank() OVER (PARTITION BY race_id ORDER BY average_time) AS average_time_rank,
+            rank() OVER (
+                PARTITION BY race_id ORDER BY fastest_lap_average_speed DESC
+            ) AS fastest_lap_average_speed_rank,
+            rank() OVER (
+                PARTITION BY race_id ORDER BY fastest_lap_speed_trap DESC
+            ) AS fastest_lap_speed_trap_rank,
+            rank() OVER (PARTITION BY race_id ORDER BY average_speed DESC) AS average_speed_rank,
+            rank() OVER (
+                PARTITION BY race_id ORDER BY fastest_speed_trap DESC
+            ) AS fastest_speed_trap_rank
+        FROM lap_summary
+        JOIN driver_race_summary ON driver_race_summary.id = lap_summary.driver_race_summary_id
+        WHERE race_id IN races
+    ),
+    pits AS (
+        SELECT
+            pit_summary.driver_race_summary_id,
+            rank() OVER (PARTITION BY race_id ORDER BY average) AS pit_average_rank,
+            rank() OVER (PARTITION BY race_id ORDER BY total_time) AS pit_total_time_rank
+        FROM pit_summary
+        JOIN driver_race_summary ON driver_race_summary.id = pit_summary.driver_race_summary_id
+        WHERE race_id IN races AND average IS NOT NULL AND total_time IS NOT NULL
+    ),
+    -- the lap of the fastest stop is the one of the row with the min duration
+    pit_stops AS (
+        SELECT
+            pit_summary.driver_race_summary_id,
+            race_id,
+            count(*) AS pit_stops,
+            lap_number AS fastest_pit_stop_lap,
+            min(duration) AS fastest_pit_stop_duration
+        FROM pit_stop
+        JOIN pit_summary ON pit_summary.id = pit_stop.pit_summary_id
+        JOIN driver_race_summary ON driver_race_summary.id = pit_summary.driver_race_summary_id
+        WHERE race_id IN races
+        GROUP BY pit_stop.pit_summary_id
+    ),
+    overtakes AS (
+        SELECT driver_race_summary_id, race_id, count(*) AS overtakes
+        FROM overtake
+        JOIN driver_race_summary ON driver_race_summary.id = overtake.driver_race_summary_id
+        WHERE race_id IN races AND (
+            (passing_status = 'OK' AND passing_status_override IS NULL)
+            OR passing_status_override = 'OK'
+        )
+        GROUP BY driver_race_summary_id
+    )
+    SELECT
+        driver_race_summary.id AS driver_race_summary_id,
+        driver_race_summary.race_id,
+        laps.fastest_lap_rank,
+        laps.average_time_rank,
+        laps.fastest_lap_average_speed_rank,
+        laps.fastest_lap_speed_trap_rank,
+        laps.average_speed_rank,
+        laps.fastest_speed_trap_rank,
+        pits.pit_average_rank,
+        pits.pit_total_time_rank,
+        coalesce(pit_stops.pit_stops, 0) AS pit_stops,
+        pit_stops.fastest_pit_stop_lap,
+        pit_stops.fastest_pit_stop_duration,
+        CASE WHEN pit_stops.driver_race_summary_id IS NOT NULL THEN rank() OVER (
+            PARTITION BY pit_stops.race_id ORDER BY pit_stops.fastest_pit_stop_duration
+        ) END AS fastest_pit_stop_rank,
+        coalesce(overtakes.overtakes, 0) AS overtakes,
+        CASE WHEN overtakes.driver_race_summary_id IS NOT NULL THEN rank() OVER (
+            PARTITION BY overtakes.race_id ORDER BY overtakes.overtakes DESC
+        ) END AS overtakes_rank
+    FROM driver_race_summary
+    LEFT JOIN laps ON laps.driver_race_summary_id = driver_race_summary.id
+    LEFT JOIN pits ON pits.driver_race_summary_id = driver_race_summary.id
+    LEFT JOIN pit_stops ON pit_stops.driver_race_summary_id = driver_race_summary.id
+    LEFT JOIN overtakes ON overtakes.driver_race_summary_id = driver_race_summary.id
+    WHERE driver_race_summary.race_id IN races
+"""
+
+
+def refresh_rankings(tx: Session, race_ids: list[int] | None = None):
+    """
+    Recomputes the `race_driver_rankings` of the races, or of every race,
+    without committing. Run it after editing the summaries, e.g. a
+    `passing_status_override`.
+    """
+    # text statements don't autoflush
+    tx.flush()
+    where = "" if race_ids is None else "WHERE id IN :race_ids"
+    params = {} if race_ids is None else {"race_ids": list(race_ids)}
+
+    def text(sql: str) -> sqlalchemy.sql.expression.TextClause:
+        stmt = sqlalchemy.text(sql)
+        if race_ids is not None:
+            stmt = stmt.bindparams(sqlalchemy.bindparam("race_ids", expanding=True))
+        return stmt
+
+    delete = "DELETE FROM race_driver_rankings"
+    if race_ids is not None:
+        delete += " WHERE race_id IN :race_ids"
+    tx.execute(text(delete), params)
+    tx.execute(text(f"INSERT INTO race_driver_rankings {_RANKINGS.format(where=where)}"), params)
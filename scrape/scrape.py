@@ -2,21 +2,17 @@ import logging
 import os
 
 import fastf1 as ff1
+import pandas as pd
 
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from scrape import model
-from scrape.race import (
-    get_lap_summary,
-    get_driver_overtakes,
-    get_pit_summary,
-    get_race,
-    get_driver_summary,
-    get_stint_summary,
-)
+from scrape.race import RaceSummaries, crunch_race, get_race
 from scrape.core import get_session, get_drivers, get_circuits, add_driver_id_or_number
-from scrape.data import to_db_fields, get_one_from_df
+from scrape.data import to_db_fields, to_db_rows
 from scrape.plot import create_fastest_lap_gear_plot
+from scrape.rankings import refresh_rankings
 
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -25,25 +21,21 @@ ff1.Cache.enable_cache(os.path.join(ROOT_DIR, "..", "data", "cache"))
 
 def scrape_drivers(tx: Session, year: int):
     drivers = get_drivers(year).drop(columns="DriverNumber")
-    for _, driver in drivers.iterrows():
-        existing = tx.query(model.Driver).filter_by(driver_id=driver["DriverID"]).one_or_none()
-        if not existing:
-            tx.add(model.Driver(**to_db_fields(driver)))
+    inserted = model.insert_missing(tx, model.Driver, to_db_rows(drivers))
     tx.commit()
+    logging.info(f"added {inserted} of {len(drivers)} drivers of {year}")
 
 
 def scrape_circuits(tx: Session, year: int):
     circuits = get_circuits(year)
-    for _, circuit in circuits.iterrows():
-        existing = tx.query(model.Circuit).filter_by(circuit_id=circuit["CircuitID"]).one_or_none()
-        if not existing:
-            tx.add(model.Circuit(**to_db_fields(circuit)))
+    inserted = model.insert_missing(tx, model.Circuit, to_db_rows(circuits))
     tx.commit()
+    logging.info(f"added {inserted} of {len(circuits)} circuits of {year}")
 
 
-def scrape_race_data(tx: Session, event, year):
+def scrape_race_data(tx: Session, event, year, workers=1, overtake_rules=None, overtake_workers=1):
     session = get_session(year, event, "Race")
-    session.load(telemetry=True, laps=True, weather=False)
+    session.load(telemetry=True, laps=True, weather=False, timing_workers=workers)
 
     drivers = get_drivers(year).query("DriverNumber == @session.drivers")
     print(session.event["Location"], session.event.Country)
@@ -52,94 +44,97 @@ def scrape_race_data(tx: Session, event, year):
         .filter_by(locality=session.event["Location"], country=session.event["Country"])
         .one()
     )
-    race = _get_or_create_race(tx, session, circuit)
     logging.info("loaded race information")
 
     logging.info("crunching data...")
-    lap_summary = get_lap_summary(session)
-    stint_summary = get_stint_summary(session)
-    pit_summary, pit_stops = get_pit_summary(session)
-    driver_summary_df = get_driver_summary(session)
-
-    logging.info("saving driver data...")
-    for _, drv in drivers.iterrows():
-        driver_id = drv["DriverID"]
-        driver_number = drv["DriverNumber"]
-
-        # race summary
-        driver_summary = model.DriverRaceSummary.upsert(
-            tx,
-            race_id=race.id,
-            driver_id=driver_id,
-            **to_db_fields(
-                get_one_from_df(driver_summary_df, f'DriverNumber == "{driver_number}"').drop(
-                    labels="DriverNumber"
-                )
-            ),
-        )
-        tx.commit()
-
-        # lap summary
-        series = get_one_from_df(lap_summary, f'DriverNumber == "{driver_number}"')
-        if series.empty:
-            continue
-        series = series.drop(labels="DriverNumber")
-        model.LapSummary.get_or_create(
-            tx, driver_race_summary_id=driver_summary.id, **to_db_fields(series)
-        )
-        tx.commit()
-
-        # stint summary
-        stints = stint_summary[stint_summary["DriverNumber"] == driver_number]
-        for _, series in stints.iterrows():
-            model.StintSummary.upsert(
-                tx,
-                driver_race_summary_id=driver_summary.id,
-                **to_db_fields(series.drop(labels="DriverNumber")),
-            )
-            tx.commit()
-
-        # pit summary
-        series = get_one_from_df(pit_summary, f'DriverID == "{driver_id}"')
-        if not series.empty:
-            series = series.drop(labels=["TotalStops", "DriverID"])
-        driver_pit_summary = model.PitSummary.get_or_create(
-            tx, driver_race_summary_id=driver_summary.id, **to_db_fields(series)
-        )
-        tx.commit()
-
-        # pit stops
-        df = pit_stops.query(f'DriverID == "{driver_id}"')
-        if not df.empty:
-            df = df.drop(columns=["DriverID", "PitDate", "Time"])
-        for _, p in df.iterrows():
-            model.PitStop.get_or_create(tx, pit_summary_id=driver_pit_summary.id, **to_db_fields(p))
-        tx.commit()
-
-        # overtakes
-        df = get_driver_overtakes(session, driver_number)
-        for _, o in df.iterrows():
-            passed_driver = o["DriverNumberAgainst"]
-            o["PassedDriverID"] = get_one_from_df(drivers, f'DriverNumber == "{passed_driver}"')[
-                "DriverID"
-            ]
-            model.Overtake.get_or_create(
-                tx,
-                driver_race_summary_id=driver_summary.id,
-                **to_db_fields(o.drop(labels=["DriverNumberAgainst", "DriverNumber"])),
-            )
-        tx.commit()
+    summaries = crunch_race(session, overtake_workers, overtake_rules)
 
-        # gear shifts
-        create_fastest_lap_gear_plot(session, race.year, race.circuit_id, driver_number, driver_id)
+    logging.info("saving race data...")
+    race_id = _upsert_race(tx, session, circuit)
+    lapped = _upsert_race_summaries(tx, race_id, drivers, summaries)
+    refresh_rankings(tx, [race_id])
+    tx.commit()
+
+    logging.info("saving gear plots...")
+    race = tx.get(model.Race, race_id)
+    for _, drv in drivers[drivers["DriverNumber"].isin(lapped)].iterrows():
+        create_fastest_lap_gear_plot(
+            session, race.year, race.circuit_id, drv["DriverNumber"], drv["DriverID"]
+        )
 
     logging.info("done!")
 
 
-def _get_or_create_race(
-    tx: Session, session: ff1.core.Session, circuit: model.Circuit
-) -> model.Race:
+def _upsert_race(tx: Session, session: ff1.core.Session, circuit: model.Circuit) -> int:
     fields = to_db_fields(get_race(session))
-    race = model.Race.get_or_create(tx, circuit_id=circuit.circuit_id, **fields)
-    tx.commit()
-    return race
+    model.bulk_upsert(tx, model.Race, [dict(fields, circuit_id=circuit.circuit_id)])
+    return tx.execute(
+        select(model.Race.id).filter_by(date=fields["date"], round_number=fields["round_number"])
+    ).scalar_one()
+
+
+def _upsert_race_summaries(
+    tx: Session, race_id: int, drivers: pd.DataFrame, summaries: RaceSummaries
+) -> list[str]:
+    """
+    Writes the summaries of each driver of a race with one statement per table,
+    without committing. Returns the numbers of the drivers with a lap summary;
+    other drivers only get a race summary.
+    """
+    driver_ids = drivers.set_index("DriverNumber")["DriverID"]
+    drivers = drivers[["DriverNumber", "DriverID"]]
+
+    # race summary
+    df = drivers.merge(summaries.driver_summary, on="DriverNumber", how="left")
+    df = df.drop(columns="DriverNumber").assign(RaceID=race_id)
+    model.bulk_upsert(tx, model.DriverRaceSummary, to_db_rows(df))
+    summary_ids = dict(
+        tx.execute(
+            select(model.DriverRaceSummary.driver_id, model.DriverRaceSummary.id).filter_by(
+                race_id=race_id
+            )
+        ).all()
+    )
+    drivers = drivers.assign(DriverRaceSummaryID=drivers["DriverID"].map(summary_ids))
+
+    # lap summary
+    df = drivers.merge(summaries.lap_summary, on="DriverNumber")
+    model.bulk_upsert(
+        tx, model.LapSummary, to_db_rows(df.drop(columns=["DriverNumber", "DriverID"]))
+    )
+    drivers = drivers[drivers["DriverNumber"].isin(df["DriverNumber"])]
+
+    # stint summary
+    df = drivers.merge(summaries.stint_summary, on="DriverNumber")
+    model.bulk_upsert(
+        tx, model.StintSummary, to_db_rows(df.drop(columns=["DriverNumber", "DriverID"]))
+    )
+
+    # pit summary, also for drivers without pit stops
+    df = drivers.merge(summaries.pit_summary, on="DriverID", how="left")
+    model.bulk_upsert(
+        tx,
+        model.PitSummary,
+        to_db_rows(df.drop(columns=["DriverNumber", "DriverID", "TotalStops"])),
+    )
+    pit_summary_ids = dict(
+        tx.execute(
+            select(model.PitSummary.driver_race_summary_id, model.PitSummary.id).where(
+                model.PitSummary.driver_race_summary_id.in_(drivers["DriverRaceSummaryID"].tolist())
+            )
+        ).all()
+    )
+
+    # pit stops
+    df = drivers.merge(summaries.pit_stops, on="DriverID")
+    df = df.assign(PitSummaryID=df["DriverRaceSummaryID"].map(pit_summary_ids))
+    df = df.drop(columns=["DriverNumber", "DriverID", "DriverRaceSummaryID", "PitDate", "Time"])
+    model.bulk_upsert(tx, model.PitStop, to_db_rows(df))
+
+    # overtakes
+    df = drivers.merge(summaries.overtakes, on="DriverNumber")
+    df = df.assign(PassedDriverID=df["DriverNumberAgainst"].map(driver_ids))
+    df = df.drop(columns=["DriverNumber", "DriverID", "DriverNumberAgainst"])
+    model.bulk_upsert(tx, model.Overtake, to_db_rows(df))
+
+    return drivers["DriverNumber"].tolist()
@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import datetime
+import hashlib
+import json
+import logging
+import math
+import os
+from collections import defaultdict
+
+import sqlalchemy
+from sqlalchemy.orm import Session
+
+from scrape import model
+
+__all__ = ["render_snapshots", "SNAPSHOT_DIR"]
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SNAPSHOT_DIR = os.path.join(ROOT_DIR, "..", "public", "snapshots")
+
+# overtake rank of drivers without overtakes, as src/libs/db/overtake-summary.ts
+_NO_OVERTAKES_RANK = 20
+
+
+def render_snapshots(
+    engine: sqlalchemy.engine.Engine, directory=SNAPSHOT_DIR, year: int = None, force=False
+) -> list[model.Race]:
+    """
+    Writes the props of each driver's race page, as the loaders of src/libs/db
+    return them, to `races/<year>/circuits/<circuit_id>/drivers/<driver_id>.json`
+    and an index of each race's drivers to `races/<year>/circuits/<circuit_id>/index.json`.
+
+    A race is only written when its documents differ from the last written
+    ones, unless `force` is set. Returns the written races.
+    """
+    with Session(engine) as tx:
+        races = tx.query(model.Race)
+        if year is not None:
+            races = races.filter_by(year=year)
+        races = races.order_by(model.Race.date).all()
+        documents = _race_documents(tx, races)
+
+    written = []
+    for race in races:
+        if race.id not in documents:
+            continue
+        index, drivers = documents[race.id]
+        race_dir = os.path.join(directory, "races", str(race.year), "circuits", race.circuit_id)
+        index_path = os.path.join(race_dir, "index.json")
+        if not force and _read_hash(index_path) == index["hash"]:
+            continue
+
+        drivers_dir = os.path.join(race_dir, "drivers")
+        os.makedirs(drivers_dir, exist_ok=True)
+        for filename in os.listdir(drivers_dir):
+            if filename[: -len(".json")] not in drivers:
+                os.remove(os.path.join(drivers_dir, filename))
+        for driver_id, document in drivers.items():
+            _write_json(os.path.join(drivers_dir, f"{driver_id}.json"), document)
+        # the index goes last, so an interrupted race is written again by the next run
+        _write_json(index_path, index)
+        logging.info(f"rendered {len(drivers)} snapshots of {race.year} {race.circuit_id}")
+        written.append(race)
+    return written
+
+
+def _race_documents(tx: Session, races: list[model.Race]) -> dict[int, tuple[dict, dict]]:
+    race_ids = [race.id for race in races]
+    summaries = (
+        tx.query(model.DriverRaceSummary)
+        .filter(model.DriverRaceSummary.race_id.in_(race_ids))
+        .order_by(model.DriverRaceSummary.id)
+        .all()
+    )
+
+    def by_summary(table) -> list:
+        return (
+            tx.query(table)
+            .join(model.DriverRaceSummary)
+            .filter(model.DriverRaceSummary.race_id.in_(race_ids))
+            .order_by(table.id)
+            .all()
+        )
+
+    drivers = {driver.driver_id: driver for driver in tx.query(model.Driver)}
+    laps = {lap.driver_race_summary_id: lap for lap in by_summary(model.LapSummary)}
+    pits = {pit.driver_race_summary_id: pit for pit in by_summary(model.PitSummary)}
+    stints = defaultdict(list)
+    for stint in by_summary(model.StintSummary):
+        stints[stint.driver_race_summary_id].append(stint)
+    rankings = {
+        ranking.driver_race_summary_id: ranking
+        for ranking in tx.query(model.RaceDriverRanking).filter(
+            model.RaceDriverRanking.race_id.in_(race_ids)
+        )
+    }
+
+    races = {race.id: race for race in races}
+    documents = defaultdict(dict)
+    for summary in summaries:
+        race = races[summary.race_id]
+        ranking = rankings.get(summary.id)
+        documents[race.id][summary.driver_id] = {
+            "raceSummary": _race_summary(summary),
+            "race": _race(race),
+            "driver": _driver(drivers.get(summary.driver_id)),
+            "lapSummary": _lap_summary(laps.get(summary.id), ranking),
+            "pitSummary": _pit_summary(pits.get(summary.id), ranking),
+            "overtakeSummary": _overtake_summary(summary.id, ranking),
+            "stintSummaries": [_stint_summary(stint) for stint in stints[summary.id]],
+        }
+
+    indexes = {}
+    for race_id, race_drivers in documents.items():
+        index = {
+            "race": _race(races[race_id]),
+            "drivers": sorted(
+                (
+                    {
+                        "driverId": driver_id,
+                        **(document["driver"] or {}),
+                        "position": document["raceSummary"]["position"],
+                    }
+                    for driver_id, document in race_drivers.items()
+                ),
+                key=lambda driver: (driver["position"] is None, driver["position"]),
+            ),
+        }
+        index["hash"] = hashlib.sha1(
+            json.dumps([index, race_drivers], sort_keys=True).encode()
+        ).hexdigest()
+        indexes[race_id] = (index, race_drivers)
+    return indexes
+
+
+def _race(race: model.Race) -> dict:
+    return {
+        "year": race.year,
+        "circuitId": race.circuit_id,
+        "roundNumber": race.round_number,
+        "eventName": race.event_name,
+    }
+
+
+def _driver(driver: model.Driver | None) -> dict | None:
+    if driver is None:
+        return None
+    return {
+        "driverId": driver.driver_id,
+        "code": driver.code,
+        "firstName": driver.first_name,
+        "lastName": driver.last_name,
+    }
+
+
+def _race_summary(summary: model.DriverRaceSummary) -> dict:
+    return {
+        "id": summary.id,
+        "driverId": summary.driver_id,
+        "raceId": summary.race_id,
+        "gridPosition": _to_int(summary.grid_position),
+        "position": _to_int(summary.position),
+        "seasonStanding": _to_int(summary.season_standing),
+        "seasonPoints": _to_int(summary.season_points),
+        "status": summary.status,
+        "podiums": summary.podiums,
+        "wins": summary.wins,
+        "lapsCompleted": summary.laps_completed,
+        "time": _format_time(summary.time, "hh:mm:ss.SSS"),
+    }
+
+
+def _lap_summary(
+    lap: model.LapSummary | None, ranking: model.RaceDriverRanking | None
+) -> dict | None:
+    if lap is None or ranking is None:
+        return None
+    return {
+        "driverRaceSummaryId": lap.driver_race_summary_id,
+        "fastestLap": lap.fastest_lap,
+        "fastestLapTime": _format_time(lap.fastest_lap_time, "mm:ss.SSS"),
+        "fastestLapAverageSpeed": lap.fastest_lap_average_speed,
+        "fastestLapSpeedTrap": lap.fastest_lap_speed_trap,
+        "averageTime": _format_time(lap.average_time, "mm:ss.SSS"),
+        "averageSpeed": lap.average_speed,
+        "fastestSpeedTrap": lap.fastest_speed_trap,
+        "fastestLapRank": ranking.fastest_lap_rank,
+        "averageTimeRank": ranking.average_time_rank,
+        "fastestLapAverageSpeedRank": ranking.fastest_lap_average_speed_rank,
+        "fastestLapSpeedTrapRank": ranking.fastest_lap_speed_trap_rank,
+        "averageSpeedRank": ranking.average_speed_rank,
+        "fastestSpeedTrapRank": ranking.fastest_speed_trap_rank,
+    }
+
+
+def _pit_summary(
+    pit: model.PitSummary | None, ranking: model.RaceDriverRanking | None
+) -> dict | None:
+    if pit is None or ranking is None or ranking.pit_average_rank is None:
+        return None
+    return {
+        "id": pit.id,
+        "driverRaceSummaryId": pit.driver_race_summary_id,
+        "average": _format_time(pit.average, "ss.SSS"),
+        "totalTime": _format_time(pit.total_time, "mm:ss.SSS"),
+        "totalStops": ranking.pit_stops,
+        "averageRank": ranking.pit_average_rank,
+        "totalTimeRank": ranking.pit_total_time_rank,
+        "fastestPitTime": _format_time(ranking.fastest_pit_stop_duration, "mm:ss.SSS"),
+        "fastestPitLap": ranking.fastest_pit_stop_lap,
+        "fastestPitRank": ranking.fastest_pit_stop_rank,
+    }
+
+
+def _overtake_summary(summary_id: int, ranking: model.RaceDriverRanking | None) -> dict:
+    if ranking is None or ranking.overtakes_rank is None:
+        return {
+            "driverRaceSummaryId": summary_id,
+            "overtakes": 0,
+            "overtakesRank": _NO_OVERTAKES_RANK,
+        }
+    return {
+        "driverRaceSummaryId": summary_id,
+        "overtakes": ranking.overtakes,
+        "overtakesRank": ranking.overtakes_rank,
+    }
+
+
+def _stint_summary(stint: model.StintSummary) -> dict:
+    return {
+        "driverRaceSummaryId": stint.driver_race_summary_id,
+        "stint": stint.stint,
+        "averageTime": _format_time(stint.average_time, "mm:ss.SSS"),
+        "lapCount": stint.lap_count,
+        "compound": stint.compound,
+    }
+
+
+def _format_time(value: datetime.timedelta | None, fmt: str) -> str | None:
+    """
+    Formats a duration as the frontend does with moment, where e.g. "mm" is the
+    minutes of the hour and "hh" is the hour of a 12-hour clock.
+    """
+    if value is None:
+        return None
+    time = datetime.datetime(1970, 1, 1) + value
+    parts = {
+        "hh": f"{time.hour % 12 or 12:02d}",
+        "mm": f"{time.minute:02d}",
+        "ss": f"{time.second:02d}",
+        "SSS": f"{time.microsecond // 1000:03d}",
+    }
+    for token, part in parts.items():
+        fmt = fmt.replace(token, part)
+    return fmt
+
+
+def _to_int(value) -> int | None:
+    # as parseInt, which the frontend uses on positions stored as "10.0"
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(number) else int(number)
+
+
+def _read_hash(path: str) -> str | None:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f).get("hash")
+
+
+def _write_json(path: str, document: dict):
+    with open(path, "w") as f:
+        json.dump(document, f, separators=(",", ":"))
@@ -22,7 +22,7 @@ export interface LapSummary {
 export const getLapSummary = async (knex: Knex, raceId: number, raceSummaryId: number): Promise<LapSummary | null> => {
   const lapSummary = await knex
     .select({
-      driverRaceSummaryId: "driver_race_summary_id",
+      driverRaceSummaryId: "lap_summary.driver_race_summary_id",
       fastestLap: "fastest_lap",
       fastestLapTime: "fastest_lap_time",
       fastestLapAverageSpeed: "fastest_lap_average_speed",
@@ -37,23 +37,10 @@ export const getLapSummary = async (knex: Knex, raceId: number, raceSummaryId: n
       averageSpeedRank: "average_speed_rank",
       fastestSpeedTrapRank: "fastest_speed_trap_rank",
     })
-    .from(
-      knex
-        .select('*')
-        .rank('fastest_lap_rank', 'fastest_lap_time')
-        .rank('average_time_rank', 'average_time')
-        .rank('fastest_lap_average_speed_rank', function() { this.orderBy('fastest_lap_average_speed', 'desc') })
-        .rank('fastest_lap_speed_trap_rank', function() { this.orderBy('fastest_lap_speed_trap', 'desc') })
-        .rank('average_speed_rank', function() { this.orderBy('average_speed', 'desc') })
-        .rank('fastest_speed_trap_rank', function() { this.orderBy('fastest_speed_trap', 'desc') })
-        .from(knex
-          .select('*')
-          .from('lap_summary')
-          .join("driver_race_summary", { "driver_race_summary.id": "lap_summary.driver_race_summary_id" })
-          .where({'driver_race_summary.race_id': raceId})
-        )
-    )
-    .where({ driverRaceSummaryId: raceSummaryId })
+    .from('lap_summary')
+    // ranks are materialized by the scrape, see scrape/rankings.py
+    .join('race_driver_rankings', { 'race_driver_rankings.driver_race_summary_id': 'lap_summary.driver_race_summary_id' })
+    .where({ 'lap_summary.driver_race_summary_id': raceSummaryId })
     .first();
   if (!lapSummary) {
     return null;
@@ -7,37 +7,18 @@ export interface OvertakeSummary {
 }
 
 export const getOvertakeSummary = async (knex: Knex, raceId: number, raceSummaryId: number): Promise<OvertakeSummary | null> => {
+  // ranks are materialized by the scrape, see scrape/rankings.py
   const overtakeSummary = await knex
     .select({
       driverRaceSummaryId: 'driver_race_summary_id',
-      overtakes: 'overtakes_count',
+      overtakes: 'overtakes',
       overtakesRank: 'overtakes_rank',
     })
-    .from(
-      knex
-        .select('*')
-        .rank('overtakes_rank', function () { this.orderBy('overtakes_count', 'desc') } )
-        .from(knex
-          .select('*')
-          .count('*', {as: 'overtakes_count'})
-          .from('overtake')
-          .join("driver_race_summary", { "driver_race_summary.id": "overtake.driver_race_summary_id" })
-          .where({ 'driver_race_summary.race_id': raceId })
-            .andWhere(function () {
-              this.andWhere(function () {
-                this
-                  .andWhere({ 'passing_status': 'OK' })
-                  .andWhere({'passing_status_override': null})
-              })
-              .orWhere({ 'passing_status_override': 'OK' })
-          })
-        .groupBy('driver_race_summary_id')
-      )
-    )
-    .where({ driverRaceSummaryId: raceSummaryId })
+    .from('race_driver_rankings')
+    .where({ driver_race_summary_id: raceSummaryId })
     .first()
 
-  if (!overtakeSummary) {
+  if (!overtakeSummary || overtakeSummary.overtakesRank === null) {
     return {
       driverRaceSummaryId: raceSummaryId,
       overtakes: 0,
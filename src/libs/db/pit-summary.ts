@@ -25,28 +25,24 @@ export interface PitStop {
 }
 
 export const getPitSummary = async (knex: Knex, raceId: number, raceSummaryId: number): Promise<PitSummary | null> => {
+  // ranks are materialized by the scrape, see scrape/rankings.py
   const pitSummary = await knex
     .select<PitSummary>({
       id: "id",
-      driverRaceSummaryId: "driver_race_summary_id",
+      driverRaceSummaryId: "pit_summary.driver_race_summary_id",
       average: "average",
       totalTime: "total_time",
-      averageRank: "average_rank",
-      totalTimeRank: "total_time_rank",
+      totalStops: "pit_stops",
+      averageRank: "pit_average_rank",
+      totalTimeRank: "pit_total_time_rank",
+      fastestPitTime: "fastest_pit_stop_duration",
+      fastestPitLap: "fastest_pit_stop_lap",
+      fastestPitRank: "fastest_pit_stop_rank",
     })
-    .from(
-      knex
-        .select('*')
-        .rank('average_rank', 'average')
-        .rank('total_time_rank', 'total_time')
-        .from(knex
-          .select('*')
-          .from('pit_summary')
-          .join("driver_race_summary", { "driver_race_summary.id": "pit_summary.driver_race_summary_id" })
-          .where({'driver_race_summary.race_id': raceId}).andWhereNot({'average': null}).andWhereNot({'total_time': null})
-      )
-    )
-    .where({ driverRaceSummaryId: raceSummaryId })
+    .from('pit_summary')
+    .join('race_driver_rankings', { 'race_driver_rankings.driver_race_summary_id': 'pit_summary.driver_race_summary_id' })
+    .where({ 'pit_summary.driver_race_summary_id': raceSummaryId })
+    .andWhereNot({ 'pit_average_rank': null })
     .first();
   if (!pitSummary) {
     return null;
@@ -59,42 +55,9 @@ export const getPitSummary = async (knex: Knex, raceId: number, raceSummaryId: n
   const total = moment(pitSummary.totalTime);
   pitSummary.totalTime = total.format("mm:ss.SSS");
 
-  const pitStops = await knex
-    .count('*', { as: 'total_stops' })
-    .from('pit_stop')
-    .where({ 'pit_stop.pit_summary_id': pitSummary.id }).first();
-  pitSummary.totalStops = pitStops.total_stops;
-
-  const fastestPitStop = await knex
-    .select<PitStop>({
-      pitSummaryId: "pit_summary_id",
-      lapNumber: "lap_number",
-      stop: "stop",
-      duration: "duration",
-      durationRank: "duration_rank",
-    })
-    .from(
-      knex
-        .select('*')
-        .rank('duration_rank', 'fastest_pit_stop_duration')
-        .from(knex
-          .select('*')
-          .min('duration', {as: 'fastest_pit_stop_duration'})
-          .from('pit_stop')
-          .join("pit_summary", { "pit_summary.id": "pit_stop.pit_summary_id" })
-          .join("driver_race_summary", { "driver_race_summary.id": "pit_summary.driver_race_summary_id" })
-          .where({'driver_race_summary.race_id': raceId})
-          .groupBy('pit_summary_id')
-        )
-    )
-    .where({ pitSummaryId: pitSummary.id })
-    .first();
-
-  if (fastestPitStop) {
-    const fastest = moment(fastestPitStop.duration);
+  if (pitSummary.fastestPitTime) {
+    const fastest = moment(pitSummary.fastestPitTime);
     pitSummary.fastestPitTime = fastest.format("mm:ss.SSS");
-    pitSummary.fastestPitLap = fastestPitStop.lapNumber;
-    pitSummary.fastestPitRank = fastestPitStop.durationRank;
   }
 
   return pitSummary;
@@ -0,0 +1,27 @@
+import sqlalchemy
+
+from scrape.db import configure_connection, create_connection
+
+
+def test_connection(tmp_path):
+    configure_connection(f"sqlite:///{tmp_path / 'db.sqlite'}", {"cache_size": -1000})
+    try:
+        engine = create_connection()
+        assert create_connection() is engine
+
+        with engine.begin() as conn:
+            assert conn.execute(sqlalchemy.text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(sqlalchemy.text("PRAGMA cache_size")).scalar() == -1000
+            conn.execute(sqlalchemy.text("CREATE TABLE race (id INTEGER)"))
+
+        # a commit doesn't wait for readers, who keep reading what was committed when they began
+        with engine.connect() as writer, engine.connect() as reader:
+            reader.exec_driver_sql("BEGIN")
+            assert reader.execute(sqlalchemy.text("SELECT count(*) FROM race")).scalar() == 0
+            with writer.begin():
+                writer.execute(sqlalchemy.text("INSERT INTO race VALUES (1)"))
+            assert reader.execute(sqlalchemy.text("SELECT count(*) FROM race")).scalar() == 0
+            reader.exec_driver_sql("COMMIT")
+            assert reader.execute(sqlalchemy.text("SELECT count(*) FROM race")).scalar() == 1
+    finally:
+        configure_connection()
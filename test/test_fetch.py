@@ -0,0 +1,158 @@
+import asyncio
+import datetime
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import fastf1 as ff1
+import pandas as pd
+import pytest
+import requests_cache
+
+from scrape.core import Fetcher, fetch, get_drivers
+from scrape.core import driver
+
+TOTAL = 65
+
+
+class _ErgastStub(BaseHTTPRequestHandler):
+    """
+    Serves `TOTAL` results paginated like Ergast, slowly enough for requests
+    to overlap.
+    """
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(0.05)
+
+        query = parse_qs(urlparse(self.path).query)
+        limit, offset = int(query["limit"][0]), int(query["offset"][0])
+        body = {
+            "MRData": {
+                "total": str(TOTAL),
+                "Results": list(range(offset, min(offset + limit, TOTAL))),
+            }
+        }
+        content = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+        with server.lock:
+            server.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ergast_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ErgastStub)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.in_flight = server.max_in_flight = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def http_cache(tmp_path, monkeypatch):
+    session = requests_cache.CachedSession(
+        cache_name=str(tmp_path / "fastf1_http_cache"),
+        backend="sqlite",
+        expire_after=datetime.timedelta(hours=12),
+    )
+    monkeypatch.setattr(ff1.api.Cache, "_requests_session", session)
+    monkeypatch.setattr(ff1.api.Cache, "_tmp_disabled", False)
+    monkeypatch.setattr(ff1.api.Cache, "_CACHE_DIR", str(tmp_path))
+    return session
+
+
+def _url(server, name="results.json"):
+    return f"http://127.0.0.1:{server.server_port}/{name}"
+
+
+def test_ergast_pages(ergast_stub, monkeypatch):
+    monkeypatch.setattr(ff1.api.Cache, "_requests_session", None)
+
+    async def results(fetcher: Fetcher):
+        pages = await fetcher.get_ergast_pages(_url(ergast_stub), limit=10)
+        return [result for page in pages for result in page["Results"]]
+
+    assert fetch(results, concurrency=3) == [list(range(TOTAL))]
+    offsets = sorted(int(parse_qs(urlparse(p).query)["offset"][0]) for p in ergast_stub.requests)
+    assert offsets == list(range(0, TOTAL, 10))
+    assert ergast_stub.max_in_flight == 3
+
+
+def test_fetch_in_running_loop(ergast_stub, monkeypatch):
+    monkeypatch.setattr(ff1.api.Cache, "_requests_session", None)
+
+    async def results(fetcher: Fetcher):
+        return (await fetcher.get_json(_url(ergast_stub) + "?limit=5&offset=0"))["MRData"]
+
+    async def main():
+        return fetch(results)
+
+    [body] = asyncio.run(main())
+    assert body["Results"] == list(range(5))
+
+
+def test_cache(ergast_stub, http_cache):
+    url = _url(ergast_stub) + "?limit=30&offset=0"
+
+    async def get_twice(fetcher: Fetcher):
+        return await fetcher.get_json(url), await fetcher.get_json(url)
+
+    [(first, second)] = fetch(get_twice)
+    assert first == second
+    assert len(ergast_stub.requests) == 1
+
+    # responses are shared with fastf1's requests
+    res = ff1.api.Cache.requests_get(url)
+    assert res.from_cache
+    assert res.json() == first
+    assert len(ergast_stub.requests) == 1
+
+
+def test_drivers_cache(http_cache, monkeypatch):
+    fetched = []
+
+    def fake_fetch(call):
+        fetched.append(call.keywords["year"])
+        drivers = pd.DataFrame(
+            {
+                "DriverID": ["max_verstappen"],
+                "DriverNumber": ["1"],
+                "PermanentNumber": ["33"],
+                "Code": ["VER"],
+                "Birthday": [datetime.date(1997, 9, 30)],
+            }
+        )
+        return [drivers]
+
+    monkeypatch.setattr(driver, "fetch", fake_fetch)
+    monkeypatch.setattr(driver, "_drivers", {})
+    current = datetime.date.today().year
+
+    drivers = get_drivers(2022)
+    drivers["Code"] = "changed"
+    assert get_drivers(2022)["Code"].tolist() == ["VER"]
+    get_drivers(current)
+    assert fetched == [2022, current]
+
+    # past seasons are read from the disk in the next runs
+    monkeypatch.setattr(driver, "_drivers", {})
+    pd.testing.assert_frame_equal(get_drivers(2022), drivers.assign(Code="VER"))
+    get_drivers(current)
+    assert fetched == [2022, current, current]
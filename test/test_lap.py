@@ -0,0 +1,69 @@
+import pandas as pd
+import requests
+
+from scrape.core import Fetcher
+from scrape.race import crunch, crunch_race, get_lap_summary
+
+
+def test_lap_summary_speed(austria_2022):
+    session, drivers = austria_2022
+    summary = get_lap_summary(session).set_index("DriverNumber")
+
+    for driver_number in summary.index:
+        laps = session.laps.pick_driver(driver_number)
+        laps = laps[laps["PitOutTime"].isnull() & laps["PitInTime"].isnull()]
+        fastest = laps.pick_fastest()
+        row = summary.loc[driver_number]
+        assert row["FastestLap"] == laps.loc[laps["LapTime"].idxmin(), "LapNumber"]
+        assert row["FastestLapAverageSpeed"] == round(fastest.get_car_data()["Speed"].mean(), 3)
+        assert row["FastestLapSpeedTrap"] == fastest["SpeedST"]
+        assert row["FastestSpeedTrap"] == laps["SpeedST"].max()
+        assert row["AverageSpeed"] == round(laps.get_car_data()["Speed"].mean(), 3)
+
+
+def _read_baseline(name: str, timedeltas=()) -> pd.DataFrame:
+    # saved from the summaries of the first implementation
+    df = pd.read_csv(
+        f"test/test_data/{name}_2022_aut.csv",
+        dtype={"DriverNumber": str},
+        float_precision="round_trip",
+    )
+    return df.astype({column: "timedelta64[ns]" for column in timedeltas})
+
+
+def test_crunch_race(austria_2022, monkeypatch):
+    session, drivers = austria_2022
+
+    # serves a stub of the championship prediction, and no pit stops, to run offline
+    async def get(self, url):
+        assert url.endswith("ChampionshipPrediction.json")
+        res = requests.Response()
+        res.status_code = 200
+        with open("test/test_data/championship_prediction_2022_aut.json", "rb") as f:
+            res._content = f.read()
+        return res
+
+    async def fetch_pit_summary(fetcher, session):
+        return pd.DataFrame(), pd.DataFrame()
+
+    monkeypatch.setattr(Fetcher, "get", get)
+    monkeypatch.setattr(crunch, "fetch_pit_summary", fetch_pit_summary)
+    summaries = crunch_race(session)
+
+    pd.testing.assert_frame_equal(
+        summaries.lap_summary,
+        _read_baseline("lap_summary", ["AverageTime", "FastestLapTime"]),
+    )
+    pd.testing.assert_frame_equal(
+        summaries.stint_summary,
+        _read_baseline("stint_summary", ["AverageTime", "FastestLapTime"]),
+    )
+
+    driver_summary = _read_baseline("driver_summary")
+    pd.testing.assert_frame_equal(
+        summaries.driver_summary.reset_index(drop=True),
+        session.results[["DriverNumber", "Position", "GridPosition", "Status", "Points", "Time"]]
+        .reset_index(drop=True)
+        .merge(driver_summary, on="DriverNumber", how="left"),
+        check_frame_type=False,
+    )
@@ -0,0 +1,143 @@
+import datetime
+
+import sqlalchemy
+from sqlalchemy.orm import Session
+
+from scrape import model
+from scrape.benchmark import FRONTEND_QUERIES, benchmark_db, create_benchmark_db
+from scrape.rankings import refresh_rankings
+
+
+def test_bulk_upsert():
+    engine = sqlalchemy.create_engine("sqlite://")
+    model.Base.metadata.create_all(engine)
+
+    summaries = [
+        {"race_id": 1, "driver_id": "albon", "position": "10.0"},
+        {"race_id": 1, "driver_id": "alonso", "position": "5.0"},
+    ]
+    overtake = {
+        "driver_race_summary_id": 1,
+        "time": datetime.timedelta(minutes=30),
+        "lap_number": 12,
+        "position": 9,
+        "passed_driver_id": "alonso",
+        "passing_status": "OK",
+    }
+    with Session(engine) as tx:
+        model.bulk_upsert(tx, model.DriverRaceSummary, summaries)
+        model.bulk_upsert(tx, model.Overtake, [overtake])
+        tx.commit()
+
+        tx.query(model.Overtake).update({"passing_status_override": "PIT"})
+        summaries[0]["position"] = "9.0"
+        model.bulk_upsert(tx, model.DriverRaceSummary, summaries)
+        model.bulk_upsert(tx, model.Overtake, [overtake])
+        tx.commit()
+
+        rows = tx.query(model.DriverRaceSummary).order_by(model.DriverRaceSummary.id).all()
+        assert [(r.id, r.driver_id, r.position) for r in rows] == [
+            (1, "albon", "9.0"),
+            (2, "alonso", "5.0"),
+        ]
+        # existing overtakes are kept as they are, with their override
+        overtakes = tx.query(model.Overtake).all()
+        assert len(overtakes) == 1
+        assert overtakes[0].passing_status_override == "PIT"
+
+        # a reclassified overtake, one with an unknown passed driver, and one
+        # passing another driver at the same time
+        unknown = {**overtake, "passed_driver_id": None}
+        other = {**overtake, "passed_driver_id": "albon"}
+        for passing_status in ["OK", "CLOSE_BATTLE"]:
+            rows = [{**row, "passing_status": passing_status} for row in [overtake, unknown, other]]
+            model.bulk_upsert(tx, model.Overtake, rows)
+            tx.commit()
+
+        overtakes = tx.query(model.Overtake).order_by(model.Overtake.id).all()
+        assert [(o.id, o.passed_driver_id, o.passing_status) for o in overtakes] == [
+            (1, "alonso", "CLOSE_BATTLE"),
+            (2, None, "CLOSE_BATTLE"),
+            (3, "albon", "CLOSE_BATTLE"),
+        ]
+        assert overtakes[0].passing_status_override == "PIT"
+
+
+def test_insert_missing():
+    engine = sqlalchemy.create_engine("sqlite://")
+    model.Base.metadata.create_all(engine)
+
+    with Session(engine) as tx:
+        tx.add(model.Circuit(circuit_id="monza", name="Autodromo Nazionale di Monza"))
+        tx.commit()
+
+        circuits = [
+            {"circuit_id": "monza", "name": "Monza"},
+            {"circuit_id": "spa", "name": "Circuit de Spa-Francorchamps"},
+            {"circuit_id": "spa", "name": "Circuit de Spa-Francorchamps"},
+        ]
+        assert model.insert_missing(tx, model.Circuit, circuits) == 1
+        assert model.insert_missing(tx, model.Circuit, circuits) == 0
+        tx.commit()
+
+        rows = tx.query(model.Circuit).order_by(model.Circuit.circuit_id).all()
+        assert [(r.circuit_id, r.name) for r in rows] == [
+            ("monza", "Autodromo Nazionale di Monza"),
+            ("spa", "Circuit de Spa-Francorchamps"),
+        ]
+
+
+def test_benchmark_db():
+    engine = sqlalchemy.create_engine("sqlite://")
+    create_benchmark_db(engine, seasons=1, rounds=2, drivers=3)
+
+    report = benchmark_db(engine, repeat=1)
+    assert list(FRONTEND_QUERIES) == [name for name in report.index if name in FRONTEND_QUERIES]
+    assert report["After"].notna().all()
+
+
+def test_refresh_rankings():
+    engine = sqlalchemy.create_engine("sqlite://")
+    model.Base.metadata.create_all(engine)
+
+    def lap(summary_id, seconds):
+        return {"driver_race_summary_id": summary_id, "fastest_lap_time": seconds}
+
+    def overtake(summary_id, lap_number, status):
+        return {
+            "driver_race_summary_id": summary_id,
+            "lap_number": lap_number,
+            "passing_status": status,
+        }
+
+    with Session(engine) as tx:
+        model.bulk_upsert(tx, model.Race, [{"id": 1, "date": datetime.date(2022, 3, 20)}])
+        model.bulk_upsert(
+            tx,
+            model.DriverRaceSummary,
+            [{"id": i, "race_id": 1, "driver_id": f"driver_{i}"} for i in (1, 2, 3)],
+        )
+        for summary_id, seconds in [(1, 92.1), (2, 91.5), (3, 92.1)]:
+            tx.add(model.LapSummary(**lap(summary_id, datetime.timedelta(seconds=seconds))))
+        tx.add_all(
+            [
+                model.Overtake(**overtake(1, 1, "OK")),
+                model.Overtake(**overtake(2, 2, "OK")),
+                model.Overtake(**overtake(2, 3, "OK")),
+                model.Overtake(**overtake(3, 4, "PIT")),
+            ]
+        )
+        refresh_rankings(tx, [1])
+        tx.commit()
+
+        def rankings():
+            rows = tx.query(model.RaceDriverRanking).order_by("driver_race_summary_id")
+            return [(r.fastest_lap_rank, r.overtakes, r.overtakes_rank) for r in rows]
+
+        assert rankings() == [(2, 1, 2), (1, 2, 1), (2, 0, None)]
+
+        tx.query(model.Overtake).filter_by(lap_number=4).update({"passing_status_override": "OK"})
+        tx.query(model.Overtake).filter_by(lap_number=3).update({"passing_status_override": "PIT"})
+        refresh_rankings(tx)
+        tx.commit()
+        assert rankings() == [(2, 1, 1), (1, 1, 1), (2, 1, 1)]
@@ -1,8 +1,18 @@
+import numpy as np
+import pandas as pd
 import pytest
 
 from collections import namedtuple
 
-from scrape.race import get_driver_overtakes
+from scrape.race import (
+    OvertakeDetector,
+    OvertakeRule,
+    OvertakeStatus,
+    default_overtake_rules,
+    get_battles,
+    get_driver_overtakes,
+    get_overtakes,
+)
 
 ExpectedOvertake = namedtuple("ExpectedOvertake", ["lap", "passed", "position"])
 
@@ -200,3 +210,148 @@ class TestAustria2022:
             ExpectedOvertake("64", "GAS", "13"),
         ]
         assert_driver_overtakes(drivers, overtakes, expected)
+
+    def test_all_drivers(self, austria_2022):
+        session, drivers = austria_2022
+        overtakes = get_overtakes(session)
+        for driver_number in ("14", "22", "47"):
+            pd.testing.assert_frame_equal(
+                get_driver_overtakes(session, driver_number),
+                overtakes[overtakes["DriverNumber"] == driver_number].reset_index(drop=True),
+            )
+
+
+class TestOvertakeRules:
+    def test_stats(self, austria_2022):
+        session, drivers = austria_2022
+        rules = default_overtake_rules()
+        get_overtakes(session, rules)
+
+        stats = rules.stats().set_index("Rule")
+        assert list(stats.index) == [rule.name for rule in rules]
+        assert stats.loc["POSITION_REGAINED", "Evaluated"] == 0
+
+        enabled = stats[stats["Enabled"]]
+        pending = enabled["Evaluated"] - enabled["Rejected"]
+        assert (enabled["Evaluated"].iloc[1:].to_numpy() == pending.iloc[:-1].to_numpy()).all()
+
+    def test_register(self, austria_2022):
+        session, drivers = austria_2022
+        rules = default_overtake_rules()
+        rules.register(
+            OvertakeRule(
+                OvertakeStatus.NO_BATTLE,
+                lambda c, rule: c.driver == rule.settings["driver"],
+                name="EXCLUDED_DRIVER",
+                driver="44",
+            ),
+            before="NO_LAP",
+        )
+        rules["MAYBE_OFF_TRACK"].enabled = False
+
+        overtakes = get_overtakes(session, rules)
+        expected = get_overtakes(session)
+        expected.loc[expected["DriverNumber"] == "44", "PassingStatus"] = "NO_BATTLE"
+        maybe_off_track = expected["PassingStatus"] == "MAYBE_OFF_TRACK"
+        expected.loc[maybe_off_track, "PassingStatus"] = "OK"
+        pd.testing.assert_frame_equal(
+            overtakes[overtakes["DriverNumber"] != "44"],
+            expected[expected["DriverNumber"] != "44"],
+        )
+        assert (overtakes.loc[overtakes["DriverNumber"] == "44", "PassingStatus"] != "OK").all()
+
+    def test_position_regained(self, austria_2022):
+        session, drivers = austria_2022
+        rules = default_overtake_rules()
+        rules["POSITION_REGAINED"].enabled = True
+
+        overtakes = get_overtakes(session)
+        regained = get_overtakes(session, rules)["PassingStatus"] == "POSITION_REGAINED"
+        for (_, overtake), is_regained in zip(overtakes.iterrows(), regained):
+            if overtake["PassingStatus"] != "OK":
+                assert not is_regained
+                continue
+
+            timings = session.timings.pick_driver(overtake["DriverNumberAgainst"])
+            previous = timings[
+                (timings["Time"] < overtake["Time"])
+                & (timings["Time"] >= overtake["Time"] - pd.Timedelta(15, "s"))
+            ]
+            # the position passed for is the position before the gain
+            lost = overtakes[
+                (overtakes["DriverNumber"] == overtake["DriverNumber"])
+                & (overtakes["Time"] == overtake["Time"])
+            ]
+            position = overtake["Position"] + len(lost) - 1 - list(lost.index).index(overtake.name)
+            ahead = previous[previous["Position"] <= position]["Time"]
+            expected = not ahead.empty and ahead.max() - ahead.min() < pd.Timedelta(5, "s")
+            assert is_regained == expected
+
+    def test_close_battle(self, austria_2022):
+        session, drivers = austria_2022
+        rules = default_overtake_rules()
+        rules["NO_CLOSE_BATTLE"].enabled = True
+
+        overtakes = get_overtakes(session)
+        rejected = get_overtakes(session, rules)["PassingStatus"] != overtakes["PassingStatus"]
+        battles = get_battles(session)
+        for (_, overtake), is_rejected in zip(overtakes.iterrows(), rejected):
+            if overtake["PassingStatus"] != "OK":
+                assert not is_rejected
+                continue
+
+            pair = battles[
+                (battles["DriverNumber"] == overtake["DriverNumber"])
+                & (battles["DriverNumberAhead"] == overtake["DriverNumberAgainst"])
+                & (battles["StartTime"] <= overtake["Time"])
+            ]
+            in_battle = (pair["EndTime"] >= overtake["Time"] - pd.Timedelta(5, "s")).any()
+            assert is_rejected != in_battle
+
+    def test_workers(self, austria_2022):
+        session, drivers = austria_2022
+        serial_rules, parallel_rules = default_overtake_rules(), default_overtake_rules()
+        expected = get_overtakes(session, serial_rules)
+        overtakes = get_overtakes(session, parallel_rules, workers=2)
+
+        pd.testing.assert_frame_equal(overtakes, expected)
+        columns = ["Rule", "Evaluated", "Rejected"]
+        pd.testing.assert_frame_equal(
+            parallel_rules.stats()[columns], serial_rules.stats()[columns]
+        )
+
+
+class TestBattles:
+    def test_battles(self, austria_2022):
+        session, drivers = austria_2022
+        battles = get_battles(session, threshold=0.5, duration=pd.Timedelta(2, "s"))
+        assert not battles.empty
+        assert (battles["EndTime"] - battles["StartTime"] >= pd.Timedelta(2, "s")).all()
+        assert (battles["MinInterval"] <= 0.5).all()
+        assert (battles["DriverNumber"] != battles["DriverNumberAhead"]).all()
+
+        # battles of a driver do not overlap
+        for _, driver_battles in battles.groupby("DriverNumber"):
+            assert (
+                driver_battles["StartTime"].iloc[1:].values
+                >= driver_battles["EndTime"].iloc[:-1].values
+            ).all()
+
+
+class TestOvertakeDetector:
+    def test_stream(self, austria_2022):
+        session, drivers = austria_2022
+        timings = session.timings.sort_values("Time", kind="stable")
+        detector = OvertakeDetector(session)
+
+        overtakes = []
+        for _, rows in timings.groupby(timings["Time"].dt.total_seconds() // 60):
+            overtakes.append(detector.update(rows))
+            assert len(detector._buffer) < len(timings) / 20
+        overtakes.append(detector.flush())
+
+        # overtakes are found in time order, get_overtakes returns them in driver order
+        overtakes = pd.concat(overtakes)
+        driver_order = pd.Categorical(overtakes["DriverNumber"], categories=session.drivers).codes
+        overtakes = overtakes.iloc[np.argsort(driver_order, kind="stable")]
+        pd.testing.assert_frame_equal(overtakes.reset_index(drop=True), get_overtakes(session))
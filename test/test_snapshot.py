@@ -0,0 +1,39 @@
+import json
+
+import sqlalchemy
+from sqlalchemy.orm import Session
+
+from scrape import model
+from scrape.benchmark import create_benchmark_db
+from scrape.rankings import refresh_rankings
+from scrape.snapshot import render_snapshots
+
+
+def test_render_snapshots(tmp_path):
+    engine = sqlalchemy.create_engine("sqlite://")
+    create_benchmark_db(engine, seasons=1, rounds=2, drivers=3)
+
+    assert len(render_snapshots(engine, tmp_path)) == 2
+    race_dir = tmp_path / "races" / "2022" / "circuits" / "circuit_0"
+    index = json.loads((race_dir / "index.json").read_text())
+    assert [driver["position"] for driver in index["drivers"]] == [1, 2, 3]
+
+    document = json.loads((race_dir / "drivers" / "driver_0.json").read_text())
+    assert document["race"]["circuitId"] == "circuit_0"
+    assert document["pitSummary"]["totalStops"] == 2
+    assert len(document["stintSummaries"]) == 3
+
+    # only the race whose data changed is written again
+    assert render_snapshots(engine, tmp_path) == []
+    with Session(engine) as tx:
+        summary = tx.query(model.DriverRaceSummary).filter_by(race_id=1).first()
+        tx.query(model.Overtake).filter_by(driver_race_summary_id=summary.id).update(
+            {"passing_status_override": "OK"}
+        )
+        refresh_rankings(tx, [1])
+        tx.commit()
+        overtakes = len(summary.overtakes)
+
+    assert [race.id for race in render_snapshots(engine, tmp_path)] == [1]
+    document = json.loads((race_dir / "drivers" / f"{summary.driver_id}.json").read_text())
+    assert document["overtakeSummary"]["overtakes"] == overtakes
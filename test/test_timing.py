@@ -1,8 +1,28 @@
+import json
+
+import fastf1 as ff1
+import numpy as np
+import pandas as pd
 import pytest
 
 from collections import namedtuple
 
-from scrape.core.timing import get_timing_data
+from scrape.core.laps import LapIndex
+from scrape.core.pit import PitIntervals
+from scrape.core.telemetry import TelemetryStore
+from scrape.core.timeline import PositionTimeline
+from scrape.core import session as session_module
+from scrape.core.session import Session
+from scrape.core.timing import (
+    PARSER_VERSION,
+    Timing,
+    TimingStreamParser,
+    gap_to_seconds,
+    get_lap_at_time,
+    get_timing_data,
+    is_in_pit,
+)
+from scrape.race.pit import is_time_during_pit
 
 
 class TestAustria2022:
@@ -35,3 +55,398 @@ class TestAustria2022:
             "3.7": "Yellow",
         }
         pass
+
+    @pytest.mark.parametrize("driver_number", ["1", "55"])
+    def test_timing_stream_parser(self, austria_2022, driver_number):
+        session, drivers = austria_2022
+
+        with open(f"test/test_data/timing_data_2022_aut_{driver_number}.json") as f:
+            driver_raw = json.load(f)
+        parser = TimingStreamParser()
+        parser.parse_driver(driver_raw, driver_number)
+
+        timing = parser.to_frame()
+        assert timing.dtypes.astype(str).to_dict() == {
+            "Time": "timedelta64[ns]",
+            "DriverNumber": "object",
+            "Position": "int64",
+            "GapToLeader": "object",
+            "IntervalToPositionAhead": "object",
+            "Retired": "float64",
+            "LapNumber": "object",
+            "Status": "float64",
+            "LastSectorSegmentNumber": "object",
+            "LastSectorSegmentStatus": "float64",
+            "PitIn": "bool",
+            "PitOut": "bool",
+        }
+
+        # the dtypes of a driver's rows alone, e.g. Retired is all NaN for this driver
+        timing_data = get_timing_data(session.api_path)
+        expected = timing_data[timing_data["DriverNumber"] == driver_number]
+        pd.testing.assert_frame_equal(timing, expected.reset_index(drop=True).infer_objects())
+
+    def test_timing_stream_parser_extend(self):
+        driver_raw = {}
+        for driver_number in ["1", "55"]:
+            with open(f"test/test_data/timing_data_2022_aut_{driver_number}.json") as f:
+                driver_raw[driver_number] = json.load(f)
+
+        serial = TimingStreamParser()
+        merged = TimingStreamParser()
+        for driver_number, raw in driver_raw.items():
+            serial.parse_driver(raw, driver_number)
+            parser = TimingStreamParser()
+            parser.parse_driver(raw, driver_number)
+            merged.extend(parser)
+
+        pd.testing.assert_frame_equal(merged.to_frame(), serial.to_frame())
+
+    def test_timing_stream_parser_lap_numbers(self):
+        header = [("00:00:01.000", {"Position": "3"}), ("00:00:02.000", {})]
+        raw = header + [("00:00:03.000", {"NumberOfLaps": 199})]
+        parser = TimingStreamParser()
+        parser.parse_driver(raw, "1")
+        timing = parser.to_frame()
+        assert timing["LapNumber"].tolist() == ["200"]
+        assert timing["Position"].tolist() == [3]
+        compact = Timing(Session._process_timing_data(timing)).compact()
+        assert compact["LapNumber"].tolist() == [200]
+
+        # values that don't fit the buffers aren't wrapped around
+        with pytest.raises(Exception, match="unexpected Position"):
+            TimingStreamParser().parse_driver(header + [("00:00:03.000", {"Position": "-2"})], "1")
+
+    def test_compact(self, austria_2022):
+        session, drivers = austria_2022
+        timings = session.timings
+        compact = timings.compact()
+
+        assert compact.session is session
+        assert compact["DriverNumber"].dtype == "category"
+        assert compact["LapNumber"].dtype == "Int16"
+        assert (compact["DriverNumber"].astype(str) == timings["DriverNumber"]).all()
+        pd.testing.assert_series_equal(
+            compact["LapNumber"].astype(float), pd.to_numeric(timings["LapNumber"])
+        )
+        assert compact.memory_usage(deep=True).sum() < timings.memory_usage(deep=True).sum() / 5
+
+    def test_pit_status(self, austria_2022):
+        session, drivers = austria_2022
+        timing_data = get_timing_data(session.api_path)
+
+        # reference row by row state machine
+        expected = []
+        last_pit_status = None
+        pit_ins = 0
+        drv = None
+        for row in timing_data.itertuples():
+            status = float("nan")
+            if row.DriverNumber != drv:
+                drv = row.DriverNumber
+                pit_ins = 0
+            if row.LastSectorSegmentStatus == 2064:
+                status = "PIT_LANE"
+                if last_pit_status == "PIT_OUT":
+                    last_pit_status = None
+            elif row.PitIn:
+                status = last_pit_status = "PIT_IN"
+                pit_ins += 1
+            elif row.PitOut:
+                status = last_pit_status = "PIT_OUT"
+            elif pit_ins > 1 and last_pit_status in ("PIT_IN", "PIT_OUT"):
+                status = "PIT_LANE"
+            expected.append(status)
+
+        pd.testing.assert_series_equal(
+            session.timings["Status"], pd.Series(expected, dtype=object, name="Status")
+        )
+
+
+def test_timing_cache_version(tmp_path, monkeypatch):
+    with open("test/test_data/timing_data_2022_aut_1.json") as f:
+        stream = [[time, {"Lines": {"1": line}}] for time, line in json.load(f)]
+    monkeypatch.setattr(ff1.api, "fetch_page", lambda path, name: stream)
+    monkeypatch.setattr(ff1.api.Cache, "_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(ff1.api.Cache, "_tmp_disabled", False)
+
+    parsed = []
+    parse_driver = TimingStreamParser.parse_driver
+
+    def counting_parse_driver(self, driver_raw, drv):
+        parsed.append(drv)
+        return parse_driver(self, driver_raw, drv)
+
+    monkeypatch.setattr(TimingStreamParser, "parse_driver", counting_parse_driver)
+
+    session = Session.__new__(Session)
+    session.api_path = "/static/2022/2022-07-10_Austrian_Grand_Prix/2022-07-10_Race/"
+    session._load_timing_data()
+    timings = session.timings
+    session._load_timing_data()
+    assert parsed == ["1"]
+
+    # the stream is parsed again, not read from fastf1's cache of the parsed stream
+    monkeypatch.setattr(session_module, "PARSER_VERSION", PARSER_VERSION + 1)
+    session._load_timing_data()
+    assert parsed == ["1", "1"]
+    pd.testing.assert_frame_equal(session.timings, timings)
+
+
+def test_gap_to_seconds():
+    gaps = pd.Series(["+0.256", "+1:02.500", "LAP 3", "15L", "1 L", "+1 LAP", "+2 LAPS", None])
+    expected = pd.Series([0.256, 62.5, 0.0] + [float("nan")] * 5)
+    pd.testing.assert_series_equal(gap_to_seconds(gaps), expected)
+
+
+class TestTimingPickDriver:
+    def test_pick_driver(self, austria_2022):
+        session, drivers = austria_2022
+        timings = session.timings
+        for driver_number in session.drivers:
+            picked = timings.pick_driver(driver_number)
+            pd.testing.assert_frame_equal(picked, timings[timings["DriverNumber"] == driver_number])
+            assert picked.session is session
+
+    def test_pick_driver_ungrouped(self, austria_2022):
+        session, drivers = austria_2022
+        timings = session.timings.sort_values("Time")
+        assert timings.driver_offsets() is None
+        pd.testing.assert_frame_equal(
+            timings.pick_driver("44"), timings[timings["DriverNumber"] == "44"]
+        )
+
+
+class TestPositionTimeline:
+    def test_driver_at(self, austria_2022):
+        session, drivers = austria_2022
+        timings = session.timings
+        timeline = session.position_timeline
+
+        for time in timings["Time"].sample(50, random_state=1):
+            for position in (1, 10, 20):
+                candidates = timings[(timings["Position"] == position) & (timings["Time"] <= time)]
+                if candidates.empty:
+                    assert timeline.driver_at(position, time) == ""
+                    continue
+                expected = timings.loc[candidates["Time"].idxmax(), "DriverNumber"]
+                assert timeline.driver_at(position, time) == expected
+
+                candidates = candidates[candidates["DriverNumber"] != expected]
+                if not candidates.empty:
+                    other = timings.loc[candidates["Time"].idxmax(), "DriverNumber"]
+                    assert timeline.driver_at(position, time, exclude=[expected]) == other
+
+    def test_drivers_at(self, austria_2022):
+        session, drivers = austria_2022
+        timeline = PositionTimeline(session.timings)
+
+        times = session.timings["Time"].sample(50, random_state=2)
+        positions = [1 + i % 20 for i in range(len(times))]
+        expected = [timeline.driver_at(p, t) for p, t in zip(positions, times)]
+        assert list(timeline.drivers_at(positions, times)) == expected
+        assert timeline.driver_at(1, pd.Timedelta(0)) == ""
+
+
+class TestPitIntervals:
+    def test_is_in_pit(self, austria_2022):
+        session, drivers = austria_2022
+        tolerance = pd.Timedelta(2, "s")
+
+        for driver_number in ("1", "16", "44"):
+            timings = session.timings.pick_driver(driver_number)
+            times = timings.loc[timings["Status"].notna(), "Time"]
+            times = pd.concat([times - pd.Timedelta(3, "s"), times + pd.Timedelta(1, "s")])
+
+            in_pit = is_in_pit(times.to_numpy(), timings, tolerance)
+            for time, result in zip(times, in_pit):
+                # the timing rows within the tolerance and one row either side of them
+                window = timings.index[
+                    (timings["Time"] >= time - tolerance) & (timings["Time"] <= time + tolerance)
+                ]
+                if window.empty:
+                    continue
+                check = timings.loc[window.min() - 1 : window.max() + 1]
+                assert result == check["Status"].notna().any()
+                assert is_in_pit(time, timings, tolerance) == result
+
+    def test_is_time_during_pit(self):
+        laps = pd.DataFrame(
+            {
+                "DriverNumber": ["1", "1", "1", "1"],
+                "LapNumber": [1, 2, 3, 4],
+                "PitInTime": pd.to_timedelta([np.nan, 200, np.nan, 400], "s"),
+                "PitOutTime": pd.to_timedelta([np.nan, np.nan, 230, np.nan], "s"),
+            }
+        )
+        times = pd.to_timedelta([100, 195, 200, 215, 230, 232, 400, 401], "s").to_numpy()
+
+        assert list(is_time_during_pit(times, laps)) == [
+            False,
+            False,
+            True,
+            True,
+            True,
+            False,
+            True,
+            False,
+        ]
+        assert list(
+            is_time_during_pit(
+                times,
+                laps,
+                pit_in_tolerance=pd.Timedelta(5, "s"),
+                pit_out_tolerance=pd.Timedelta(2, "s"),
+            )
+        ) == [False, True, True, True, True, True, True, True]
+        assert is_time_during_pit(pd.Timedelta(215, "s"), laps, lap_number_hint=2)
+        assert not is_time_during_pit(pd.Timedelta(215, "s"), laps, lap_number_hint=4)
+
+    def test_is_time_during_pit_subset(self, austria_2022):
+        session, drivers = austria_2022
+        laps = session.laps
+        pit_in = laps.pick_driver("1")["PitInTime"].dropna().iloc[0]
+
+        assert is_time_during_pit(pit_in, laps)
+        # only the pits of the given laps count, even when they keep the session
+        subsets = [
+            laps.pick_driver("16"),
+            laps[(laps["DriverNumber"] == "1") & laps["PitInTime"].isnull()],
+        ]
+        for subset in subsets:
+            assert subset.session is session
+            assert not is_time_during_pit(pit_in, subset)
+
+    def test_merge(self):
+        pit_intervals = PitIntervals({"1": (np.array([30, 0, 10]), np.array([40, 20, 15]))})
+        assert list(pit_intervals.contains("1", np.array([0, 20, 25, 30, 40, 41]))) == [
+            True,
+            True,
+            False,
+            True,
+            True,
+            False,
+        ]
+        assert not pit_intervals.contains("2", 0)
+
+
+class TestTrackStatus:
+    def test_is_under_track_status(self, austria_2022):
+        session, drivers = austria_2022
+        tolerance = pd.Timedelta(3, "s")
+
+        times = session.timings["Time"].sample(200, random_state=3)
+        times = pd.concat([times, session.track_status["Time"] + pd.Timedelta(1, "s")])
+        result = session.is_under_track_status(times.to_numpy())
+        for time, under_track_status in zip(times, result):
+            expected = False
+            last_non_green = None
+            for _, ts in session.track_status.iterrows():
+                if last_non_green is None and ts["Status"] != "1":
+                    last_non_green = ts
+                if last_non_green is not None and ts["Status"] == "1":
+                    if last_non_green["Time"] - tolerance <= time <= ts["Time"]:
+                        expected = True
+                    last_non_green = None
+            assert under_track_status == expected
+            assert session.is_under_track_status(time) == expected
+
+    def test_laps_under_track_status(self, austria_2022):
+        session, drivers = austria_2022
+        laps = session.laps.pick_driver("1")
+
+        result = session.laps_under_track_status(laps)
+        for (_, lap), under_track_status in zip(laps.iterrows(), result):
+            if pd.isnull(lap["LapStartTime"]) or pd.isnull(lap["Time"]):
+                assert not under_track_status
+                continue
+            times = pd.timedelta_range(lap["LapStartTime"], lap["Time"], freq="100ms")
+            assert under_track_status == session.is_under_track_status(times).any()
+
+
+class TestLapIndex:
+    def test_rows_at(self, austria_2022):
+        session, drivers = austria_2022
+        laps = session.laps.pick_driver("16")
+        times = pd.concat([laps["LapStartTime"], laps["Time"]]).dropna()
+
+        rows = session.lap_index.rows_at("16", times.to_numpy())
+        for time, row in zip(times, rows):
+            lap = get_lap_at_time(time, laps)
+            if lap is None:
+                assert row == -1
+            else:
+                assert session.laps.index[row] == lap.name
+                assert session.lap_index.lap_numbers_at("16", time) == lap["LapNumber"]
+
+    def test_missing_times(self):
+        laps = pd.DataFrame(
+            {
+                "DriverNumber": ["1", "1", "1", "1"],
+                "LapNumber": [1.0, 2.0, 3.0, 4.0],
+                "LapStartTime": pd.to_timedelta([0, 100, np.nan, 300], "s"),
+                "LapTime": pd.to_timedelta([100, np.nan, 100, 100], "s"),
+            }
+        )
+        lap_index = LapIndex(laps)
+        times = pd.to_timedelta([0, 99, 100, 250, 300, 400], "s").to_numpy()
+
+        assert list(lap_index.rows_at("1", times)) == [0, 0, -1, -1, 3, -1]
+        drivers = ["1", "2", "1", "1", "1", "1"]
+        assert list(lap_index.rows_at(drivers, times)) == [0, -1, -1, -1, 3, -1]
+        assert lap_index.lap_at("1", pd.Timedelta(350, "s"))["LapNumber"] == 4
+        assert lap_index.lap_at("1", pd.Timedelta(150, "s")) is None
+
+    def test_overlapping_laps(self):
+        laps = pd.DataFrame(
+            {
+                "DriverNumber": ["1", "1"],
+                "LapNumber": [1.0, 2.0],
+                "LapStartTime": pd.to_timedelta([0, 50], "s"),
+                "LapTime": pd.to_timedelta([200, 10], "s"),
+            }
+        )
+        lap_index = LapIndex(laps)
+
+        assert lap_index.rows_at("1", pd.Timedelta(100, "s")) == 0
+        with pytest.raises(Exception, match="Expected at most 1 lap"):
+            lap_index.rows_at("1", pd.Timedelta(55, "s"))
+
+
+class TestTelemetryStore:
+    def test_windows(self, austria_2022):
+        session, drivers = austria_2022
+        telemetry = session.telemetry_store
+
+        pos_data = session.pos_data["44"]
+        car_data = session.car_data["44"]
+        starts = pos_data["SessionTime"].sample(50, random_state=4).to_numpy()
+        ends = starts + pd.Timedelta(4, "s").to_timedelta64()
+        driver_numbers = np.full(len(starts), "44", dtype=object)
+
+        samples = telemetry.position_samples(driver_numbers, starts, ends)
+        off_track = telemetry.off_track_samples(driver_numbers, starts, ends)
+        speed = telemetry.mean_speed(driver_numbers, starts, ends)
+        for i, (start, end) in enumerate(zip(starts, ends)):
+            pos_window = pos_data[pos_data["SessionTime"].between(start, end)]
+            car_window = car_data[car_data["SessionTime"].between(start, end)]
+            assert samples[i] == len(pos_window)
+            assert off_track[i] == (pos_window["Status"] == "OffTrack").sum()
+            assert speed[i] == pytest.approx(car_window["Speed"].mean(), nan_ok=True)
+
+    def test_missing_driver(self):
+        telemetry = TelemetryStore({}, {})
+        times = pd.to_timedelta([0, 10], "s").to_numpy()
+        assert list(telemetry.position_samples(["1", "1"], times, times)) == [0, 0]
+        assert np.isnan(telemetry.mean_speed(["1", "1"], times, times)).all()
+
+    def test_missing_bounds(self):
+        car_data = pd.DataFrame(
+            {"SessionTime": pd.to_timedelta([0, 10, 20], "s"), "Speed": [100.0, 200.0, 300.0]}
+        )
+        telemetry = TelemetryStore({}, {"1": car_data})
+        starts = pd.to_timedelta([0, np.nan, 10], "s")
+        ends = pd.to_timedelta([10, 20, np.nan], "s")
+        speed = telemetry.mean_speed(["1", "1", "1"], starts, ends)
+        assert speed[0] == 150.0
+        assert np.isnan(speed[1:]).all()